@@ -0,0 +1,332 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+A local Redfish stand-in that replays a recorded iLO response tree.
+
+The fixture is a JSON file mapping each URI to the body iLO returned for it (see
+fixtures/ilo5.json). Trees can be recorded from real hardware with the record command:
+
+    python mock_ilo.py record --url https://10.0.0.100 --user admin --password password \
+                              --output fixtures/my_ilo.json
+    python mock_ilo.py serve --fixture fixtures/my_ilo.json --port 8000 --latency 0.05
+"""
+
+import sys
+import copy
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+DEFAULT_FIXTURE = 'fixtures/ilo5.json'
+
+SUCCESS = {"error": {"code": "iLO.0.10.ExtendedInfo", "message": "See @Message.ExtendedInfo for "\
+           "more information.", "@Message.ExtendedInfo": [{"MessageId": "Base.1.4.Success"}]}}
+
+def normalize_uri(uri):
+    """Fixture lookups ignore case and trailing slashes, as iLO does"""
+    return uri.split('?')[0].rstrip('/').lower() or '/'
+
+def etag(body):
+    return 'W/"%08X"' % (zlib.crc32(json.dumps(body, sort_keys=True).encode('utf-8')) & \
+                                                                                    0xffffffff)
+
+def merge(target, patch):
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = value
+
+class MockiLO(object):
+    """Resource tree, fault injection settings and traffic counters of one mock iLO"""
+
+    def __init__(self, tree, latency=0.0, jitter=0.0, error_rate=0.0, expand=True):
+        self.resources = dict((normalize_uri(uri), body) for uri, body in tree.items())
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.expand = expand
+        self.lock = threading.Lock()
+        self._sessions = 0
+        self.reset_stats()
+
+    @classmethod
+    def from_fixture(cls, fixture, **kwargs):
+        with open(fixture, 'r') as fixturein:
+            return cls(json.load(fixturein), **kwargs)
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors_injected': 0, \
+                          'methods': {}}
+
+    def count(self, method, bytes_in, bytes_out, injected=False):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_in'] += bytes_in
+            self.stats['bytes_out'] += bytes_out
+            self.stats['methods'][method] = self.stats['methods'].get(method, 0) + 1
+            if injected:
+                self.stats['errors_injected'] += 1
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def inject_error(self):
+        return self.error_rate and random.random() < self.error_rate
+
+    def lookup(self, uri):
+        return self.resources.get(normalize_uri(uri))
+
+    def expanded(self, body):
+        body = copy.deepcopy(body)
+        body['Members'] = [self.resources.get(normalize_uri(member['@odata.id']), member) \
+                                                            for member in body.get('Members', [])]
+        return body
+
+    def new_session(self, username):
+        with self.lock:
+            self._sessions += 1
+            session_id = '%s%016x' % (username, self._sessions)
+        uri = '/redfish/v1/SessionService/Sessions/%s/' % session_id
+        self.resources[normalize_uri(uri)] = {'@odata.id': uri, 'Id': session_id, \
+                    '@odata.type': '#Session.v1_0_0.Session', 'UserName': username}
+        return uri, 'token%032x' % random.getrandbits(128)
+
+class MockiLOHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    #headers and body go out in separate writes; without this every kept-alive request
+    #waits out a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def ilo(self):
+        return self.server.ilo
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status, body=None, headers=None, bytes_in=0, injected=False):
+        if body is None:
+            payload = b''
+        elif isinstance(body, dict) and '__raw__' in body:
+            payload = body['__raw__'].encode('utf-8')
+        else:
+            payload = json.dumps(body).encode('utf-8')
+        #counted before anything is written: once the client has the response, the runner
+        #may read the stats while this handler thread is still running
+        self.ilo.count(self.command, bytes_in, len(payload), injected)
+        self.send_response(status)
+        content_type = 'application/octet-stream' if isinstance(body, dict) and '__raw__' in \
+                                                                    body else 'application/json'
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, handler):
+        body = self._read_body()
+        self.ilo.delay()
+        if self.ilo.inject_error():
+            self._send(503, {"error": {"code": "iLO.0.10.ExtendedInfo", "@Message.ExtendedInfo": \
+                        [{"MessageId": "Base.1.4.ServiceTemporarilyUnavailable"}]}}, \
+                        {'Retry-After': '1'}, len(body), injected=True)
+            return
+        handler(body)
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def do_PATCH(self):
+        self._handle(self._patch)
+
+    def do_PUT(self):
+        self._handle(self._patch)
+
+    def do_DELETE(self):
+        self._handle(self._delete)
+
+    def _get(self, body):
+        resource = self.ilo.lookup(self.path)
+        if resource is None:
+            self._send(404, {"error": {"@Message.ExtendedInfo": [{"MessageId": \
+                                                        "Base.1.4.ResourceMissingAtURI"}]}})
+            return
+        query = parse_qs(urlparse(self.path).query)
+        if self.ilo.expand and '$expand' in query and 'Members' in resource:
+            resource = self.ilo.expanded(resource)
+        if ('$skip' in query or '$top' in query) and 'Members' in resource:
+            skip = int(query.get('$skip', ['0'])[0])
+            top = int(query.get('$top', [str(len(resource['Members']))])[0])
+            resource = dict(resource, Members=resource['Members'][skip:skip + top])
+        tag = etag(resource)
+        if self.headers.get('If-None-Match') == tag:
+            self._send(304, headers={'ETag': tag})
+            return
+        self._send(200, resource, {'ETag': tag})
+
+    def _post(self, body):
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            #multipart uploads such as the HttpPushUri component upload
+            data = {}
+        if normalize_uri(self.path) in [normalize_uri('/redfish/v1/Sessions'), \
+                                        normalize_uri('/redfish/v1/SessionService/Sessions')]:
+            location, token = self.ilo.new_session(data.get('UserName', ''))
+            self._send(201, self.ilo.lookup(location), {'X-Auth-Token': token, \
+                                                    'Location': location}, len(body))
+            return
+        if normalize_uri(self.path).endswith('/actions/hpehttpscert.generatecsr'):
+            #the CSR shows up on HttpsCert once generated, which the mock does instantly
+            https_cert = self.ilo.lookup(self.path.lower().split('/actions/')[0])
+            if https_cert is not None:
+                https_cert['CertificateSigningRequest'] = "-----BEGIN CERTIFICATE REQUEST-----"\
+                            "\n%s %032x\n-----END CERTIFICATE REQUEST-----\n" % \
+                            (data.get('CommonName'), random.getrandbits(128))
+        if normalize_uri(self.path).endswith('/actions/updateservice.simpleupdate'):
+            #likewise the flash completes as soon as it is requested
+            update_service = self.ilo.lookup(self.path.lower().split('/actions/')[0])
+            if update_service is not None:
+                merge(update_service, {'Oem': {'Hpe': {'State': 'Complete', \
+                                                       'FlashProgressPercent': 100}}})
+        collection = self.ilo.lookup(self.path)
+        if collection is not None and 'Members' in collection:
+            uri = '%s%d/' % (collection['@odata.id'], len(collection['Members']) + 1)
+            data.update({'@odata.id': uri, 'Id': uri.rstrip('/').split('/')[-1]})
+            self.ilo.resources[normalize_uri(uri)] = data
+            collection['Members'].append({'@odata.id': uri})
+            self._send(201, data, {'Location': uri}, len(body))
+            return
+        self._send(200, SUCCESS, bytes_in=len(body))
+
+    def _patch(self, body):
+        resource = self.ilo.lookup(self.path)
+        if resource is None:
+            self._send(404, bytes_in=len(body))
+            return
+        if self.headers.get('If-Match') and self.headers.get('If-Match') != etag(resource):
+            self._send(412, {"error": {"@Message.ExtendedInfo": [{"MessageId": \
+                                        "Base.1.4.PreconditionFailed"}]}}, bytes_in=len(body))
+            return
+        merge(resource, json.loads(body.decode('utf-8')))
+        self._send(200, SUCCESS, {'ETag': etag(resource)}, len(body))
+
+    def _delete(self, body):
+        if self.ilo.resources.pop(normalize_uri(self.path), None) is None:
+            self._send(404, bytes_in=len(body))
+            return
+        self._send(200, SUCCESS, bytes_in=len(body))
+
+class MockiLOServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, ilo, port=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), MockiLOHandler)
+        self.ilo = ilo
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+def start_mock_ilo(ilo, port=0):
+    """Serve ilo in a background thread and return the server"""
+    server = MockiLOServer(ilo, port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def record_tree(_redfishobj, start='/redfish/v1/'):
+    """Walk every @odata.id reachable from start and return the recorded response tree"""
+    tree = {}
+    seen = set()
+    pending = [start]
+    while pending:
+        uri = pending.pop()
+        if normalize_uri(uri) in seen or '#' in uri:
+            continue
+        seen.add(normalize_uri(uri))
+        response = _redfishobj.get(uri)
+        if response.status != 200:
+            continue
+        tree[uri] = response.dict
+        pending.extend(_links(response.dict))
+    return tree
+
+def _links(data):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == '@odata.id' and isinstance(value, str):
+                yield value
+            else:
+                for link in _links(value):
+                    yield link
+    elif isinstance(data, list):
+        for item in data:
+            for link in _links(item):
+                yield link
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    COMMANDS = PARSER.add_subparsers(dest='command')
+    SERVE = COMMANDS.add_parser('serve', help='replay a recorded response tree')
+    SERVE.add_argument('--fixture', default=DEFAULT_FIXTURE)
+    SERVE.add_argument('--port', type=int, default=8000)
+    SERVE.add_argument('--latency', type=float, default=0.0, help='seconds added to each request')
+    SERVE.add_argument('--jitter', type=float, default=0.0, help='random extra seconds, up to')
+    SERVE.add_argument('--error-rate', type=float, default=0.0, help='fraction answered with 503')
+    SERVE.add_argument('--no-expand', action='store_true', help='ignore $expand like old firmware')
+    RECORD = COMMANDS.add_parser('record', help='record the response tree of a real iLO')
+    RECORD.add_argument('--url', required=True)
+    RECORD.add_argument('--user', required=True)
+    RECORD.add_argument('--password', required=True)
+    RECORD.add_argument('--output', required=True)
+    ARGS = PARSER.parse_args()
+
+    if ARGS.command == 'record':
+        from redfish import RedfishClient
+        REDFISHOBJ = RedfishClient(base_url=ARGS.url, username=ARGS.user, password=ARGS.password)
+        REDFISHOBJ.login()
+        TREE = record_tree(REDFISHOBJ)
+        REDFISHOBJ.logout()
+        with open(ARGS.output, 'w') as treeout:
+            json.dump(TREE, treeout, indent=1, sort_keys=True)
+        sys.stdout.write("Recorded %d resources to %s\n" % (len(TREE), ARGS.output))
+    elif ARGS.command == 'serve':
+        ILO = MockiLO.from_fixture(ARGS.fixture, latency=ARGS.latency, jitter=ARGS.jitter, \
+                                   error_rate=ARGS.error_rate, expand=not ARGS.no_expand)
+        SERVER = MockiLOServer(ILO, ARGS.port)
+        sys.stdout.write("Mock iLO serving %s at %s\n" % (ARGS.fixture, SERVER.base_url))
+        SERVER.serve_forever()
+    else:
+        PARSER.print_help()
@@ -0,0 +1,223 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Runs the library modules against the mock iLO and reports, per module, the wall time, the
+number of HTTP requests and the bytes transferred.
+
+    python run_benchmarks.py                        # every module, cold caches
+    python run_benchmarks.py --latency 0.05 get_schema software_firmware_inventory
+    python run_benchmarks.py --json after.json --baseline before.json
+
+Requires python-ilorest-library and ansible, as the modules themselves do.
+"""
+
+import os
+import io
+import sys
+import copy
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import contextlib
+
+from mock_ilo import MockiLO, start_mock_ilo, DEFAULT_FIXTURE
+
+LIBRARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'library')
+WORK_DIR = tempfile.mkdtemp(prefix='ilorest_bench_')
+
+#the modules keep their caches under these, so point them at a scratch directory before import
+os.environ['ILOREST_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['ILOREST_SESSION_DIR'] = os.path.join(WORK_DIR, 'sessions')
+
+def _work_file(name, content=''):
+    path = os.path.join(WORK_DIR, name)
+    with open(path, 'w') as fileout:
+        fileout.write(content)
+    return path
+
+# module, function, arguments after the redfish object.
+# Not listed: sessions, which takes a URL rather than a client.
+BENCHMARKS = [
+    ('add_user_account', 'add_ilo_user_account', ('bench', 'bench', 'password', 'ReadOnly', \
+                                                                        {'LoginPriv': True})),
+    ('bios_revert_default', 'bios_revert_default', ()),
+    ('change_bios_setting', 'change_bios_setting', ('AdminName', 'Bench', '')),
+    ('change_boot_order', 'change_boot_order', ('',)),
+    ('change_temporary_boot_order', 'change_temporary_boot_order', ('Pxe',)),
+    ('clear_ahs_data', 'clear_ahs_data', ()),
+    ('clear_ilo_IEL_IML_log', 'clear_ilo_event_log', ('IML',)),
+    ('computer_details', 'computer_details', ()),
+    ('configure_snmp', 'configure_snmp', (['public', '', ''], True)),
+    ('enable_ntp_servers', 'enable_ntp', (True,)),
+    ('enable_secure_boot', 'enable_secure_boot', (True,)),
+    ('expand_data', 'expand_data', ('/redfish/v1/',)),
+    ('find_ilo_mac_address', 'find_ilo_mac_address', ()),
+    ('firmware_baseline', 'component_is_current', ('iLO 5', '2.30')),
+    ('generate_csr', 'generate_csr', (os.path.join(WORK_DIR, 'csr.txt'), {'City': 'City', \
+                'CommonName': 'bench', 'Country': 'US', 'OrgName': 'Organization', \
+                'OrgUnit': 'Unit', 'State': 'State'})),
+    ('get_ESKM', 'get_ESKM', ()),
+    ('get_LogicalDrives', 'get_SmartArray_LogicalDrives', ()),
+    ('get_SmartArray_EncryptionSettings', 'get_SmartArray_EncryptionSettings', \
+                                                        (['Name', 'Model', 'SerialNumber'],)),
+    ('get_ahs_data', 'get_ahs_data', (os.path.join(WORK_DIR, 'bench.ahs'),)),
+    ('get_base_registry', 'get_base_registry', ()),
+    ('get_ilo_ip', 'get_ilo_ip', (False,)),
+    ('get_ilo_nic', 'get_ilo_nic', (True,)),
+    ('get_license_key', 'get_license_key', ()),
+    ('get_powermetrics_average', 'get_powermetrics_average', ()),
+    ('get_resource_directory', 'get_resource_directory', ()),
+    ('get_schema', 'get_schema', ()),
+    ('hardware_facts', 'hardware_facts', ()),
+    ('ilo_accounts', 'reconcile_accounts', ([{'username': 'monitor', 'role_id': 'Operator'}, \
+                                {'username': 'bench', 'password': 'password'}],)),
+    ('import_ssl', 'import_ssl', (_work_file('certificate.txt', '-----BEGIN CERTIFICATE-----\n'\
+                                                        '-----END CERTIFICATE-----\n'),)),
+    ('modify_user_account', 'modify_ilo_user_account', ('monitor', 'monitor', 'monitor', \
+                                                'password', 'ReadOnly', {'LoginPriv': True})),
+    ('mount_virtual_media_iso', 'mount_virtual_media_iso', ('http://10.0.0.1/bench.iso', 'CD', \
+                                                                                        False)),
+    ('read_ilo_IEL_IML_log', 'read_ilo_event_log', ('IEL,IML', io.StringIO())),
+    ('reboot_server', 'reboot_server', ()),
+    ('remove_account', 'remove_ilo_user_account', ('operator',)),
+    ('reset_ESKM_eventlog', 'reset_ESKM_eventlog', ()),
+    ('reset_ilo', 'reset_ilo', ()),
+    ('set_ESKM_PrimaryKeyServer', 'set_ESKM_PrimaryKeyServer', ('192.168.1.1', '9000')),
+    ('set_ESKM_username_password', 'ESKM_username_pass', ('admin', 'password', 'group')),
+    ('set_active_ilo_nic', 'set_active_ilo_nic', ()),
+    ('set_bios_iscsi', 'set_bios_iscsi', ({'iSCSIBootInstance': 2, 'iSCSIAttemptName': \
+                                                                                'bench'},)),
+    ('set_bios_password', 'set_bios_password', ('newpassword', '')),
+    ('set_ethernet_management_iface_static_ip', 'set_ilo_static_ipv4', ({'Address': \
+                    '10.0.0.150', 'Gateway': '10.0.0.1', 'SubnetMask': '255.255.255.0'}, \
+                    {'PrimaryDNS': '10.0.0.2', 'SecondaryDNS': '10.0.0.3'})),
+    ('set_ilo_ntp_servers', 'set_ilo_ntp_servers', (['10.0.0.2', '10.0.0.3'],)),
+    ('set_ilo_timezone', 'set_timezone', ('Atlantic/Azores',)),
+    ('set_license_key', 'set_license_key', ('XXXXX-XXXXX-XXXXX-XXXXX-XXXXX',)),
+    ('set_server_asset_tag', 'set_server_asset_tag', ('bench',)),
+    ('set_uid_light', 'set_uid_light', ()),
+    ('software_firmware_inventory', 'get_inventory_uri', ('firmware',)),
+    ('test_ESKM_connection', 'test_ESKM_connection', ()),
+    ('update_ilo_firmware', 'update_ilo_firmware', ('http://10.0.0.1/ilo5_230.bin', False)),
+    ('upload_firmware_ilo_repository', 'upload_firmware', (_work_file('bench.fwpkg', \
+                                                                'x' * 1024 * 1024), True, False)),
+]
+
+def reset_library_state(warm_cache):
+    """Forget everything the library helpers memoized, so each module starts cold"""
+    #per client state lives on the client, which is created anew for every module
+    for name, attrs in [('get_resource_directory', ['_LOADED']), ('http_trace', ['_RECORDS']), \
+                        ('bios_registry', ['_REGISTRIES']), ('message_registry', ['_INDEXES'])]:
+        helper = sys.modules.get(name)
+        for attr in attrs:
+            if helper and hasattr(helper, attr):
+                getattr(helper, attr).clear()
+    if 'module_output' in sys.modules:
+        sys.modules['module_output']._LOCAL.__dict__.clear()
+    if not warm_cache:
+        shutil.rmtree(os.environ['ILOREST_CACHE_DIR'], ignore_errors=True)
+
+def run_benchmark(server, tree, ilo_options, name, function, args, warm_cache=False):
+    """Run one module function against a fresh copy of the tree and return its measurements"""
+    from redfish import RedfishClient
+
+    server.ilo = MockiLO(copy.deepcopy(tree), **ilo_options)
+    reset_library_state(warm_cache)
+    module = importlib.import_module(name)
+    module.DISABLE_RESOURCE_DIR = False
+    result = {'module': name, 'error': None}
+
+    output = io.StringIO()
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            redfishobj = RedfishClient(base_url=server.base_url, username='admin', \
+                                                                        password='password')
+            redfishobj.login()
+            getattr(module, function)(redfishobj, *args)
+            redfishobj.logout()
+    except Exception as excp:
+        result['error'] = "%s: %s" % (type(excp).__name__, excp)
+    result['seconds'] = round(time.time() - start, 4)
+    result.update(dict((key, server.ilo.stats[key]) for key in ['requests', 'bytes_in', \
+                                                                'bytes_out', 'errors_injected']))
+    result['methods'] = dict(server.ilo.stats['methods'])
+    return result
+
+def print_report(results, baseline=None):
+    baseline = dict((result['module'], result) for result in baseline or [])
+    sys.stdout.write("%-40s %9s %8s %10s %10s  %s\n" % ('module', 'seconds', 'requests', \
+                                                        'bytes in', 'bytes out', 'error'))
+    for result in results:
+        line = "%-40s %9.3f %8d %10d %10d" % (result['module'], result['seconds'], \
+                            result['requests'], result['bytes_in'], result['bytes_out'])
+        before = baseline.get(result['module'])
+        if before:
+            line += "  (%+.3fs %+d req %+d bytes)" % (result['seconds'] - before['seconds'], \
+                            result['requests'] - before['requests'], \
+                            result['bytes_out'] - before['bytes_out'])
+        if result['error']:
+            line += "  %s" % result['error']
+        sys.stdout.write(line + "\n")
+    sys.stdout.write("%-40s %9.3f %8d %10d %10d\n" % ('total', \
+                            sum(result['seconds'] for result in results), \
+                            sum(result['requests'] for result in results), \
+                            sum(result['bytes_in'] for result in results), \
+                            sum(result['bytes_out'] for result in results)))
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description="Benchmark the library modules against the "\
+                                                                                "mock iLO.")
+    PARSER.add_argument('modules', nargs='*', help='modules to run, default all')
+    PARSER.add_argument('--fixture', default=os.path.join(os.path.dirname(\
+                                                    os.path.abspath(__file__)), DEFAULT_FIXTURE))
+    PARSER.add_argument('--latency', type=float, default=0.0, help='seconds added per request')
+    PARSER.add_argument('--jitter', type=float, default=0.0)
+    PARSER.add_argument('--error-rate', type=float, default=0.0, help='fraction answered 503')
+    PARSER.add_argument('--no-expand', action='store_true', help='mock iLO ignores $expand')
+    PARSER.add_argument('--warm-cache', action='store_true', help='keep the on-disk caches '\
+                                                                        'between modules')
+    PARSER.add_argument('--json', help='write the results to this file')
+    PARSER.add_argument('--baseline', help='results file of an earlier run to compare against')
+    ARGS = PARSER.parse_args()
+
+    sys.path.insert(0, os.path.abspath(LIBRARY_DIR))
+    with open(ARGS.fixture, 'r') as fixturein:
+        TREE = json.load(fixturein)
+    ILO_OPTIONS = {'latency': ARGS.latency, 'jitter': ARGS.jitter, \
+                   'error_rate': ARGS.error_rate, 'expand': not ARGS.no_expand}
+    SERVER = start_mock_ilo(MockiLO(TREE, **ILO_OPTIONS))
+
+    RESULTS = []
+    for NAME, FUNCTION, FUNCTION_ARGS in BENCHMARKS:
+        if ARGS.modules and NAME not in ARGS.modules:
+            continue
+        RESULTS.append(run_benchmark(SERVER, TREE, ILO_OPTIONS, NAME, FUNCTION, FUNCTION_ARGS, \
+                                                                            ARGS.warm_cache))
+    SERVER.shutdown()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    BASELINE = None
+    if ARGS.baseline:
+        with open(ARGS.baseline, 'r') as baselinein:
+            BASELINE = json.load(baselinein)
+    print_report(RESULTS, BASELINE)
+    if ARGS.json:
+        with open(ARGS.json, 'w') as resultsout:
+            json.dump(RESULTS, resultsout, indent=4, sort_keys=True)
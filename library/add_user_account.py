@@ -34,11 +34,14 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 global DISABLE_RESOURCE_DIR
 DISABLE_RESOURCE_DIR = False
 
@@ -56,9 +59,7 @@ def add_ilo_user_account(_redfishobj, new_loginname, new_username, new_password,
         body = {"RoleId": role_id}
     else:
         #obtain all account instances from resource directory
-        for instance in resource_instances:
-            if '#ManagerAccountCollection.' in instance['@odata.type']:
-                account_collection_uri = instance['@odata.id']
+        account_collection_uri = find_resource_uri(_redfishobj, 'ManagerAccountCollection')
         body = {"Oem": {"Hpe": {"Privileges": {}}}}
         #HPE server, so add via privileges
         for priv in privilege_dict:
@@ -77,7 +78,7 @@ def add_ilo_user_account(_redfishobj, new_loginname, new_username, new_password,
     #error message to see what went wrong
     if resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception:
             sys.stderr.write("A response error occurred, unable to access iLO Extended Message "\
                              "Info...")
@@ -85,7 +86,7 @@ def add_ilo_user_account(_redfishobj, new_loginname, new_username, new_password,
         sys.stderr.write("An http response of '%s' was returned.\n" % resp.status)
     else:
         print("Success!\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
 
 if __name__ == "__main__":
 
@@ -149,11 +150,8 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
@@ -168,7 +166,8 @@ if __name__ == "__main__":
     add_ilo_user_account(REDFISHOBJ, ACCOUNT_LOGIN_NAME, ACCOUNT_USER_NAME, \
                                      ACCOUNT_PASSWORD, ROLE_ID, PRIVILEGE_DICT)
 
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
 
 
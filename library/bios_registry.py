@@ -0,0 +1,211 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Cached BIOS attribute registry and local validation of BIOS attributes for HPE iLO systems
+"""
+
+import os
+import re
+import sys
+import difflib
+
+from get_resource_directory import CACHE_DIR, read_cache_file, write_cache_file
+from collection_reader import read_collection
+
+#registries already loaded in this process, keyed by registry name
+_REGISTRIES = {}
+
+class BiosAttributeError(Exception):
+    """Raised when requested BIOS attributes fail validation against the registry"""
+
+    def __init__(self, errors):
+        Exception.__init__(self, "; ".join(errors))
+        self.errors = errors
+
+def _compact(registry):
+    """Keep only what validation needs, indexed by attribute name"""
+    attributes = {}
+    for entry in registry.get('RegistryEntries', {}).get('Attributes', []):
+        attribute = {'type': entry.get('Type'), 'read_only': entry.get('ReadOnly', False)}
+        if 'Value' in entry:
+            attribute['values'] = [value['ValueName'] for value in entry['Value']]
+        for key, name in [('DefaultValue', 'default'), ('LowerBound', 'min'), \
+                          ('UpperBound', 'max'), ('MinLength', 'min_length'), \
+                          ('MaxLength', 'max_length'), ('ValueExpression', 'pattern')]:
+            if entry.get(key) is not None:
+                attribute[name] = entry[key]
+        attributes[entry['AttributeName']] = attribute
+    dependencies = {}
+    for entry in registry.get('RegistryEntries', {}).get('Dependencies', []):
+        if entry.get('Type') == 'Map':
+            dependencies.setdefault(entry['DependencyFor'], []).append(entry['Dependency'])
+    return {'registry': registry.get('Id'), 'attributes': attributes, \
+            'dependencies': dependencies}
+
+def _download_registry(_redfishobj, registry_name):
+    registries_uri = _redfishobj.root.obj['Registries']['@odata.id']
+    for registry_file in read_collection(_redfishobj, registries_uri):
+        if registry_name not in [registry_file.get('Id'), registry_file.get('Registry')]:
+            continue
+        locations = registry_file.get('Location', [])
+        english = [location for location in locations if location.get('Language') == 'en']
+        location = (english or locations or [{}])[0]
+        if location.get('Uri'):
+            response = _redfishobj.get(location['Uri'])
+            if response.status == 200:
+                return response.dict
+    return None
+
+def get_bios_registry(_redfishobj, bios_data, cache_dir=None):
+    """Return the compact attribute registry named by a Bios resource. Registries are named
+    after the system ROM family and version, so each is downloaded once and kept on disk."""
+    registry_name = bios_data.get('AttributeRegistry')
+    if not registry_name:
+        return None
+    if registry_name in _REGISTRIES:
+        return _REGISTRIES[registry_name]
+
+    cache_dir = cache_dir or CACHE_DIR
+    cache_file = None
+    if cache_dir:
+        cache_file = os.path.join(cache_dir, "biosregistry_%s.json" % \
+                                                        re.sub(r'[^\w.-]', '_', registry_name))
+    registry = read_cache_file(cache_file) if cache_file else None
+    if not registry:
+        downloaded = _download_registry(_redfishobj, registry_name)
+        if not downloaded:
+            sys.stderr.write("\tBios attribute registry %s not found, attributes will not be "\
+                             "validated.\n" % registry_name)
+            return None
+        registry = _compact(downloaded)
+        if cache_file:
+            write_cache_file(cache_file, registry)
+    _REGISTRIES[registry_name] = registry
+    return registry
+
+def _compare(current, condition, value):
+    try:
+        return {'EQU': current == value, 'NEQ': current != value, 'GTR': current > value, \
+                'GEQ': current >= value, 'LSS': current < value, \
+                'LEQ': current <= value}[condition]
+    except (KeyError, TypeError):
+        return False
+
+def _dependency_applies(dependency, values):
+    applies = None
+    for term in dependency.get('MapFrom', []):
+        if term.get('MapFromProperty', 'CurrentValue') != 'CurrentValue':
+            continue
+        result = _compare(values.get(term['MapFromAttribute']), term.get('MapFromCondition', \
+                                                                'EQU'), term.get('MapFromValue'))
+        if applies is None:
+            applies = result
+        elif term.get('MapTerms') == 'OR':
+            applies = applies or result
+        else:
+            applies = applies and result
+    return bool(applies)
+
+def _check_value(name, attribute, value):
+    kind = attribute.get('type')
+    if kind == 'Enumeration':
+        if 'values' in attribute and value not in attribute['values']:
+            return "%s must be one of %s, not %r" % (name, ", ".join(attribute['values']), value)
+    elif kind == 'Integer':
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return "%s must be an integer, not %r" % (name, value)
+        if number < attribute.get('min', number) or number > attribute.get('max', number):
+            return "%s must be between %s and %s, not %s" % (name, attribute.get('min'), \
+                                                                    attribute.get('max'), number)
+    elif kind == 'Boolean':
+        if str(value).lower() not in ['true', 'false']:
+            return "%s must be true or false, not %r" % (name, value)
+    elif kind in ['String', 'Password']:
+        length = len(str(value))
+        if length > attribute.get('max_length', length) or \
+                                                    length < attribute.get('min_length', length):
+            return "%s must be %s to %s characters long" % (name, attribute.get('min_length', \
+                                                        0), attribute.get('max_length', length))
+        if attribute.get('pattern') and not re.match(attribute['pattern'], str(value)):
+            return "%s does not match %s" % (name, attribute['pattern'])
+    return None
+
+def validate_bios_attributes(registry, attributes, current=None):
+    """Return a list of problems with the requested attributes: unknown names, read-only
+    attributes, values of the wrong type or outside the allowed values, and attributes made
+    read-only by a dependency on the values they would be set with. Empty when all is well."""
+    errors = []
+    values = dict(current or {})
+    values.update(attributes)
+    for name, value in sorted(attributes.items()):
+        attribute = registry['attributes'].get(name)
+        if attribute is None:
+            close = difflib.get_close_matches(name, list(registry['attributes']), 1)
+            errors.append("Unknown bios attribute %s%s" % (name, ", did you mean %s?" % close[0] \
+                                                                            if close else ""))
+            continue
+        if attribute.get('read_only'):
+            errors.append("%s is read-only" % name)
+            continue
+        problem = _check_value(name, attribute, value)
+        if problem:
+            errors.append(problem)
+            continue
+        for dependency in registry['dependencies'].get(name, []):
+            if dependency.get('MapToProperty') in ['ReadOnly', 'GrayOut'] and \
+                        dependency.get('MapToValue') and _dependency_applies(dependency, values):
+                errors.append("%s is read-only while %s" % (name, " and ".join("%s is %s" % \
+                            (term['MapFromAttribute'], term.get('MapFromValue')) for term in \
+                                                                    dependency['MapFrom'])))
+    return errors
+
+def coerce_bios_attributes(registry, attributes):
+    """Convert string values from playbooks to the Integer and Boolean types iLO expects"""
+    coerced = dict(attributes)
+    for name, value in attributes.items():
+        kind = registry['attributes'].get(name, {}).get('type')
+        try:
+            if kind == 'Integer':
+                coerced[name] = int(value)
+            elif kind == 'Boolean' and not isinstance(value, bool):
+                coerced[name] = str(value).lower() == 'true'
+        except (TypeError, ValueError):
+            pass
+    return coerced
+
+def check_bios_attributes(_redfishobj, bios_data, attributes):
+    """Validate attributes against the registry of a Bios resource, raising BiosAttributeError,
+    and return them converted to the registry types. Attributes are returned unchanged when
+    the registry cannot be found."""
+    registry = get_bios_registry(_redfishobj, bios_data)
+    if not registry:
+        return attributes
+    errors = validate_bios_attributes(registry, attributes, bios_data.get('Attributes'))
+    if errors:
+        raise BiosAttributeError(errors)
+    return coerce_bios_attributes(registry, attributes)
+
+def default_differences(registry, current):
+    """Return the attributes whose current value differs from the registry default, or None
+    when the registry has no default values"""
+    defaults = dict((name, attribute['default']) for name, attribute in \
+                            registry['attributes'].items() if 'default' in attribute)
+    if not defaults:
+        return None
+    return dict((name, current[name]) for name, default in defaults.items() if name in current \
+                                                                and current[name] != default)
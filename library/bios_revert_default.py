@@ -31,17 +31,24 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from http_trace import http_trace_summary
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from bios_registry import get_bios_registry, default_differences
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def bios_revert_default(_redfishobj):
+    """Reset the bios to its defaults. Returns False without resetting when the attribute
+    registry shows every current and pending attribute already at its default."""
 
     bios_reset_action_uri = None
+    bios_data = None
     resource_instances = get_resource_directory(_redfishobj)
 
     if DISABLE_RESOURCE_DIR or not resource_instances:
@@ -52,16 +59,23 @@ def bios_revert_default(_redfishobj):
         systems_members_uri = next(iter(systems_response.obj['Members']))['@odata.id']
         systems_members_response = _redfishobj.get(systems_members_uri)
         bios_uri = systems_members_response.obj['Bios']['@odata.id']
-        bios_response = _redfishobj.get(bios_uri)
-        bios_reset_action_uri = bios_response.obj['Actions']['#Bios.ResetBios']['target']
+        bios_data = _redfishobj.get(bios_uri)
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#Bios.' in instance['@odata.type']:
-                bios_uri = instance['@odata.id']
-                bios_data = _redfishobj.get(bios_uri)
-                bios_reset_action_uri = bios_data.obj['Actions']['#Bios.ResetBios']['target']
-                break
+        bios_uri = find_resource_uri(_redfishobj, 'Bios')
+        if bios_uri:
+            bios_data = _redfishobj.get(bios_uri)
+    if bios_data:
+        bios_reset_action_uri = bios_data.obj['Actions']['#Bios.ResetBios']['target']
+
+    registry = get_bios_registry(_redfishobj, bios_data.dict) if bios_data else None
+    if registry:
+        bios_settings_uri = bios_data.obj['@Redfish.Settings']['SettingsObject']['@odata.id']
+        pending = _redfishobj.get(bios_settings_uri).dict.get('Attributes', {})
+        if default_differences(registry, bios_data.dict.get('Attributes', {})) == {} and \
+                                                default_differences(registry, pending) == {}:
+            print("Bios attributes are already at their defaults, nothing to reset.\n")
+            return False
 
     body = {'Action': 'Bios.ResetBios', 'ResetType':'default'}
     resp = _redfishobj.post(bios_reset_action_uri, body)
@@ -70,7 +84,7 @@ def bios_revert_default(_redfishobj):
     #error message to see what went wrong
     if resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception:
             sys.stderr.write("A response error occurred, unable to access iLO Extended Message "\
                              "Info...")
@@ -78,7 +92,9 @@ def bios_revert_default(_redfishobj):
         sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
     else:
         print("Success!\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
+        return True
+    return False
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -108,14 +124,12 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT,\
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    bios_revert_default(REDFISHOBJ)
-    REDFISHOBJ.logout()
+    CHANGED = bios_revert_default(REDFISHOBJ)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=CHANGED, results=module_results(), http_trace=http_trace_summary())
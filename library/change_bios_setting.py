@@ -18,15 +18,44 @@ An example of changing bios settings
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from bios_registry import check_bios_attributes, BiosAttributeError
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
-def change_bios_setting(_redfishobj, bios_property, property_value, bios_password):
+def _same_value(current, desired):
+    #check_bios_attributes converts values to the registry types; without a registry, playbook
+    #strings are still matched to the integers and booleans iLO reports. Strings, including
+    #enumeration values, must match exactly.
+    if current == desired:
+        return True
+    if isinstance(current, bool):
+        return str(desired).lower() == str(current).lower()
+    if isinstance(current, int):
+        return str(desired) == str(current)
+    return False
+
+def bios_changes(current, pending, attributes):
+    """Return the attributes whose value after the next reboot would differ from the requested
+    one. Pending values in the settings object win over the current ones."""
+    changes = {}
+    for name, value in attributes.items():
+        effective = pending.get(name, current.get(name))
+        if not _same_value(effective, value):
+            changes[name] = value
+    return changes
+
+def change_bios_settings(_redfishobj, attributes, bios_password):
+    """Apply a dictionary of BIOS attributes with one PATCH holding only the attributes that
+    differ from the current and pending settings. Returns the attributes patched, which is
+    empty when nothing needed to change, or None when the PATCH failed."""
 
     bios_uri = None
     bios_data = None
@@ -42,43 +71,55 @@ def change_bios_setting(_redfishobj, bios_property, property_value, bios_passwor
         bios_data = _redfishobj.get(bios_uri)
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#Bios.' in instance['@odata.type']:
-                bios_uri = instance['@odata.id']
-                bios_data = _redfishobj.get(bios_uri)
-                break
-
-    if bios_data:
-        print("\n\nShowing bios attributes before changes:\n\n")
-        print(json.dumps(bios_data.dict, indent=4, sort_keys=True))
-
-    if bios_uri:
-        #Bios settings URI is needed
-        bios_settings_uri = bios_data.obj['@Redfish.Settings']['SettingsObject']['@odata.id']
-        body = {'Attributes': {bios_property: property_value}}
-        #update bios password
-        if bios_password:
-            _redfishobj.bios_password = bios_password
-        resp = _redfishobj.patch(bios_settings_uri, body)
-
-        #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
-        #error message to see what went wrong
-        if resp.status == 400:
-            try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
-            except Exception:
-                sys.stderr.write("A response error occurred, unable to access iLO Extended "\
-                                 "Message Info...")
-        elif resp.status != 200:
-            sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
-        else:
-            print("\nSuccess!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
-            #uncomment if you would like to see the full list of attributes
-            #print("\n\nShowing bios attributes after changes:\n\n")
-            #bios_data = _redfishobj.get(bios_uri)
-            #print(json.dumps(bios_data.dict, indent=4, sort_keys=True))
+        bios_uri = find_resource_uri(_redfishobj, 'Bios')
+        if bios_uri:
+            bios_data = _redfishobj.get(bios_uri)
+
+    if not bios_uri:
+        return None
+
+    #only the attributes asked for are kept as the result
+    show(bios_data.dict.get('Attributes', {}), 'attributes_before', list(attributes), \
+                                        "\n\nShowing bios attributes before changes:\n\n")
+
+    #catch unknown attributes and bad values before anything is sent to iLO
+    attributes = check_bios_attributes(_redfishobj, bios_data.dict, attributes)
+    #Bios settings URI is needed
+    bios_settings_uri = bios_data.obj['@Redfish.Settings']['SettingsObject']['@odata.id']
+    pending = _redfishobj.get(bios_settings_uri).dict.get('Attributes', {})
+    changes = bios_changes(bios_data.dict.get('Attributes', {}), pending, attributes)
+    if not changes:
+        print("\nBios attributes already set, nothing to change.\n")
+        return changes
+
+    body = {'Attributes': changes}
+    #update bios password
+    if bios_password:
+        _redfishobj.bios_password = bios_password
+    resp = _redfishobj.patch(bios_settings_uri, body)
+
+    #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
+    #error message to see what went wrong
+    if resp.status == 400:
+        try:
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
+        except Exception:
+            sys.stderr.write("A response error occurred, unable to access iLO Extended "\
+                             "Message Info...")
+    elif resp.status != 200:
+        sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
+    else:
+        print("\nSuccess!\n")
+        show(resp.dict, 'response')
+        #uncomment if you would like to see the full list of attributes
+        #print("\n\nShowing bios attributes after changes:\n\n")
+        #bios_data = _redfishobj.get(bios_uri)
+        #print(json.dumps(bios_data.dict, indent=4, sort_keys=True))
+        return changes
+    return None
+
+def change_bios_setting(_redfishobj, bios_property, property_value, bios_password):
+    return change_bios_settings(_redfishobj, {bios_property: property_value}, bios_password)
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -91,13 +132,18 @@ if __name__ == "__main__":
             state     = dict(default='present', choices=['present', 'absent']),
             name      = dict(required=True),
             enabled   = dict(required=True, type='bool'),
-            bios_property = dict(required=True, type='str'),
-            property_value = dict(required=True, type='str')
+            bios_property = dict(required=False, type='str'),
+            property_value = dict(required=False, type='str'),
+            attributes = dict(required=False, type='dict')
         )
     )
-    # Set variables based on vars fed from .yml
-    ATTRIBUTE = module.params['bios_property']
-    ATTRIBUTE_VAL = module.params['property_value']
+    # Set variables based on vars fed from .yml: either one bios_property and property_value,
+    # or several attributes at once as a dictionary
+    ATTRIBUTES = module.params['attributes'] or {}
+    if module.params['bios_property']:
+        ATTRIBUTES[module.params['bios_property']] = module.params['property_value']
+    if not ATTRIBUTES:
+        module.fail_json(msg="Either attributes or bios_property is required.")
     # When running on the server locally use the following commented values
     # While this example can be run remotely, it is used locally to locate the
     # iLO IP address
@@ -120,15 +166,20 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    change_bios_setting(REDFISHOBJ, ATTRIBUTE, ATTRIBUTE_VAL, BIOS_PASSWORD)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    try:
+        CHANGES = change_bios_settings(REDFISHOBJ, ATTRIBUTES, BIOS_PASSWORD)
+    except BiosAttributeError as excp:
+        release_redfish_client(REDFISHOBJ)
+        module.fail_json(msg="Invalid bios attributes: %s" % excp, errors=excp.errors)
+    release_redfish_client(REDFISHOBJ)
+    if CHANGES is None:
+        module.fail_json(msg="Unable to change bios settings.")
+    module.exit_json(changed=bool(CHANGES), attributes_changed=CHANGES, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
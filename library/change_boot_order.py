@@ -31,12 +31,16 @@ EXAMPLES = '''
     bios_password: None
 '''
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from http_trace import http_trace_summary
 from ansible.module_utils.basic import *
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from etag_write import patch_if_match
+from module_output import show, module_results
 
 def change_boot_order(_redfishobj, bios_password):
 
@@ -56,10 +60,7 @@ def change_boot_order(_redfishobj, bios_password):
         bios_boot_uri = bios_response.obj.Oem.Hpe.Links.Boot['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeServerBootSettings.' in instance['@odata.type']:
-                bios_boot_uri = instance['@odata.id']
-                break
+        bios_boot_uri = find_resource_uri(_redfishobj, 'HpeServerBootSettings')
 
     if bios_boot_uri:
         bios_boot_response = _redfishobj.get(bios_boot_uri)
@@ -69,24 +70,27 @@ def change_boot_order(_redfishobj, bios_password):
         #update bios password
         if bios_password:
             _redfishobj.bios_password = bios_password
-        sys.stdout.write("Rotating the first boot device to the end of the boot order.\n")
-        sys.stdout.write('Current Order:\n')
-        boot_order = bios_boot_response.obj['DefaultBootOrder']
-        for indx, boot_device in enumerate(boot_order):
-            sys.stdout.write('Pos ' + str(indx) + ' : ' + boot_device + '\n')
-        device = boot_order.pop(0)
-        sys.stdout.write("Rotating device: \'%s\' to the end of the boot order.\n" % device)
-        boot_order.append(device)
 
-        body = {'DefaultBootOrder': boot_order}
-        resp = _redfishobj.patch(bios_boot_settings_uri, body)
+        def rotated_boot_order(boot_settings):
+            #rotate the pending order, so boot changes not yet applied are kept
+            sys.stdout.write("Rotating the first boot device to the end of the boot order.\n")
+            sys.stdout.write('Current Order:\n')
+            boot_order = boot_settings['DefaultBootOrder']
+            for indx, boot_device in enumerate(boot_order):
+                sys.stdout.write('Pos ' + str(indx) + ' : ' + boot_device + '\n')
+            device = boot_order.pop(0)
+            sys.stdout.write("Rotating device: \'%s\' to the end of the boot order.\n" % device)
+            boot_order.append(device)
+            return {'DefaultBootOrder': boot_order}
+
+        #PATCH with If-Match, so a change made since the read is not overwritten
+        resp = patch_if_match(_redfishobj, bios_boot_settings_uri, rotated_boot_order)[0]
 
         #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended Message"\
                                  " Info...")
@@ -94,7 +98,7 @@ def change_boot_order(_redfishobj, bios_password):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success! Your system may need to be restarted.\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
     else:
         sys.stderr.write("Unable to find Boot Order URI.\n")
 
@@ -122,15 +126,12 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     change_boot_order(REDFISHOBJ, BIOS_PASSWORD)
-    REDFISHOBJ.logout()
-  
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, results=module_results(), http_trace=http_trace_summary())
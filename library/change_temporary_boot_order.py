@@ -18,11 +18,14 @@ An example of changing the temporary boot order
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def change_temporary_boot_order(_redfishobj, boottarget):
 
@@ -36,14 +39,13 @@ def change_temporary_boot_order(_redfishobj, boottarget):
         systems_members_uri = next(iter(systems_response.obj['Members']))['@odata.id']
         systems_members_response = _redfishobj.get(systems_members_uri)
     else:
-        for instance in resource_instances:
-            if '#ComputerSystem.' in instance['@odata.type']:
-                systems_members_uri = instance['@odata.id']
-                systems_members_response = _redfishobj.get(systems_members_uri)
+        systems_members_uri = find_resource_uri(_redfishobj, 'ComputerSystem')
+        if systems_members_uri:
+            systems_members_response = _redfishobj.get(systems_members_uri)
 
     if systems_members_response:
-        print("\n\nShowing bios attributes before changes:\n\n")
-        print(json.dumps(systems_members_response.dict.get('Boot'), indent=4, sort_keys=True))
+        show(systems_members_response.dict.get('Boot'), 'boot_before', title="\n\nShowing "\
+                                                        "bios attributes before changes:\n\n")
     body = {'Boot': {'BootSourceOverrideTarget': boottarget}}
     resp = _redfishobj.patch(systems_members_uri, body)
 
@@ -51,7 +53,7 @@ def change_temporary_boot_order(_redfishobj, boottarget):
     #error message to see what went wrong
     if resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception as excp:
             sys.stderr.write("A response error occurred, unable to access iLO Extended Message "\
                              "Info...")
@@ -59,10 +61,10 @@ def change_temporary_boot_order(_redfishobj, boottarget):
         sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
     else:
         print("\nSuccess!\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
         if systems_members_response:
-            print("\n\nShowing boot override target:\n\n")
-            print(json.dumps(systems_members_response.dict.get('Boot'), indent=4, sort_keys=True))
+            show(systems_members_response.dict.get('Boot'), title="\n\nShowing boot override "\
+                                                                                "target:\n\n")
 
 if __name__ == "__main__":
     module = AnsibleModule(
@@ -89,16 +91,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     change_temporary_boot_order(REDFISHOBJ, TEMP_DEVICE)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
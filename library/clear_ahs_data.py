@@ -18,12 +18,15 @@ An example of clearing AHS data for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def clear_ahs_data(_redfishobj):
 
@@ -41,24 +44,21 @@ def clear_ahs_data(_redfishobj):
         active_health_system_clear_log_uri = active_health_system_response.obj['Actions']\
                                             ['#HpeiLOActiveHealthSystem.ClearLog']['target']
     else:
-        for instance in resource_instances:
-            if '#HpeiLOActiveHealthSystem.' in instance['@odata.type']:
-                active_health_system_uri = instance['@odata.id']
-                active_health_system_response = _redfishobj.get(active_health_system_uri)
-                active_health_system_clear_log_uri = active_health_system_response['Actions']\
-                                                    ['#HpeiLOActiveHealthSystem.ClearLog']['target']
-            break
+        active_health_system_uri = find_resource_uri(_redfishobj, 'HpeiLOActiveHealthSystem')
+        if active_health_system_uri:
+            active_health_system_response = _redfishobj.get(active_health_system_uri)
+            active_health_system_clear_log_uri = active_health_system_response.obj['Actions']\
+                                                ['#HpeiLOActiveHealthSystem.ClearLog']['target']
 
     if active_health_system_clear_log_uri:
         body = {"Action": "HpeiLOActiveHealthSystem.ClearLog"}
-        resp = _redfishobj.redfish_client.post(active_health_system_clear_log_uri, body)
+        resp = _redfishobj.post(active_health_system_clear_log_uri, body)
 
         #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4,\
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended " \
                                  "Message Info...")
@@ -66,7 +66,7 @@ def clear_ahs_data(_redfishobj):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
 
 if __name__ == "__main__":
     module = AnsibleModule(
@@ -90,16 +90,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     clear_ahs_data(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
     
@@ -18,11 +18,14 @@ An example of clearing IEL or IML Logs for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uris
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def clear_ilo_event_log(_redfishobj, clear_IML_IEL):
 
@@ -44,11 +47,9 @@ def clear_ilo_event_log(_redfishobj, clear_IML_IEL):
             clear_log_services_uri.append(log_services_response.obj['Actions']\
                                                                 ['#LogService.ClearLog']['target'])
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#LogService.' in instance['@odata.type']:
-                log_service_uri = instance['@odata.id']
-                clear_log_services_uri.append(_redfishobj.get(log_service_uri).dict['Actions']\
+        #Use Resource directory to find the relevant URI
+        for log_service_uri in find_resource_uris(_redfishobj, 'LogService'):
+            clear_log_services_uri.append(_redfishobj.get(log_service_uri).dict['Actions']\
                                                                 ['#LogService.ClearLog']['target'])
 
     if clear_log_services_uri:
@@ -67,8 +68,7 @@ def clear_ilo_event_log(_redfishobj, clear_IML_IEL):
             #info error message to see what went wrong
             if resp.status == 400:
                 try:
-                    print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                    sort_keys=True))
+                    show(decode_extended_info(_redfishobj, resp.dict), 'messages')
                 except Exception as excp:
                     sys.stderr.write("A response error occurred, unable to access iLO "\
                                      "Extended Message Info...\n")
@@ -76,7 +76,7 @@ def clear_ilo_event_log(_redfishobj, clear_IML_IEL):
                 sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
             else:
                 print("Success!\n")
-                print(json.dumps(resp.dict, indent=4, sort_keys=True))
+                show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -111,16 +111,14 @@ if __name__ == "__main__":
     CLEAR_IML_IEL = "IML" # provide either the string IML or IEL
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     clear_ilo_event_log(REDFISHOBJ, CLEAR_IML_IEL)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
@@ -0,0 +1,125 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Helpers for reading the members of Redfish collections on HPE iLO systems
+"""
+
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of member GETs in flight at once. 1 fetches members one after another.
+DEFAULT_MAX_WORKERS = 4
+# iLO answers with these when it is too busy to serve more requests
+THROTTLE_STATUSES = [429, 503]
+# Attempts per member once iLO is throttling, and the wait when no Retry-After is sent
+SERIAL_RETRIES = 3
+SERIAL_RETRY_WAIT = 1
+
+def _retry_after(response):
+    try:
+        return int(response.getheader('retry-after'))
+    except (TypeError, ValueError):
+        return SERIAL_RETRY_WAIT
+
+def allows_concurrency(_redfishobj):
+    """True when requests may be sent on the client from several threads at once. Only
+    http(s) clients qualify; the local (blobstore) channel serves one request at a time."""
+    return (getattr(_redfishobj, 'base_url', '') or '').startswith('http')
+
+def _get_serial(_redfishobj, uri):
+    response = _redfishobj.get(uri)
+    for attempt in range(1, SERIAL_RETRIES):
+        if response.status not in THROTTLE_STATUSES:
+            break
+        time.sleep(_retry_after(response) * attempt)
+        response = _redfishobj.get(uri)
+    return response
+
+def get_members(_redfishobj, member_uris, max_workers=DEFAULT_MAX_WORKERS):
+    """GET every member URI with up to max_workers requests in flight and return the
+    responses in member order. Once iLO answers 503 or 429 no more concurrent requests
+    are started and the remaining members are fetched one at a time. Local (blobstore)
+    clients always fetch one at a time."""
+    responses = [None] * len(member_uris)
+    throttled = threading.Event()
+
+    def _fetch(idx):
+        if throttled.is_set():
+            return
+        response = _redfishobj.get(member_uris[idx])
+        if response.status in THROTTLE_STATUSES:
+            throttled.set()
+        else:
+            responses[idx] = response
+
+    if max_workers > 1 and len(member_uris) > 1 and allows_concurrency(_redfishobj):
+        pool = ThreadPoolExecutor(max_workers=min(max_workers, len(member_uris)))
+        try:
+            list(pool.map(_fetch, range(len(member_uris))))
+        finally:
+            pool.shutdown(wait=True)
+        if throttled.is_set():
+            sys.stderr.write("iLO is throttling requests, fetching the remaining members "\
+                             "serially.\n")
+
+    for idx, uri in enumerate(member_uris):
+        if responses[idx] is None:
+            responses[idx] = _get_serial(_redfishobj, uri)
+    return responses
+
+def _expand_query(levels):
+    if levels:
+        return '?$expand=.($levels=%d)' % levels
+    return '?$expand=.'
+
+def _is_expanded(member):
+    return any(key != '@odata.id' for key in member)
+
+def read_collection(_redfishobj, collection_uri, levels=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Return the member resources of a collection in member order. The collection is read
+    with $expand=. (and $levels when given) so iLO can return every member in one response;
+    members missing from the expansion, or every member when iLO does not support $expand,
+    are fetched individually with get_members()."""
+    members = []
+    #set on the client once its iLO rejected $expand
+    expand = not getattr(_redfishobj, 'ilorest_no_expand', False)
+    if expand:
+        response = _redfishobj.get(collection_uri + _expand_query(levels))
+        if response.status != 200 or 'Members' not in response.dict:
+            _redfishobj.ilorest_no_expand = True
+            expand = False
+    if not expand:
+        response = _redfishobj.get(collection_uri)
+
+    while True:
+        members.extend(response.dict.get('Members', []))
+        uri = response.dict.get('Members@odata.nextLink')
+        if not uri:
+            break
+        response = _redfishobj.get(uri)
+
+    missing = [idx for idx, member in enumerate(members) if not _is_expanded(member)]
+    if missing:
+        if expand:
+            sys.stdout.write("\t%d of %d members of %s were not expanded, fetching them "\
+                             "individually\n" % (len(missing), len(members), collection_uri))
+        responses = get_members(_redfishobj, [members[idx]['@odata.id'] for idx in missing], \
+                                                                                    max_workers)
+        for idx, member_response in zip(missing, responses):
+            members[idx] = member_response.dict
+    return members
@@ -32,13 +32,15 @@ EXAMPLES = '''
 
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from module_output import show, module_results
 
 def computer_details(_redfishobj):
     systems_members_uri = None
@@ -53,14 +55,13 @@ def computer_details(_redfishobj):
         systems_members_uri = next(iter(systems_response.obj['Members']))['@odata.id']
         systems_members_response = _redfishobj.get(systems_members_uri)
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#ComputerSystem.' in instance['@odata.type']:
-                systems_members_uri = instance['@odata.id']
-                systems_members_response = _redfishobj.get(systems_members_uri)
+        #Use Resource directory to find the relevant URI
+        systems_members_uri = find_resource_uri(_redfishobj, 'ComputerSystem')
+        if systems_members_uri:
+            systems_members_response = _redfishobj.get(systems_members_uri)
 
-    print("\n\nPrinting computer system details:\n\n")
-    print(json.dumps(systems_members_response.dict, indent=4, sort_keys=True))
+    show(systems_members_response.dict, 'computer_system', title="\n\nPrinting computer "\
+                                                                    "system details:\n\n")
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -89,16 +90,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     computer_details(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
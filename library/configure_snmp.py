@@ -29,17 +29,22 @@ EXAMPLES = '''
     name: "Configure SNMP"
     enabled: True
     snmp_mode: 'Agentless'
-    snmp_alert: False
+    snmp_alerts: False
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def configure_snmp(_redfishobj, read_communities, snmp_alerts):
+    """PATCH the SNMP service of iLO. Returns True when iLO accepted the settings."""
 
     snmp_service_uri = None
 
@@ -53,10 +58,8 @@ def configure_snmp(_redfishobj, read_communities, snmp_alerts):
         managers_members_response = _redfishobj.get(managers_members_uri)
         snmp_service_uri = managers_members_response.obj.Oem.Hpe.Links['Snmp']['@odata.id']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#HpeiLOSnmpService.' in instance['@odata.type']:
-                snmp_service_uri = instance['@odata.id']
+        #Use Resource directory to find the relevant URI
+        snmp_service_uri = find_resource_uri(_redfishobj, 'HpeiLOSnmpService')
 
     if snmp_service_uri:
         body = {"AlertsEnabled": snmp_alerts, "ReadCommunities": read_communities}
@@ -66,8 +69,7 @@ def configure_snmp(_redfishobj, read_communities, snmp_alerts):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -75,7 +77,9 @@ def configure_snmp(_redfishobj, read_communities, snmp_alerts):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
+            return True
+    return False
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -114,14 +118,15 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    configure_snmp(REDFISHOBJ, READ_COMMUNITIES, ALERTS_ENABLED, DISABLE_RESOURCE_DIR)
-    REDFISHOBJ.logout()
+    CONFIGURED = configure_snmp(REDFISHOBJ, READ_COMMUNITIES, ALERTS_ENABLED)
+    release_redfish_client(REDFISHOBJ)
+    if not CONFIGURED:
+        module.fail_json(msg="Unable to configure SNMP.", results=module_results())
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -18,13 +18,16 @@ An example of enabling secure boot
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, VERBOSE, module_results
 
 def enable_secure_boot(_redfishobj, secure_boot_enable):
 
@@ -42,14 +45,14 @@ def enable_secure_boot(_redfishobj, secure_boot_enable):
         secure_boot_data = _redfishobj.get(secure_boot_uri)
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#SecureBoot.' in instance['@odata.type']:
-                secure_boot_uri = instance['@odata.id']
-                secure_boot_data = _redfishobj.get(secure_boot_uri)
+        secure_boot_uri = find_resource_uri(_redfishobj, 'SecureBoot')
+        if secure_boot_uri:
+            secure_boot_data = _redfishobj.get(secure_boot_uri)
 
     if secure_boot_data:
-        print("\n\nShowing Secure Boot properties before changes:\n\n")
-        print(json.dumps(secure_boot_data.dict, indent=4, sort_keys=True))
+        show(secure_boot_data.dict, 'secure_boot_before', ['SecureBootEnable', \
+                'SecureBootCurrentBoot', 'SecureBootMode'], "\n\nShowing Secure Boot "\
+                                                            "properties before changes:\n\n")
 
     if secure_boot_uri:
         body = {'SecureBootEnable': secure_boot_enable}
@@ -58,8 +61,7 @@ def enable_secure_boot(_redfishobj, secure_boot_enable):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended " \
                                  "Message Info...")
@@ -67,10 +69,11 @@ def enable_secure_boot(_redfishobj, secure_boot_enable):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("\nSuccess!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
-            print("\n\nShowing Secure Boot properties after changes:\n\n")
-            secure_boot_data = _redfishobj.get(secure_boot_uri)
-            print(json.dumps(secure_boot_data.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
+            #the properties are only read back to be printed
+            if VERBOSE:
+                show(_redfishobj.get(secure_boot_uri).dict, title="\n\nShowing Secure Boot "\
+                                                            "properties after changes:\n\n")
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -110,16 +113,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     enable_secure_boot(REDFISHOBJ, SECURE_BOOT_ENABLE)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
@@ -0,0 +1,61 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Read-modify-write of HPE iLO resources guarded by ETag/If-Match
+"""
+
+import sys
+
+# Read-modify-write cycles tried when iLO answers 412 Precondition Failed
+DEFAULT_RETRIES = 3
+
+def resource_etag(response):
+    """ETag of a GET response, from the header or else the @odata.etag property"""
+    return response.getheader('etag') or (response.dict or {}).get('@odata.etag')
+
+def carries_representation(body):
+    """True when a PATCH response body is the updated resource rather than only messages"""
+    return bool(body) and '@odata.id' in body
+
+def patch_if_match(_redfishobj, uri, build_body, response=None, confirm=False, \
+                                                                    retries=DEFAULT_RETRIES):
+    """GET uri (or use response, an earlier GET of it, the first time), PATCH the body
+    returned by build_body(resource) with If-Match set to the ETag read, and redo both when
+    iLO answers 412 because the resource changed in between. build_body may return None to
+    skip the PATCH. Returns (patch response or None, resource read, updated resource), where
+    the updated resource is the PATCH response when it carries one, else a new GET when
+    confirm is set, else None."""
+    resp = None
+    for _ in range(retries):
+        response = response or _redfishobj.get(uri)
+        current = response.dict
+        body = build_body(current)
+        if body is None:
+            return None, current, None
+        tag = resource_etag(response)
+        resp = _redfishobj.patch(uri, body, headers={'If-Match': tag} if tag else None)
+        if resp.status != 412:
+            break
+        sys.stdout.write("%s was changed by someone else, reading it again.\n" % uri)
+        response = None
+
+    updated = None
+    if resp.status in [200, 204]:
+        if carries_representation(resp.dict):
+            updated = resp.dict
+        elif confirm:
+            updated = _redfishobj.get(uri).dict
+    return resp, current, updated
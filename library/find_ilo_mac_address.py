@@ -31,12 +31,13 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
 
 def find_ilo_mac_address(_redfishobj):
     
@@ -60,14 +61,12 @@ def find_ilo_mac_address(_redfishobj):
             ethernet_data[_member['@odata.id']] = _tmp
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#EthernetInterfaceCollection.' in instance['@odata.type'] and 'Managers' in \
-                                                                        instance['@odata.id']:
-                ethernet_uri = instance['@odata.id']
-                ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
-                for _ethernet_interface in ethernet_interfaces:
-                    ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
-                                                        get(_ethernet_interface['@odata.id']).dict
+        ethernet_uri = find_resource_uri(_redfishobj, 'EthernetInterfaceCollection', 'Managers')
+        if ethernet_uri:
+            ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
+            for _ethernet_interface in ethernet_interfaces:
+                ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
+                                                    get(_ethernet_interface['@odata.id']).dict
     for iface in ethernet_data:
         sys.stdout.write("iLO Network Manager Interface: \'%s\'\n" % ethernet_data[iface]['Id'])
         sys.stdout.write("\tiLO Mac Address: \'%s\'\n" % ethernet_data[iface].get('MACAddress'))
@@ -99,16 +98,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     find_ilo_mac_address(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
   
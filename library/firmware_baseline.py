@@ -0,0 +1,151 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of checking the firmware inventory of HPE iLO systems against a baseline
+"""
+DOCUMENTATION = '''
+---
+module: firmware_baseline
+short_description: Compares the firmware inventory with a baseline and returns a flash plan
+'''
+
+EXAMPLES = '''
+- name: Check firmware against the baseline
+  firmware_baseline:
+    name: "Firmware baseline"
+    enabled: True
+    baseline:
+      - name: "iLO 5"
+        version: "2.33"
+        image: "http://10.0.0.1/ilo5_233.bin"
+      - name: "System ROM"
+        version: "2.42"
+        image: "http://10.0.0.1/U30_2.42_03_09_2021.fwpkg"
+  register: compliance
+
+- name: Flash what is behind the baseline
+  update_ilo_firmware:
+    name: "Update {{ item.name }}"
+    enabled: True
+    firmware_url: "{{ item.image }}"
+    tpm_flag: True
+    component_name: "{{ item.name }}"
+    target_version: "{{ item.version }}"
+  loop: "{{ compliance.plan }}"
+'''
+
+import re
+import sys
+from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from ansible.module_utils.basic import *
+
+from get_resource_directory import resource_directory_cache_stats
+from http_trace import http_trace_summary
+from collection_reader import read_collection
+
+def parse_version(version):
+    """Turn an inventory version string into a comparable tuple. Prefers a dotted number, so
+    '2.30 Aug 20 2020' gives (2, 30) and 'U30 v2.36 (07/16/2020)' gives (2, 36)."""
+    match = re.search(r'(\d+(?:\.\d+)+)', str(version)) or re.search(r'(\d+)', str(version))
+    if not match:
+        return ()
+    return tuple(int(part) for part in match.group(1).split('.'))
+
+def get_firmware_inventory(_redfishobj):
+    """Return the FirmwareInventory members of an iLO"""
+    update_service_uri = _redfishobj.root.obj['UpdateService']['@odata.id']
+    inventory_uri = _redfishobj.get(update_service_uri).dict['FirmwareInventory']['@odata.id']
+    return read_collection(_redfishobj, inventory_uri)
+
+def _matches(item, component):
+    name = component['name'].lower()
+    if name not in [str(item.get('Name', '')).lower(), str(item.get('Description', '')).lower()]:
+        return False
+    context = component.get('context')
+    return not context or context == item.get('Oem', {}).get('Hpe', {}).get('DeviceContext')
+
+def compare_baseline(inventory, baseline, allow_downgrade=False):
+    """Compare inventory items with baseline entries ({name, version, image, context}). Returns
+    the flash plan, one entry per baseline component with at least one device behind it, plus
+    the compliant, newer and missing components."""
+    report = {'plan': [], 'compliant': [], 'newer': [], 'missing': []}
+    for component in baseline:
+        devices = [item for item in inventory if _matches(item, component)]
+        if not devices:
+            report['missing'].append(component['name'])
+            continue
+        target = parse_version(component['version'])
+        behind = [item for item in devices if parse_version(item.get('Version')) < target]
+        ahead = [item for item in devices if parse_version(item.get('Version')) > target]
+        current = [item.get('Version') for item in devices]
+        if behind or (ahead and allow_downgrade):
+            entry = dict(component)
+            entry['current'] = current
+            report['plan'].append(entry)
+        elif ahead:
+            report['newer'].append({'name': component['name'], 'current': current, \
+                                    'version': component['version']})
+        else:
+            report['compliant'].append(component['name'])
+    return report
+
+def component_is_current(_redfishobj, component_name, target_version):
+    """True when every device named component_name is already at target_version or newer.
+    False when one is behind or no such device is found."""
+    report = compare_baseline(get_firmware_inventory(_redfishobj), [{'name': component_name, \
+                                                                    'version': target_version}])
+    return not report['plan'] and not report['missing']
+
+if __name__ == "__main__":
+    module = AnsibleModule(
+        argument_spec = dict(
+            name      = dict(required=True),
+            enabled   = dict(required=True, type='bool'),
+            baseline  = dict(required=True, type='list'),
+            allow_downgrade = dict(required=False, type='bool', default=False)
+        )
+    )
+
+    # When running remotely connect using the secured (https://) address,
+    # account name, and password to send https requests
+    # SYSTEM_URL acceptable examples:
+    # "https://10.0.0.100"
+    # "https://ilo.hostname"
+    SYSTEM_URL = "blobstore://."
+    LOGIN_ACCOUNT = "None"
+    LOGIN_PASSWORD = "None"
+
+    BASELINE = module.params['baseline']
+    for COMPONENT in BASELINE:
+        if 'name' not in COMPONENT or 'version' not in COMPONENT:
+            module.fail_json(msg="Each baseline entry needs a name and a version.")
+
+    try:
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
+    except ServerDownOrUnreachableError as excp:
+        sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
+        sys.exit()
+
+    REPORT = compare_baseline(get_firmware_inventory(REDFISHOBJ), BASELINE, \
+                                                            module.params['allow_downgrade'])
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=False, compliant=not REPORT['plan'], plan=REPORT['plan'], \
+                     compliant_components=REPORT['compliant'], newer=REPORT['newer'], \
+                     missing=REPORT['missing'], \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
@@ -0,0 +1,175 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of rolling a firmware update across many HPE iLO systems in a sliding window
+"""
+DOCUMENTATION = '''
+---
+module: firmware_rollout
+short_description: Flashes firmware on a list of iLOs, a window of them at a time, resumably
+'''
+
+EXAMPLES = '''
+- name: Roll iLO 5 2.33 across the rack
+  firmware_rollout:
+    name: "iLO firmware rollout"
+    enabled: True
+    firmware_url: "http://10.0.0.1/ilo5_233.bin"
+    tpm_flag: True
+    component_name: "iLO 5"
+    target_version: "2.33"
+    window: 8
+    max_failure_rate: 0.1
+    endpoints: "{{ ilo_endpoints }}"
+'''
+
+import os
+import time
+import hashlib
+from ansible.module_utils.basic import *
+
+from get_resource_directory import CACHE_DIR, read_cache_file, write_cache_file, \
+                                                                resource_directory_cache_stats
+from http_trace import http_trace_summary
+from session_broker import drop_session
+from fleet import run_fleet, get_operation, ENDPOINT_OPTIONS
+from firmware_baseline import component_is_current
+from task_wait import UPDATE_FAILED_STATES, DEFAULT_TIMEOUT
+
+# iLOs flashed at once
+DEFAULT_WINDOW = 8
+# Fraction of finished iLOs allowed to fail before the rest of the rollout is called off
+DEFAULT_MAX_FAILURE_RATE = 0.1
+# Seconds allowed on top of the flash timeout for logging in, the baseline check and the reset
+HOST_TIMEOUT_MARGIN = 300
+
+class FirmwareRolloutError(Exception):
+    """Raised when the firmware of one iLO could not be flashed"""
+
+def flash_host(_redfishobj, fw_url, tpm_flag, component_name=None, target_version=None, \
+                reset=False, timeout=DEFAULT_TIMEOUT, disable_resource_dir=True):
+    """Flash one iLO and wait for the flash, skipping it when the component is already at the
+    target version, then reset the iLO when asked. Returns the final update state."""
+    if component_name and target_version and \
+                            component_is_current(_redfishobj, component_name, target_version):
+        return {'State': 'Current', 'timed_out': False}
+    update_ilo_firmware = get_operation('update_ilo_firmware', disable_resource_dir)
+    state = update_ilo_firmware(_redfishobj, fw_url, tpm_flag, True, timeout)
+    if not state:
+        raise FirmwareRolloutError("Unable to start the firmware update")
+    if state['timed_out']:
+        raise FirmwareRolloutError("Update still running after %d seconds" % timeout)
+    if state.get('State') in UPDATE_FAILED_STATES or \
+                            state.get('TaskState') in ['Exception', 'Killed', 'Cancelled']:
+        raise FirmwareRolloutError("Firmware update ended in %s" % (state.get('State') or \
+                                                                        state.get('TaskState')))
+    if reset:
+        if not get_operation('reset_ilo', disable_resource_dir)(_redfishobj):
+            raise FirmwareRolloutError("Firmware flashed but the iLO reset failed")
+        #the reset ended the session, so there is nothing to log out of
+        drop_session(_redfishobj)
+    return state
+
+def rollout_state_file(fw_url, component_name=None, target_version=None):
+    """Journal of a rollout, named after what is being flashed so reruns find it"""
+    key = hashlib.sha1(("%s|%s|%s" % (fw_url, component_name, target_version))\
+                                                                .encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, "rollout_%s.json" % key[:16])
+
+def roll_out(endpoints, fw_url, tpm_flag, component_name=None, target_version=None, \
+             reset=False, window=DEFAULT_WINDOW, max_failure_rate=DEFAULT_MAX_FAILURE_RATE, \
+             timeout=DEFAULT_TIMEOUT, state_file=None, disable_resource_dir=True):
+    """Flash every endpoint with at most window iLOs in flight, starting the next iLO as soon
+    as one finishes. Once window iLOs have finished, the rollout stops starting new ones when
+    more than max_failure_rate of them failed. Every finished iLO is written to state_file,
+    and iLOs already flashed by an earlier run are skipped. Returns the journal."""
+    state_file = state_file or rollout_state_file(fw_url, component_name, target_version)
+    journal = read_cache_file(state_file) or {}
+    journal.setdefault('hosts', {})
+    journal.update({'firmware_url': fw_url, 'aborted': False, 'started': time.time()})
+    todo = [endpoint for endpoint in endpoints if journal['hosts'].get(endpoint['baseuri'], \
+                                                                        {}).get('status') != 'ok']
+    counts = {'finished': 0, 'failed': 0}
+
+    def on_result(host, result):
+        journal['hosts'][host] = dict((key, value) for key, value in result.items() if key != \
+                                                                                    'output')
+        journal['hosts'][host]['finished'] = time.time()
+        counts['finished'] += 1
+        if result['status'] != 'ok':
+            counts['failed'] += 1
+        if counts['finished'] >= min(window, len(todo)) and \
+                            counts['failed'] > max_failure_rate * counts['finished']:
+            journal['aborted'] = True
+        write_cache_file(state_file, journal)
+        return journal['aborted']
+
+    args = [fw_url, tpm_flag, component_name, target_version, reset, timeout, \
+                                                                        disable_resource_dir]
+    results = run_fleet(flash_host, todo, args, window, timeout + HOST_TIMEOUT_MARGIN, on_result)
+    journal['remaining'] = [endpoint['baseuri'] for endpoint in todo if endpoint['baseuri'] \
+                                                                                not in results]
+    journal['state_file'] = state_file
+    write_cache_file(state_file, journal)
+    for host, result in results.items():
+        journal['hosts'][host]['output'] = result.get('output', '')
+    return journal
+
+if __name__ == "__main__":
+    module = AnsibleModule(
+        argument_spec = dict(
+            name             = dict(required=True),
+            enabled          = dict(required=True, type='bool'),
+            endpoints        = dict(required=True, type='list', elements='dict', \
+                                                                options=ENDPOINT_OPTIONS),
+            firmware_url     = dict(required=True, type='str'),
+            tpm_flag         = dict(required=True, type='bool'),
+            component_name   = dict(required=False, type='str', default=None),
+            target_version   = dict(required=False, type='str', default=None),
+            reset            = dict(required=False, type='bool', default=False),
+            window           = dict(required=False, type='int', default=DEFAULT_WINDOW),
+            max_failure_rate = dict(required=False, type='float', \
+                                                            default=DEFAULT_MAX_FAILURE_RATE),
+            timeout          = dict(required=False, type='int', default=DEFAULT_TIMEOUT),
+            state_file       = dict(required=False, type='str', default=None),
+            disable_resource_dir = dict(required=False, type='bool', default=True)
+        )
+    )
+
+    JOURNAL = roll_out(module.params['endpoints'], module.params['firmware_url'], \
+                       module.params['tpm_flag'], module.params['component_name'], \
+                       module.params['target_version'], module.params['reset'], \
+                       module.params['window'], module.params['max_failure_rate'], \
+                       module.params['timeout'], module.params['state_file'], \
+                       module.params['disable_resource_dir'])
+
+    SUMMARY = {}
+    FLASHED = False
+    for BASEURI in [ENDPOINT['baseuri'] for ENDPOINT in module.params['endpoints']]:
+        RESULT = JOURNAL['hosts'].get(BASEURI, {'status': 'not_started'})
+        SUMMARY[RESULT['status']] = SUMMARY.get(RESULT['status'], 0) + 1
+        if 'output' in RESULT and RESULT['status'] == 'ok' and \
+                                            RESULT.get('result', {}).get('State') != 'Current':
+            FLASHED = True
+    if JOURNAL['aborted'] or SUMMARY.get('ok', 0) < len(module.params['endpoints']):
+        module.fail_json(msg="Firmware rollout %s, rerun to resume." % ("aborted after too "\
+                         "many failures" if JOURNAL['aborted'] else "incomplete"), \
+                         changed=FLASHED, hosts=JOURNAL['hosts'], summary=SUMMARY, \
+                         remaining=JOURNAL['remaining'], state_file=JOURNAL['state_file'])
+    module.exit_json(changed=FLASHED, hosts=JOURNAL['hosts'], summary=SUMMARY, \
+                     state_file=JOURNAL['state_file'], \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
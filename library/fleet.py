@@ -0,0 +1,231 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of running one library operation against many HPE iLO systems at once
+"""
+DOCUMENTATION = '''
+---
+module: fleet
+short_description: Runs a library operation concurrently against a list of iLOs
+'''
+
+EXAMPLES = '''
+- name: Gather computer details from every iLO in one task
+  fleet:
+    name: "Fleet computer details"
+    enabled: True
+    operation: computer_details
+    max_concurrency: 32
+    timeout: 120
+    endpoints:
+      - baseuri: 10.0.0.100
+        username: admin
+        password: password
+      - baseuri: 10.0.0.101
+        username: admin
+        password: password
+
+- name: Set the asset tag on every iLO
+  fleet:
+    name: "Fleet asset tag"
+    enabled: True
+    operation: set_server_asset_tag.set_server_asset_tag
+    args: ["rack-12"]
+    endpoints: "{{ ilo_endpoints }}"
+'''
+
+import sys
+import json
+import time
+import importlib
+import threading
+from six.moves import queue
+from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from ansible.module_utils.basic import *
+
+from get_resource_directory import resource_directory_cache_stats
+from module_output import module_results
+from http_trace import http_trace_summary
+
+# Number of iLOs worked on at once
+DEFAULT_MAX_CONCURRENCY = 16
+# Seconds one iLO may take before it is reported as timed out
+DEFAULT_TIMEOUT = 300
+# Suboptions of an endpoints list entry, so Ansible masks each endpoint password
+ENDPOINT_OPTIONS = dict(
+    baseuri  = dict(required=True, type='str'),
+    username = dict(required=False, type='str'),
+    password = dict(required=False, type='str', no_log=True)
+)
+
+class _ThreadOutput(object):
+    """Stand-in for sys.stdout/sys.stderr that keeps what each worker thread writes apart, so
+    the output of one iLO does not interleave with another's"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def capture(self):
+        self.local.buffer = []
+
+    def release(self):
+        captured = ''.join(getattr(self.local, 'buffer', None) or [])
+        self.local.buffer = None
+        return captured
+
+    def write(self, data):
+        buf = getattr(self.local, 'buffer', None)
+        if buf is None:
+            return self.stream.write(data)
+        buf.append(data)
+
+    def flush(self):
+        self.stream.flush()
+
+def get_operation(operation, disable_resource_dir=False):
+    """Resolve 'module' or 'module.function' to a library function taking a client first"""
+    module_name, _, function_name = operation.partition('.')
+    library_module = importlib.import_module(module_name)
+    #the library functions read this flag, which their own __main__ normally sets
+    library_module.DISABLE_RESOURCE_DIR = disable_resource_dir
+    return getattr(library_module, function_name or module_name)
+
+def _system_url(endpoint):
+    baseuri = endpoint['baseuri']
+    return baseuri if '://' in baseuri else "https://" + baseuri
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+def _run_endpoint(function, args, endpoint, started, stdout, stderr, timeout=None):
+    host = endpoint['baseuri']
+    started[host] = time.time()
+    stdout.capture()
+    stderr.capture()
+    result = {'status': 'ok'}
+    try:
+        _redfishobj = get_redfish_client(_system_url(endpoint), endpoint.get('username'), \
+                                                    endpoint.get('password'), timeout)
+        try:
+            result['result'] = _jsonable(function(_redfishobj, *args))
+        finally:
+            #the result stands even if iLO went away (e.g. reset) before the logout
+            try:
+                release_redfish_client(_redfishobj)
+            except Exception as excp:
+                sys.stderr.write("Logout failed: %s\n" % excp)
+    except ServerDownOrUnreachableError:
+        result = {'status': 'unreachable', 'error': "server not reachable or does not "\
+                                                                        "support RedFish."}
+    except Exception as excp:
+        result = {'status': 'failed', 'error': "%s: %s" % (type(excp).__name__, excp)}
+    #each worker runs in its own thread, so these are the results of this iLO only
+    results = module_results()
+    if results:
+        result['results'] = results
+    result['seconds'] = round(time.time() - started[host], 3)
+    result['output'] = stdout.release() + stderr.release()
+    return result
+
+def run_fleet(function, endpoints, args=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, \
+                                                    timeout=DEFAULT_TIMEOUT, on_result=None):
+    """Call function(client, *args) for every endpoint ({baseuri, username, password}) with at
+    most max_concurrency iLOs in flight. Returns {baseuri: result}. An iLO still running after
+    timeout seconds is reported as 'timeout' and its slot goes to the next iLO; its daemon
+    worker is abandoned, and its requests fail on their own socket timeout. on_result(baseuri,
+    result) is called as each iLO finishes; when it returns True, iLOs not yet started are
+    dropped from the run."""
+    args = args or []
+    results = {}
+    started = {}
+    running = {}
+    todo = list(endpoints)
+    finished = queue.Queue()
+    stdout, stderr = _ThreadOutput(sys.stdout), _ThreadOutput(sys.stderr)
+    sys.stdout, sys.stderr = stdout, stderr
+
+    def worker(endpoint):
+        finished.put((endpoint['baseuri'], _run_endpoint(function, args, endpoint, started, \
+                                                            stdout, stderr, timeout)))
+    try:
+        while todo or running:
+            while todo and len(running) < max(1, max_concurrency):
+                endpoint = todo.pop(0)
+                running[endpoint['baseuri']] = time.time()
+                #daemon, so a hung iLO cannot keep the module from exiting
+                thread = threading.Thread(target=worker, args=(endpoint,))
+                thread.daemon = True
+                thread.start()
+            done = []
+            try:
+                done.append(finished.get(timeout=1))
+                while True:
+                    done.append(finished.get_nowait())
+            except queue.Empty:
+                pass
+            now = time.time()
+            for host, start in list(running.items()):
+                if now - start > timeout:
+                    done.append((host, {'status': 'timeout', 'seconds': round(now - start, 3)}))
+            for host, result in done:
+                if host not in running:
+                    #late result of an iLO already reported as timed out
+                    continue
+                del running[host]
+                results[host] = result
+                if on_result and on_result(host, result):
+                    #iLOs already running are waited for, the queued ones are never started
+                    todo = []
+    finally:
+        sys.stdout, sys.stderr = stdout.stream, stderr.stream
+    return results
+
+if __name__ == "__main__":
+    module = AnsibleModule(
+        argument_spec = dict(
+            name            = dict(required=True),
+            enabled         = dict(required=True, type='bool'),
+            operation       = dict(required=True, type='str'),
+            args            = dict(required=False, type='list', default=[]),
+            endpoints       = dict(required=True, type='list', elements='dict', \
+                                                                options=ENDPOINT_OPTIONS),
+            max_concurrency = dict(required=False, type='int', default=DEFAULT_MAX_CONCURRENCY),
+            timeout         = dict(required=False, type='int', default=DEFAULT_TIMEOUT),
+            disable_resource_dir = dict(required=False, type='bool', default=False)
+        )
+    )
+
+    try:
+        OPERATION = get_operation(module.params['operation'], \
+                                                        module.params['disable_resource_dir'])
+    except (ImportError, AttributeError) as excp:
+        module.fail_json(msg="Unknown operation %s: %s" % (module.params['operation'], excp))
+
+    RESULTS = run_fleet(OPERATION, module.params['endpoints'], module.params['args'], \
+                        module.params['max_concurrency'], module.params['timeout'])
+
+    SUMMARY = {}
+    for RESULT in RESULTS.values():
+        SUMMARY[RESULT['status']] = SUMMARY.get(RESULT['status'], 0) + 1
+    module.exit_json(changed=SUMMARY.get('ok', 0) > 0, hosts=RESULTS, summary=SUMMARY, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
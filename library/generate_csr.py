@@ -16,16 +16,57 @@
 """
 An example of generating a certificate signing request for HPE iLO systems
 """
+import os
 import sys
-import json
-import time
-from redfish import RedfishClient
+import hashlib
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats, \
+                                                            read_cache_file, write_cache_file
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from task_wait import wait_until
+from message_registry import decode_extended_info
+from module_output import show, keep, module_results
 
-def generate_csr(_redfishobj, csr_file, csr_properties):
+# Seconds to wait for iLO to finish generating the CSR, and the first and longest wait
+# between polls of the HttpsCert resource
+CSR_TIMEOUT = 900
+CSR_POLL_INITIAL = 5
+CSR_POLL_MAX = 60
+
+def csr_fingerprint(csr):
+    """Short sha256 of a CSR, or None when there is none"""
+    return hashlib.sha256(csr.encode('utf-8')).hexdigest()[:16] if csr else None
+
+def wait_for_csr(_redfishobj, csr_uri, previous_fingerprint=None, timeout=CSR_TIMEOUT):
+    """Poll HttpsCert with growing waits until a CertificateSigningRequest other than the one
+    with previous_fingerprint appears. Returns the CSR, or None when timeout seconds pass
+    first."""
+    csr, timed_out = wait_until(lambda: _redfishobj.get(csr_uri).dict.get(\
+                                'CertificateSigningRequest'), lambda csr: csr and \
+                                csr_fingerprint(csr) != previous_fingerprint, timeout, \
+                                initial=CSR_POLL_INITIAL, maximum=CSR_POLL_MAX)
+    return None if timed_out else csr
+
+def _pending_file(csr_file):
+    #written next to csr_file while a generation started with wait False is outstanding
+    return csr_file + '.pending'
+
+def _save_csr(csr_file, csr):
+    with open(csr_file, 'w') as csroutput:
+        csroutput.write(csr)
+    sys.stdout.write("CSR Data saved to file: '%s'\n" % csr_file)
+
+def generate_csr(_redfishobj, csr_file, csr_properties, wait=True, collect=False, \
+                                                    timeout=CSR_TIMEOUT, previous_csr=None):
+    """Start CSR generation and save the CSR to csr_file once iLO has generated it.
+    With wait False only the generation is started, and the fingerprint of the CSR iLO held
+    before is kept as 'previous_csr' and next to csr_file. A later call with collect True
+    skips the GenerateCSR action and waits for a CSR other than that one (previous_csr, or
+    the one recorded next to csr_file). Returns 'ready', 'pending', 'timeout' or 'failed'."""
 
     csr_uri = None
     generate_csr_uri = None
@@ -43,51 +84,71 @@ def generate_csr(_redfishobj, csr_file, csr_properties):
         security_service_response = _redfishobj.get(security_service_uri)
         csr_uri = security_service_response.obj.Links['HttpsCert']['@odata.id']
         https_cert_response = _redfishobj.get(csr_uri)
-        generate_csr_uri = https_cert_response.obj['Actions']['#HpeHttpsCert.GenerateCSR']\
-                                                                                    ['target']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeHttpsCert.' in instance['@odata.type']:
-                csr_uri = instance['@odata.id']
-                generate_csr_uri = _redfishobj.get(csr_uri).obj['Actions']\
-                                                        ['#HpeHttpsCert.GenerateCSR']['target']
-                break
-
-    if generate_csr_uri:
-        body = dict()
-        body["Action"] = "HpeHttpsCert.GenerateCSR"
-        body["City"] = csr_properties["City"]
-        body["CommonName"] = csr_properties["CommonName"]
-        body["Country"] = csr_properties["Country"]
-        body["OrgName"] = csr_properties["OrgName"]
-        body["OrgUnit"] = csr_properties["OrgUnit"]
-        body["State"] = csr_properties["State"]
-        resp = _redfishobj.post(generate_csr_uri, body)
-        if resp.status in [200, 201]:
-            sys.stdout.write("Generating CSR, this may take a few minutes\n")
-            sys.stdout.write("Sleeping for 5 minutes...\n")
-            time.sleep(600)
-            csr_resp = _redfishobj.get(csr_uri).dict['CertificateSigningRequest']
-            with open(csr_file, 'wb') as csroutput:
-                csroutput.write(csr_resp)
-            sys.stdout.write("CSR Data saved to file: '%s'\n" % csr_file)
-        else:
-            #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended
-            #info error message to see what went wrong
-            if resp.status not in [200, 201]:
-                try:
-                    print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                    sort_keys=True))
-                except Exception as excp:
-                    sys.stderr.write("A response error occurred, unable to access iLO "\
-                                     "Extended Message Info...\n")
+        csr_uri = find_resource_uri(_redfishobj, 'HpeHttpsCert')
+        https_cert_response = _redfishobj.get(csr_uri) if csr_uri else None
+    if https_cert_response:
+        generate_csr_uri = https_cert_response.obj['Actions']['#HpeHttpsCert.GenerateCSR']\
+                                                                                    ['target']
+
+    if not generate_csr_uri:
+        return 'failed'
+
+    if collect:
+        previous_csr = previous_csr or (read_cache_file(_pending_file(csr_file)) or {}).get(\
+                                                                                'previous_csr')
+        csr = wait_for_csr(_redfishobj, csr_uri, previous_csr, timeout)
+        if not csr:
+            sys.stderr.write("No CSR was generated within %d seconds.\n" % timeout)
+            return 'timeout'
+        _save_csr(csr_file, csr)
+        if os.path.exists(_pending_file(csr_file)):
+            os.remove(_pending_file(csr_file))
+        return 'ready'
+
+    previous_csr = csr_fingerprint(https_cert_response.dict.get('CertificateSigningRequest'))
+    body = dict()
+    body["Action"] = "HpeHttpsCert.GenerateCSR"
+    body["City"] = csr_properties["City"]
+    body["CommonName"] = csr_properties["CommonName"]
+    body["Country"] = csr_properties["Country"]
+    body["OrgName"] = csr_properties["OrgName"]
+    body["OrgUnit"] = csr_properties["OrgUnit"]
+    body["State"] = csr_properties["State"]
+    resp = _redfishobj.post(generate_csr_uri, body)
+    if resp.status not in [200, 201]:
+        #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended
+        #info error message to see what went wrong
+        try:
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
+        except Exception as excp:
+            sys.stderr.write("A response error occurred, unable to access iLO "\
+                             "Extended Message Info...\n")
+        return 'failed'
+
+    sys.stdout.write("Generating CSR, this may take a few minutes\n")
+    if not wait:
+        keep('previous_csr', previous_csr)
+        write_cache_file(_pending_file(csr_file), {'previous_csr': previous_csr})
+        return 'pending'
+    csr = wait_for_csr(_redfishobj, csr_uri, previous_csr, timeout)
+    if not csr:
+        sys.stderr.write("No CSR was generated within %d seconds.\n" % timeout)
+        return 'timeout'
+    _save_csr(csr_file, csr)
+    return 'ready'
 
 if __name__ == "__main__":
     module = AnsibleModule(
         argument_spec = dict(            
             name      = dict(required=True),
-            enabled   = dict(required=True, type='bool')
+            enabled   = dict(required=True, type='bool'),
+            csr_file  = dict(required=False, type='str', default='csr.txt'),
+            wait      = dict(required=False, type='bool', default=True),
+            collect   = dict(required=False, type='bool', default=False),
+            timeout   = dict(required=False, type='int', default=CSR_TIMEOUT),
+            previous_csr = dict(required=False, type='str', default=None)
         )
     )
 
@@ -105,21 +166,29 @@ if __name__ == "__main__":
                 "OrgName": "Organization", "OrgUnit": "Unit", "State": "State"}
 
     #After CSR is generated, a file will be created and the CSR will be downloaded
-    CSR_FILE = "csr.txt"
+    CSR_FILE = module.params['csr_file']
+    #wait: False only starts generation; a later task with collect: True saves the CSR
+    WAIT = module.params['wait']
+    COLLECT = module.params['collect']
+    TIMEOUT = module.params['timeout']
+    #fingerprint returned by the wait: False task, else the one recorded next to CSR_FILE
+    PREVIOUS_CSR = module.params['previous_csr']
     # flag to force disable resource directory. Resource directory and associated operations are
     # intended for HPE servers.
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    generate_csr(REDFISHOBJ, CSR_FILE, CSR_DICT)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    CSR_STATUS = generate_csr(REDFISHOBJ, CSR_FILE, CSR_DICT, WAIT, COLLECT, TIMEOUT, \
+                                                                                PREVIOUS_CSR)
+    release_redfish_client(REDFISHOBJ)
+    if CSR_STATUS in ['failed', 'timeout']:
+        module.fail_json(msg="CSR generation %s." % CSR_STATUS, csr_status=CSR_STATUS)
+    module.exit_json(changed=not COLLECT, csr_status=CSR_STATUS, csr_file=CSR_FILE, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -18,12 +18,14 @@ An example of gathering ESKM data for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from module_output import show, module_results
 
 def get_ESKM(_redfishobj):
 
@@ -42,17 +44,12 @@ def get_ESKM(_redfishobj):
         security_service_response = _redfishobj.get(security_service_uri)
         security_service_eskm_uri = security_service_response.obj.Links['ESKM']['@odata.id']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#HpeESKM.' in instance['@odata.type']:
-                security_service_eskm_uri = instance['@odata.id']
-                break
+        #Use Resource directory to find the relevant URI
+        security_service_eskm_uri = find_resource_uri(_redfishobj, 'HpeESKM')
 
     if security_service_eskm_uri:
-        security_service_eskm_uri = _redfishobj.get(security_service_uri).obj.Links\
-                                                                            ['ESKM']['@odata.id']
         security_service_eskm_resp = _redfishobj.get(security_service_eskm_uri)
-        print(json.dumps(security_service_eskm_resp.dict, indent=4, sort_keys=True))
+        show(security_service_eskm_resp.dict, 'eskm')
 
 if __name__ == "__main__":
     module = AnsibleModule(
@@ -76,15 +73,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     get_ESKM(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
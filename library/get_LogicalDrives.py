@@ -18,16 +18,23 @@ An example of gathering the Logical Drives on an HPE iLO system
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from collection_reader import read_collection
+from module_output import show, keep, module_results
+
+# Logical drive properties returned as the module result
+LOGICAL_DRIVE_FIELDS = ['Id', 'LogicalDriveNumber', 'LogicalDriveName', 'Raid', 'CapacityMiB', \
+                        'Status', 'VolumeUniqueIdentifier']
 
 def get_SmartArray_LogicalDrives(_redfishobj):
 
-    smartstorage_response = []
+    smart_storage_arraycontrollers_uri = None
     smartarraycontrollers = dict()
 
     resource_instances = get_resource_directory(_redfishobj)
@@ -42,31 +49,31 @@ def get_SmartArray_LogicalDrives(_redfishobj):
                                                                 ['SmartStorage']['@odata.id']
         smart_storage_arraycontrollers_uri = _redfishobj.get(smart_storage_uri).obj.Links\
                                                                 ['ArrayControllers']['@odata.id']
-        smartstorage_response = _redfishobj.get(smart_storage_arraycontrollers_uri).obj['Members']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#HpeSmartStorageArrayController.' in instance['@odata.type']:
-                smartstorage_uri = instance['@odata.id']
-                smartstorage_response = _redfishobj.get(smartstorage_uri).obj['Members']
-                break
+        #Use Resource directory to find the relevant URI
+        smart_storage_arraycontrollers_uri = find_resource_uri(_redfishobj, \
+                                                    'HpeSmartStorageArrayControllerCollection')
+
+    if not smart_storage_arraycontrollers_uri:
+        return smartarraycontrollers
 
-    for controller in smartstorage_response:
-        smartarraycontrollers[controller['@odata.id']] = _redfishobj.get(controller['@odata.id']).\
-                                                                                                obj
+    for controller in read_collection(_redfishobj, smart_storage_arraycontrollers_uri):
+        smartarraycontrollers[controller['@odata.id']] = controller
         sys.stdout.write("Logical Drive URIs for Smart Storage Array Controller \'%s\' : \n" \
-                                        % smartarraycontrollers[controller['@odata.id']].get('Id'))
-        logicaldrives_uri = smartarraycontrollers[controller['@odata.id']].Links\
-                                                                    ['LogicalDrives']['@odata.id']
-        logicaldrives_resp = _redfishobj.get(logicaldrives_uri)
-        smartarraycontrollers[controller['@odata.id']]['LogicalDrives'] = logicaldrives_resp.dict\
-                                                                                        ['Members']
-        if not logicaldrives_resp.dict['Members']:
+                                                                            % controller.get('Id'))
+        logicaldrives_uri = controller['Links']['LogicalDrives']['@odata.id']
+        logicaldrives = read_collection(_redfishobj, logicaldrives_uri)
+        controller['LogicalDrives'] = logicaldrives
+        if not logicaldrives:
             sys.stderr.write("\tLogical drives are not available for this controller.\n")
-        for drives in logicaldrives_resp.dict['Members']:
-            sys.stdout.write("\t An associated logical drive: %s\n" % drives)
-            drive_data = _redfishobj.get(drives).dict
-            print(json.dumps(drive_data, indent=4, sort_keys=True))
+        for drive_data in logicaldrives:
+            sys.stdout.write("\t An associated logical drive: %s\n" % drive_data['@odata.id'])
+            show(drive_data)
+    keep('logical_drives', dict((controller.get('Id'), [dict((field, drive[field]) for field \
+                        in LOGICAL_DRIVE_FIELDS if field in drive) for drive in \
+                        controller['LogicalDrives']]) for controller in \
+                        smartarraycontrollers.values()))
+    return smartarraycontrollers
 
 if __name__ == "__main__":
     module = AnsibleModule(
@@ -90,15 +97,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     get_SmartArray_LogicalDrives(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -18,10 +18,11 @@ An example of gathering the smart array encryption settings on HPE iLO systems
 """
 
 import sys
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
 
 def get_SmartArray_EncryptionSettings(_redfishobj, desired_properties):
 
@@ -42,12 +43,11 @@ def get_SmartArray_EncryptionSettings(_redfishobj, desired_properties):
                                                                 ['ArrayControllers']['@odata.id']
         smartstorage_response = _redfishobj.get(smart_storage_arraycontrollers_uri).obj['Members']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#HpeSmartStorageArrayControllerCollection.' in instance['@odata.type']:
-                smartstorage_uri = instance['@odata.id']
-                smartstorage_response = _redfishobj.get(smartstorage_uri).obj['Members']
-                break
+        #Use Resource directory to find the relevant URI
+        smartstorage_uri = find_resource_uri(_redfishobj, \
+                                             'HpeSmartStorageArrayControllerCollection')
+        if smartstorage_uri:
+            smartstorage_response = _redfishobj.get(smartstorage_uri).obj['Members']
 
     for controller in smartstorage_response:
         smartarraycontrollers[controller['@odata.id']] = _redfishobj.get(controller['@odata.id']).\
@@ -85,14 +85,11 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     get_SmartArray_EncryptionSettings(REDFISHOBJ, DESIRED_PROPERTIES)
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
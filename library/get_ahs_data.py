@@ -17,15 +17,101 @@
 An example of gathering AHS data for HPE iLO systems
 """
 
+import os
 import sys
 import json
-from redfish import RedfishClient
+import time
+import hashlib
+import datetime
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client, open_raw_connection
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats, \
+                        get_ilo_identity, read_cache_file, write_cache_file, CACHE_DIR
+from http_trace import http_trace_summary, record
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
-def get_ahs_data(_redfishobj, logfile):
+# Bytes read from iLO and written to the log file at a time
+CHUNK_SIZE = 1024 * 1024
+# AHS date range parameters are days in this format
+DATE_FORMAT = '%Y-%m-%d'
+
+def parse_date(value):
+    """Return value as a date, raising ValueError unless it is a day in DATE_FORMAT"""
+    return datetime.datetime.strptime(value, DATE_FORMAT).date()
+
+def _state_file(_redfishobj):
+    uuid = get_ilo_identity(_redfishobj)[0]
+    if not uuid or not CACHE_DIR:
+        return None
+    return os.path.join(CACHE_DIR, "ahs_%s.json" % uuid)
+
+def last_collection(_redfishobj):
+    """Return the last day collected from this iLO by an incremental run, or None"""
+    state_file = _state_file(_redfishobj)
+    state = read_cache_file(state_file) if state_file else None
+    return state.get('to') if state else None
+
+def _save_collection(_redfishobj, to_date):
+    state_file = _state_file(_redfishobj)
+    if state_file:
+        write_cache_file(state_file, {'to': to_date, 'collected': time.time()})
+
+def _stream_to_file(response, logfile, checksum):
+    size = 0
+    tmp_file = logfile + '.part'
+    with open(tmp_file, 'wb') as ahsoutput:
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            ahsoutput.write(chunk)
+            checksum.update(chunk)
+            size += len(chunk)
+    os.rename(tmp_file, logfile)
+    return size
+
+def _download(_redfishobj, uri, logfile, checksum):
+    """GET uri into logfile in chunks. Returns (status, bytes written, error body)."""
+    conn, auth = open_raw_connection(_redfishobj)
+    if not conn:
+        #local (blobstore) clients can only hand back the whole response, so the log is held
+        #in memory; pass baseuri to the module to stream it over https instead
+        response = _redfishobj.get(uri)
+        if response.status != 200:
+            return response.status, 0, response.dict
+        with open(logfile, 'wb') as ahsoutput:
+            ahsoutput.write(response.ori)
+        checksum.update(response.ori)
+        return response.status, len(response.ori), None
+
+    start = time.time()
+    size = 0
+    error = None
+    try:
+        conn.request('GET', uri, headers=auth)
+        response = conn.getresponse()
+        status = response.status
+        if status == 200:
+            size = _stream_to_file(response, logfile, checksum)
+        else:
+            try:
+                error = json.loads(response.read().decode('utf-8'))
+            except ValueError:
+                error = None
+    finally:
+        conn.close()
+    record('GET', uri, status, time.time() - start, size)
+    return status, size, error
+
+def get_ahs_data(_redfishobj, logfile, from_date=None, to_date=None, incremental=False):
+    """Download the AHS log to logfile, limited to from_date..to_date (YYYY-MM-DD) when given.
+    incremental starts from the last day collected from this iLO. A sha256 checksum is written
+    next to the log as logfile.sha256. The log is streamed to disk over http(s); a local
+    (blobstore) client reads all of it into memory first."""
 
     active_health_system_uri = None
 
@@ -41,37 +127,57 @@ def get_ahs_data(_redfishobj, logfile):
                                     ['ActiveHealthSystem']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeiLOActiveHealthSystem.' in instance['@odata.type']:
-                active_health_system_uri = instance['@odata.id']
-
-    if active_health_system_uri:
-        active_health_system_response = _redfishobj.get(active_health_system_uri)
-        active_health_system_log_uri = active_health_system_response.obj.Links['AHSLocation']\
-                                                                                        ['extref']
-        active_health_system_log_resp = _redfishobj.get(active_health_system_log_uri)
-        if active_health_system_log_resp.status == 400:
-            try:
-                print(json.dumps(active_health_system_log_resp.obj['error']\
-                                 ['@Message.ExtendedInfo'], indent=4, sort_keys=True))
-            except Exception:
-                sys.stderr.write("A response error occurred, unable to access iLO Extended "\
-                                 "Message Info...")
-        elif active_health_system_log_resp.status != 200:
-            sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
-        else:
-            print("Success!\n")
-            with open(logfile, 'wb') as ahsoutput:
-                ahsoutput.write(active_health_system_log_resp.ori)
-                ahsoutput.close()
-                sys.stdout.write("AHS Data saved successfully as: \'%s\'" % logfile)
+        active_health_system_uri = find_resource_uri(_redfishobj, 'HpeiLOActiveHealthSystem')
+
+    if not active_health_system_uri:
+        return None
+
+    if incremental and not from_date:
+        from_date = last_collection(_redfishobj)
+    if from_date and not to_date:
+        to_date = datetime.date.today().strftime(DATE_FORMAT)
+
+    active_health_system_response = _redfishobj.get(active_health_system_uri)
+    active_health_system_log_uri = active_health_system_response.obj.Links['AHSLocation']\
+                                                                                    ['extref']
+    if from_date and to_date:
+        active_health_system_log_uri += "?from=%s&&to=%s" % (from_date, to_date)
+        sys.stdout.write("Downloading AHS data from %s to %s\n" % (from_date, to_date))
+
+    checksum = hashlib.sha256()
+    status, size, error = _download(_redfishobj, active_health_system_log_uri, logfile, checksum)
+    if status == 400:
+        try:
+            show(decode_extended_info(_redfishobj, error), 'messages')
+        except Exception:
+            sys.stderr.write("A response error occurred, unable to access iLO Extended "\
+                             "Message Info...")
+        return None
+    elif status != 200:
+        sys.stderr.write("An http response of \'%s\' was returned.\n" % status)
+        return None
+
+    print("Success!\n")
+    with open(logfile + '.sha256', 'w') as checksumout:
+        checksumout.write("%s  %s\n" % (checksum.hexdigest(), os.path.basename(logfile)))
+    sys.stdout.write("AHS Data saved successfully as: \'%s\'" % logfile)
+    if incremental:
+        _save_collection(_redfishobj, to_date or datetime.date.today().strftime(DATE_FORMAT))
+    return {'file': logfile, 'bytes': size, 'sha256': checksum.hexdigest(), \
+            'from': from_date, 'to': to_date}
 
 if __name__ == "__main__":
     module = AnsibleModule(
         argument_spec = dict(            
             name      = dict(required=True),
             enabled   = dict(required=True, type='bool'),
-            ahs_file_name = dict(required=True, type='str')
+            ahs_file_name = dict(required=True, type='str'),
+            baseuri   = dict(required=False, type='str'),
+            login_account = dict(required=False, type='str', default=None),
+            login_password = dict(required=False, type='str', no_log=True, default=None),
+            from_date = dict(required=False, type='str', default=None),
+            to_date = dict(required=False, type='str', default=None),
+            incremental = dict(required=False, type='bool', default=False)
         )
     )
 
@@ -80,27 +186,45 @@ if __name__ == "__main__":
     # SYSTEM_URL acceptable examples:
     # "https://10.0.0.100"
     # "https://ilo.hostname"
-    SYSTEM_URL = "blobstore://."
-    LOGIN_ACCOUNT = "None"
-    LOGIN_PASSWORD = "None"
+    # Only remote connections stream the log to disk; local login holds all of it in memory
+    if module.params['baseuri']:
+        SYSTEM_URL = "https://" + module.params['baseuri']
+        LOGIN_ACCOUNT = module.params['login_account']
+        LOGIN_PASSWORD = module.params['login_password']
+    else:
+        SYSTEM_URL = "blobstore://."
+        LOGIN_ACCOUNT = "None"
+        LOGIN_PASSWORD = "None"
 
     # logfile path and filename
     LOGFILE = module.params['ahs_file_name']
+    # days to collect (YYYY-MM-DD), or everything since the last incremental collection
+    FROM_DATE = module.params['from_date']
+    TO_DATE = module.params['to_date']
+    INCREMENTAL = module.params['incremental']
+    try:
+        DAYS = [parse_date(DATE) for DATE in [FROM_DATE, TO_DATE] if DATE]
+    except ValueError:
+        module.fail_json(msg="from_date and to_date must be days in YYYY-MM-DD format, not "\
+                         "%s and %s" % (FROM_DATE, TO_DATE))
+    if FROM_DATE and TO_DATE and DAYS[0] > DAYS[1]:
+        module.fail_json(msg="from_date %s is after to_date %s" % (FROM_DATE, TO_DATE))
     # flag to force disable resource directory. Resource directory and associated operations are
     # intended for HPE servers.
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    get_ahs_data(REDFISHOBJ, LOGFILE)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    AHS_DATA = get_ahs_data(REDFISHOBJ, LOGFILE, FROM_DATE, TO_DATE, INCREMENTAL)
+    release_redfish_client(REDFISHOBJ)
+    if not AHS_DATA:
+        module.fail_json(msg="Unable to download AHS data.")
+    module.exit_json(changed=True, ahs_data=AHS_DATA, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
     
@@ -18,12 +18,16 @@ An example of getting the base message registry
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from http_trace import http_trace_summary
 from ansible.module_utils.basic import *
 
+from message_registry import get_message_index
+
 def get_base_registry(_redfishobj):
+    """List the registries and load the message registry store, returning the number of
+    messages indexed per registry"""
 
     registries_uri = _redfishobj.root.obj['Registries']['@odata.id']
 
@@ -31,6 +35,8 @@ def get_base_registry(_redfishobj):
         registries_members = _redfishobj.get(registries_uri).obj['Members']
         for registry in registries_members:
             sys.stdout.write("Registry URI at '%s'\n" % registry['@odata.id'])
+    return dict((family, len(messages)) for family, messages in \
+                                                    get_message_index(_redfishobj).items())
 
 if __name__ == "__main__":
     module = AnsibleModule(
@@ -50,15 +56,12 @@ if __name__ == "__main__":
     LOGIN_PASSWORD = "None"
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    get_base_registry(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    MESSAGES = get_base_registry(REDFISHOBJ)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=False, messages=MESSAGES, http_trace=http_trace_summary())
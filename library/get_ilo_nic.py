@@ -18,32 +18,15 @@ An example of gathering the Manager NIC data
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-#from get_resource_directory import get_resource_directory
-
-def get_resource_directory(redfishobj):
-
-    try:
-        resource_uri = redfishobj.root.obj.Oem.Hpe.Links.ResourceDirectory['@odata.id']
-    except KeyError:
-        sys.stderr.write("Resource directory is only available on HPE servers.\n")
-        return None
-
-    response = redfishobj.get(resource_uri)
-    resources = []
-
-    if response.status == 200:
-        sys.stdout.write("\tFound resource directory at /redfish/v1/resourcedirectory" + "\n\n")
-        resources = response.dict["Instances"]
-    else:
-        sys.stderr.write("\tResource directory missing at /redfish/v1/resourcedirectory" + "\n")
-
-    return resources
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from collection_reader import read_collection
 
 def get_ilo_nic(_redfishobj, get_enabled):
     ethernet_data = {}
@@ -58,23 +41,14 @@ def get_ilo_nic(_redfishobj, get_enabled):
         managers_members_response = _redfishobj.get(managers_members_uri)
         manager_ethernet_interfaces = managers_members_response.obj['EthernetInterfaces']\
                                                                                     ['@odata.id']
-        manager_ethernet_interfaces_response = _redfishobj.get(manager_ethernet_interfaces)
-        manager_ethernet_interfaces_members = manager_ethernet_interfaces_response.\
-                                                            obj['Members']
-        for _member in manager_ethernet_interfaces_members:
-            _tmp = _redfishobj.get(_member['@odata.id']).obj
-            ethernet_data[_member['@odata.id']] = _tmp
+        for _member in read_collection(_redfishobj, manager_ethernet_interfaces):
+            ethernet_data[_member['@odata.id']] = _member
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#EthernetInterfaceCollection.' in instance['@odata.type'] and 'Managers' in \
-                                                                        instance['@odata.id']:
-                ethernet_uri = instance['@odata.id']
-                ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
-                for _ethernet_interface in ethernet_interfaces:
-                    ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
-                                                        get(_ethernet_interface['@odata.id']).dict
-                break
+        #Use Resource directory to find the relevant URI
+        ethernet_uri = find_resource_uri(_redfishobj, 'EthernetInterfaceCollection', 'Managers')
+        if ethernet_uri:
+            for _ethernet_interface in read_collection(_redfishobj, ethernet_uri):
+                ethernet_data[_ethernet_interface['@odata.id']] = _ethernet_interface
 
     if ethernet_data:
         for ethernet_interface in ethernet_data:
@@ -121,16 +95,15 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     nic_dict = get_ilo_nic(REDFISHOBJ, GET_ENABLED)    
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True, msg=nic_dict)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, msg=nic_dict, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
   
@@ -18,12 +18,14 @@ An example of getting an iLO license key for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from module_output import show, module_results
 
 def get_license_key(_redfishobj):
     license_uri = None
@@ -46,20 +48,17 @@ def get_license_key(_redfishobj):
         license_data = _redfishobj.get(license_collection_members_uri).dict
         license_uri = _redfishobj.get(license_collection_members_uri).dict['@odata.id']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#HpeiLOLicense.' in instance['@odata.type']:
-                license_uri = instance['@odata.id']
-                license_data = _redfishobj.get(license_uri).dict
-                break
+        #Use Resource directory to find the relevant URI
+        license_uri = find_resource_uri(_redfishobj, 'HpeiLOLicense')
+        if license_uri:
+            license_data = _redfishobj.get(license_uri).dict
 
     if license_data:
         try:
-            sys.stdout.write("\n\'License Info\': \'%s\'\n" % \
-            json.dumps(license_data['ConfirmationRequest']['EON'], indent=4, sort_keys=True))
+            show(license_data['ConfirmationRequest']['EON'], 'license', title="\n\'License "\
+                                                                                "Info\':\n")
         except KeyError:
-            sys.stdout.write("\n\'License Info\': \'%s\'\n" % \
-            json.dumps(license_data['LicenseKey'], indent=4, sort_keys=True))
+            show(license_data['LicenseKey'], 'license', title="\n\'License Info\':\n")
 
 if __name__ == "__main__":
     module = AnsibleModule(
@@ -83,15 +82,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     get_license_key(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
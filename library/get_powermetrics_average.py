@@ -16,15 +16,81 @@
 """
 An example of gathering the power metrics average on HPE iLO systems
 """
+DOCUMENTATION = '''
+---
+module: get_powermetrics_average
+short_description: Returns the iLO power averages, or watt statistics sampled over a period
+'''
+
+EXAMPLES = '''
+- name: Sample power every 5 seconds for 10 minutes
+  get_powermetrics_average:
+    name: "Power sampling"
+    enabled: True
+    interval: 5
+    duration: 600
+    baseuri: "10.0.0.100"
+    login_account: admin
+    login_password: "{{ ilo_password }}"
+'''
 
 import sys
 import json
-from redfish import RedfishClient
+import time
+import socket
+from array import array
+from six.moves import http_client
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client, open_raw_connection
+from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary, record
+from resource_resolver import find_resource_uri
+from module_output import show
 
-def get_powermetrics_average(_redfishobj):
+# Samples kept per series by the sampler; older samples are overwritten once a ring is full
+MAX_SAMPLES = 4096
+PERCENTILES = [50, 90, 95, 99]
+
+class SampleRing(object):
+    """Fixed size ring of float samples backed by an array of doubles"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = array('d', [0.0]) * capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, value):
+        self.values[self.count % self.capacity] = value
+        self.count += 1
+
+    def samples(self):
+        """Samples held, oldest first"""
+        if self.count <= self.capacity:
+            return self.values[:self.count]
+        start = self.count % self.capacity
+        return self.values[start:] + self.values[:start]
+
+    def summary(self):
+        """min, max, mean and PERCENTILES of the samples held, or None when empty"""
+        data = sorted(self.samples())
+        if not data:
+            return None
+        result = {'samples': len(data), 'min': round(data[0], 3), 'max': round(data[-1], 3), \
+                  'mean': round(sum(data) / len(data), 3)}
+        for percent in PERCENTILES:
+            rank = (len(data) - 1) * percent / 100.0
+            low = int(rank)
+            high = min(low + 1, len(data) - 1)
+            result['p%d' % percent] = round(data[low] + (data[high] - data[low]) * \
+                                                                            (rank - low), 3)
+        return result
+
+def get_power_metrics_uri(_redfishobj):
 
     power_metrics_uri = None
 
@@ -38,46 +104,142 @@ def get_powermetrics_average(_redfishobj):
         chassis_members_response = _redfishobj.get(chassis_members_uri)
         power_metrics_uri = chassis_members_response.obj.Oem.Hpe['Power']['@odata.id']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#Power.' in instance['@odata.type']:
-                power_metrics_uri = instance['@odata.id']
-                break
+        #Use Resource directory to find the relevant URI
+        power_metrics_uri = find_resource_uri(_redfishobj, 'Power')
+    return power_metrics_uri
 
+def get_powermetrics_average(_redfishobj):
+    """Return the power averages iLO keeps under Oem.Hpe of the Power resource, or None"""
+    power_metrics_uri = get_power_metrics_uri(_redfishobj)
     if power_metrics_uri:
-        power_metrics_data = _redfishobj.get(power_metrics_uri).obj.Oem.Hpe
-        print("\n\nPower Data:\n\n")
-        print(json.dumps(power_metrics_data, indent=4, sort_keys=True))
+        return show(_redfishobj.get(power_metrics_uri).dict.get('Oem', {}).get('Hpe'), \
+                                                            title="\n\nPower Data:\n\n")
+    return None
+
+def _read_power(_redfishobj, conn, auth, uri):
+    """GET the Power resource over the kept-alive connection, reconnecting once if iLO closed
+    it, or through the client when there is no raw connection (blobstore)"""
+    if conn is None:
+        response = _redfishobj.get(uri)
+        return response.dict if response.status == 200 else None
+    for attempt in range(2):
+        start = time.time()
+        try:
+            conn.request('GET', uri, headers=auth)
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (http_client.HTTPException, socket.error):
+            conn.close()
+            if attempt:
+                raise
+    record('GET', uri, response.status, time.time() - start, len(body))
+    return json.loads(body.decode('utf-8')) if response.status == 200 else None
+
+def _store(rings, power, capacity):
+    series = {'chassis': sum(control.get('PowerConsumedWatts') or 0 for control in \
+                                                                power.get('PowerControl', []))}
+    for supply in power.get('PowerSupplies', []):
+        if supply.get('LastPowerOutputWatts') is not None:
+            series['psu_%s' % supply.get('MemberId')] = supply['LastPowerOutputWatts']
+    for name, watts in series.items():
+        if name not in rings:
+            rings[name] = SampleRing(capacity)
+        rings[name].append(watts)
+
+def sample_power_metrics(_redfishobj, interval, duration):
+    """Poll the Power resource every interval seconds for duration seconds over one
+    connection. Returns watt statistics for the chassis and each power supply, and the
+    sampler's own drift: how late each sample was taken against its schedule, and the ticks
+    missed because a read outlasted the interval."""
+    power_metrics_uri = get_power_metrics_uri(_redfishobj)
+    if not power_metrics_uri:
+        return None
+    ticks = int(duration / float(interval) + 1e-6) + 1
+    capacity = min(ticks, MAX_SAMPLES)
+    rings, lateness, missed, tick = {}, SampleRing(capacity), 0, 0
+
+    conn, auth = open_raw_connection(_redfishobj)
+    start = time.time()
+    try:
+        while tick < ticks:
+            #samples are scheduled from the start, so lateness does not add up between ticks
+            scheduled = start + tick * interval
+            if time.time() < scheduled:
+                time.sleep(scheduled - time.time())
+            lateness.append(time.time() - scheduled)
+            power = _read_power(_redfishobj, conn, auth, power_metrics_uri)
+            if power:
+                _store(rings, power, capacity)
+            next_tick = int((time.time() - start) // interval) + 1
+            missed += max(0, next_tick - tick - 1)
+            tick = max(tick + 1, next_tick)
+    finally:
+        if conn:
+            conn.close()
+
+    return {'interval': interval, 'seconds': round(time.time() - start, 3), 'samples': \
+            lateness.count, 'chassis_watts': rings['chassis'].summary() if 'chassis' in rings \
+            else None, 'power_supply_watts': dict((name[4:], ring.summary()) for name, ring in \
+            rings.items() if name.startswith('psu_')), 'drift': {'lateness_seconds': \
+            lateness.summary(), 'missed_ticks': missed}}
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
     #SYSTEM_URL = None
     #LOGIN_ACCOUNT = None
     #LOGIN_PASSWORD = None
+    module = AnsibleModule(
+        argument_spec = dict(
+            name      = dict(required=True),
+            enabled   = dict(required=True, type='bool'),
+            interval  = dict(required=False, type='float', default=0),
+            duration  = dict(required=False, type='float', default=300),
+            baseuri   = dict(required=False, type='str'),
+            login_account = dict(required=False, type='str', default=None),
+            login_password = dict(required=False, type='str', no_log=True, default=None)
+        )
+    )
 
     # When running remotely connect using the secured (https://) address,
     # account name, and password to send https requests
     # SYSTEM_URL acceptable examples:
     # "https://10.0.0.100"
     # "https://ilo.hostname"
-    SYSTEM_URL = "https://10.0.0.100"
-    LOGIN_ACCOUNT = "admin"
-    LOGIN_PASSWORD = "password"
+    if module.params['baseuri']:
+        SYSTEM_URL = "https://" + module.params['baseuri']
+        LOGIN_ACCOUNT = module.params['login_account']
+        LOGIN_PASSWORD = module.params['login_password']
+    else:
+        SYSTEM_URL = "blobstore://."
+        LOGIN_ACCOUNT = "None"
+        LOGIN_PASSWORD = "None"
 
     # flag to force disable resource directory. Resource directory and associated operations are
     # intended for HPE servers.
     DISABLE_RESOURCE_DIR = False
 
+    # Seconds between power samples; 0 takes a single snapshot of the iLO averages instead
+    SAMPLE_INTERVAL = module.params['interval']
+    # Seconds to sample for
+    SAMPLE_DURATION = module.params['duration']
+    if SAMPLE_INTERVAL < 0 or SAMPLE_DURATION < 0:
+        module.fail_json(msg="interval and duration must not be negative.")
+
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    get_powermetrics_average(REDFISHOBJ)
-    REDFISHOBJ.logout()
-  
\ No newline at end of file
+    if SAMPLE_INTERVAL:
+        POWER = sample_power_metrics(REDFISHOBJ, SAMPLE_INTERVAL, SAMPLE_DURATION)
+    else:
+        POWER = get_powermetrics_average(REDFISHOBJ)
+    release_redfish_client(REDFISHOBJ)
+    if POWER is None:
+        module.fail_json(msg="Unable to locate the Power resource.")
+    module.exit_json(changed=False, power=POWER, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
@@ -17,11 +17,80 @@
 An example of getting the resource directory for HPE iLO systems
 """
 
+import os
 import sys
+import json
+import time
+import hashlib
+import threading
 from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from http_trace import record
 
-def get_resource_directory(redfishobj):
+# Location of the on-disk resource directory cache. Set to None to always download the
+# resource directory from iLO.
+CACHE_DIR = os.environ.get('ILOREST_CACHE_DIR', os.path.join(os.path.expanduser('~'), \
+                                                            '.ilorest_ansible', 'cache'))
+# Seconds a cached resource directory is trusted before it is revalidated with iLO
+CACHE_TTL = int(os.environ.get('ILOREST_CACHE_TTL', 3600))
+
+# Resource directory cache hits, misses and ETag revalidations for this module run, summed
+# over every iLO it works on
+CACHE_STATS = {'hits': 0, 'misses': 0, 'revalidated': 0}
+_STATS_LOCK = threading.Lock()
+
+#resource directories already loaded in this process, keyed by cache key
+_LOADED = {}
+
+def get_ilo_identity(redfishobj):
+    """Return the (UUID, firmware version) pair identifying the iLO behind redfishobj"""
+    root = redfishobj.root.dict
+    try:
+        firmware_version = root['Oem']['Hpe']['Manager'][0]['ManagerFirmwareVersion']
+    except (KeyError, IndexError, TypeError):
+        firmware_version = None
+    return root.get('UUID'), firmware_version
+
+def _cache_file(redfishobj, cache_dir):
+    uuid, firmware_version = get_ilo_identity(redfishobj)
+    if not uuid:
+        return None
+    key = "%s|%s|%s" % (getattr(redfishobj, 'base_url', ''), uuid, firmware_version)
+    return os.path.join(cache_dir, "resourcedirectory_%s.json" % \
+                                                    hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+def read_cache_file(cache_file):
+    """Return the JSON content of a cache file, or None when it is missing or unreadable"""
+    try:
+        with open(cache_file, 'r') as cachein:
+            return json.load(cachein)
+    except (IOError, OSError, ValueError):
+        return None
+
+def write_cache_file(cache_file, cached):
+    """Write a cache file readable only by the current user, replacing it atomically"""
+    try:
+        if not os.path.isdir(os.path.dirname(cache_file)):
+            os.makedirs(os.path.dirname(cache_file), 0o700)
+        tmp_file = cache_file + '.%d.tmp' % os.getpid()
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as cacheout:
+            json.dump(cached, cacheout)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        sys.stderr.write("\tUnable to write cache file: %s\n" % cache_file)
+
+def _count(*counters):
+    #fleet workers count from several threads at once
+    with _STATS_LOCK:
+        for counter in counters:
+            CACHE_STATS[counter] += 1
+
+def resource_directory_cache_stats():
+    """Return a copy of the resource directory cache counters, for use in module results"""
+    return dict(CACHE_STATS)
+
+def get_resource_directory(redfishobj, cache_dir=None, ttl=None):
 
     try:
         resource_uri = redfishobj.root.obj.Oem.Hpe.Links.ResourceDirectory['@odata.id']
@@ -29,15 +98,46 @@ def get_resource_directory(redfishobj):
         sys.stderr.write("Resource directory is only available on HPE servers.\n")
         return None
 
-    response = redfishobj.get(resource_uri)
+    cache_dir = cache_dir or CACHE_DIR
+    ttl = CACHE_TTL if ttl is None else ttl
+    cache_file = _cache_file(redfishobj, cache_dir) if cache_dir else None
+
+    if cache_file in _LOADED:
+        record('GET', resource_uri, cache='memo')
+        return _LOADED[cache_file]
+
+    cached = read_cache_file(cache_file) if cache_file else None
+    headers = {}
+    if cached:
+        if time.time() - cached.get('fetched', 0) < ttl:
+            _count('hits')
+            record('GET', resource_uri, cache='disk')
+            _LOADED[cache_file] = cached['Instances']
+            return cached['Instances']
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+    response = redfishobj.get(resource_uri, headers=headers)
     resources = []
 
-    if response.status == 200:
+    if response.status == 304:
+        #unchanged since it was cached, so just restart the TTL
+        _count('hits', 'revalidated')
+        cached['fetched'] = time.time()
+        write_cache_file(cache_file, cached)
+        resources = cached['Instances']
+    elif response.status == 200:
         sys.stdout.write("\tFound resource directory at /redfish/v1/resourcedirectory" + "\n\n")
+        _count('misses')
         resources = response.dict["Instances"]
+        if cache_file:
+            write_cache_file(cache_file, {'etag': response.getheader('etag'), \
+                                          'fetched': time.time(), 'Instances': resources})
     else:
         sys.stderr.write("\tResource directory missing at /redfish/v1/resourcedirectory" + "\n")
 
+    if cache_file and resources:
+        _LOADED[cache_file] = resources
     return resources
 
 if __name__ == "__main__":
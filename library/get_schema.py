@@ -32,30 +32,53 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from http_trace import http_trace_summary
 from ansible.module_utils.basic import *
 
-def get_schema(_redfishobj):
-    schema_members_uris = []
-    schema_members_expanded = {}
+from collection_reader import get_members, DEFAULT_MAX_WORKERS
+from schema_store import schema_id, read_schema, write_schema, SCHEMA_DIR
+
+def _schema_location(data):
+    locations = [location for location in data.get('Location', []) if location.get('Uri')]
+    english = [location for location in locations if location.get('Language') == 'en']
+    return (english or locations or [{}])[0].get('Uri')
+
+def get_schema(_redfishobj, schema_prefix='', max_workers=DEFAULT_MAX_WORKERS, schema_dir=None):
+    """Return {schema Id: schema} for the JsonSchemas members whose Id starts with
+    schema_prefix, and the Ids that had to be downloaded. Members are filtered by the Id in
+    their URI before anything else is fetched; schemas already in the schema store cost no
+    requests, and the rest are downloaded up to max_workers at a time and stored."""
+    schemas = {}
 
     schema_uri = _redfishobj.root.obj['JsonSchemas']['@odata.id']
     schema_response = _redfishobj.get(schema_uri)
-    schema_members_uris = schema_response.obj['Members']
-    for member in schema_members_uris:
-        data = _redfishobj.get(member['@odata.id']).dict
-        instance_id = data['Location'].index(next(iter(data['Location'])))
-        schema_uri = data['Location'][instance_id]['Uri']
-        schema = _redfishobj.get(schema_uri).dict
-        #I am just replacing the URI link for the sub-schema with the actual schema. You will
-        #see EVERYTHING
-        _tmp = {schema_uri + ' ->': schema}
-        data['Location'][instance_id]['Uri'] = _tmp
-        schema_members_expanded[member['@odata.id']] = data
+    member_uris = [member['@odata.id'] for member in schema_response.obj['Members']]
+    member_uris = [uri for uri in member_uris if schema_id(uri).startswith(schema_prefix)]
+    for member_uri in member_uris:
+        stored = read_schema(member_uri, schema_dir)
+        if stored is not None:
+            schemas[schema_id(member_uri)] = stored
+    missing = [member_uri for member_uri in member_uris if schema_id(member_uri) not in schemas]
+
+    #one round of requests for the locators, one for the schemas they point to
+    locators = [response.dict for response in get_members(_redfishobj, missing, max_workers)]
+    located = [(member_uri, _schema_location(data)) for member_uri, data in \
+                                        zip(missing, locators) if _schema_location(data)]
+    responses = get_members(_redfishobj, [uri for _, uri in located], max_workers)
+    for (member_uri, uri), response in zip(located, responses):
+        if response.status != 200:
+            sys.stderr.write("Unable to download schema %s from %s.\n" % (member_uri, uri))
+            continue
+        schemas[schema_id(member_uri)] = response.dict
+        write_schema(member_uri, response.dict, schema_dir)
 
-    print(json.dumps(schema_members_expanded, indent=4, sort_keys=True))
+    downloaded = [schema_id(member_uri) for member_uri in missing if schema_id(member_uri) in \
+                                                                                        schemas]
+    sys.stdout.write("%d schemas matching \'%s\', %d downloaded.\n" % (len(schemas), \
+                                                                schema_prefix, len(downloaded)))
+    return schemas, downloaded
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -68,7 +91,9 @@ if __name__ == "__main__":
             state     = dict(default='present', choices=['present', 'absent']),
             name      = dict(required=True),
             enabled   = dict(required=True, type='bool'),
-            schema_prefix = dict(required=True, type='str')
+            schema_prefix = dict(required=True, type='str'),
+            max_workers = dict(required=False, type='int', default=DEFAULT_MAX_WORKERS),
+            schema_dir = dict(required=False, type='str', default=None)
         )
     )
 
@@ -84,16 +109,16 @@ if __name__ == "__main__":
     LOGIN_PASSWORD = "None"
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    get_schema(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    SCHEMAS, DOWNLOADED = get_schema(REDFISHOBJ, SCHEMA_PREFIX, module.params['max_workers'], \
+                                                                    module.params['schema_dir'])
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=bool(DOWNLOADED), schemas=sorted(SCHEMAS), downloaded=DOWNLOADED, \
+                     schema_dir=module.params['schema_dir'] or SCHEMA_DIR, \
+                     http_trace=http_trace_summary())
   
@@ -0,0 +1,181 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of gathering the hardware profile of a server as Ansible facts in one session
+"""
+DOCUMENTATION = '''
+---
+module: hardware_facts
+short_description: Gathers system, iLO NIC, inventory and Smart Array facts in one session
+'''
+
+EXAMPLES = '''
+- name: Gather the hardware profile
+  hardware_facts:
+    name: "Hardware facts"
+    enabled: True
+    sections: [system, ilo_nics, firmware, smart_array]
+
+- debug: var=ilo_hardware.system.SerialNumber
+'''
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from ansible.module_utils.basic import *
+
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri, get_cached
+from collection_reader import read_collection, allows_concurrency
+
+SECTIONS = ['system', 'ilo_nics', 'firmware', 'software', 'smart_array']
+# Sections gathered at once; each section is one branch of the resource tree
+DEFAULT_MAX_BRANCHES = 4
+
+SYSTEM_PROPERTIES = ['AssetTag', 'BiosVersion', 'HostName', 'Manufacturer', 'MemorySummary', \
+                     'Model', 'PowerState', 'ProcessorSummary', 'SKU', 'SerialNumber', 'Status', \
+                     'UUID']
+
+def fact_plan(_redfishobj, sections):
+    """Resolve the URI each section is read from. Parents shared by several sections, such
+    as the system for 'system' and 'smart_array' or UpdateService for both inventories, are
+    fetched once."""
+    use_resource_dir = not DISABLE_RESOURCE_DIR and bool(get_resource_directory(_redfishobj))
+    plan = {}
+    if 'system' in sections:
+        plan['system'] = find_resource_uri(_redfishobj, 'ComputerSystem', \
+                                                            use_resource_dir=use_resource_dir)
+    if 'ilo_nics' in sections:
+        plan['ilo_nics'] = find_resource_uri(_redfishobj, 'EthernetInterfaceCollection', \
+                                            'Managers', use_resource_dir=use_resource_dir)
+    if 'firmware' in sections or 'software' in sections:
+        update_service_uri = find_resource_uri(_redfishobj, 'UpdateService', \
+                                                            use_resource_dir=use_resource_dir)
+        update_service = get_cached(_redfishobj, update_service_uri) if update_service_uri \
+                                                                                        else {}
+        for section, inventory in [('firmware', 'FirmwareInventory'), \
+                                   ('software', 'SoftwareInventory')]:
+            if section in sections and inventory in update_service:
+                plan[section] = update_service[inventory]['@odata.id']
+    if 'smart_array' in sections:
+        plan['smart_array'] = find_resource_uri(_redfishobj, \
+                'HpeSmartStorageArrayControllerCollection', use_resource_dir=use_resource_dir)
+    return plan
+
+def _system_facts(_redfishobj, uri):
+    system = get_cached(_redfishobj, uri)
+    return dict((key, system[key]) for key in SYSTEM_PROPERTIES if key in system)
+
+def _nic_facts(_redfishobj, uri):
+    return [{'Id': nic.get('Id'), 'Name': nic.get('Name'), 'MACAddress': nic.get('MACAddress'), \
+             'InterfaceEnabled': nic.get('InterfaceEnabled'), 'SpeedMbps': nic.get('SpeedMbps'), \
+             'IPv4Addresses': nic.get('IPv4Addresses', []), 'IPv6Addresses': \
+             nic.get('IPv6Addresses', []), 'Status': nic.get('Status')} for nic in \
+                                                            read_collection(_redfishobj, uri)]
+
+def _inventory_facts(_redfishobj, uri):
+    return [{'Name': item.get('Name'), 'Version': item.get('Version'), 'Updateable': \
+             item.get('Updateable'), 'DeviceContext': item.get('Oem', {}).get('Hpe', {}).\
+             get('DeviceContext')} for item in read_collection(_redfishobj, uri)]
+
+def _smart_array_facts(_redfishobj, uri):
+    controllers = []
+    for controller in read_collection(_redfishobj, uri):
+        facts = dict((key, controller[key]) for key in controller if key.startswith('Encryption') \
+                     or key in ['Id', 'Model', 'SerialNumber', 'FirmwareVersion', 'Location', \
+                                                                                    'Status'])
+        drives_uri = controller.get('Links', {}).get('LogicalDrives', {}).get('@odata.id')
+        facts['LogicalDrives'] = [{'Id': drive.get('Id'), 'LogicalDriveName': \
+                drive.get('LogicalDriveName'), 'Raid': drive.get('Raid'), 'CapacityMiB': \
+                drive.get('CapacityMiB'), 'VolumeUniqueIdentifier': \
+                drive.get('VolumeUniqueIdentifier'), 'Status': drive.get('Status')} for drive in \
+                                (read_collection(_redfishobj, drives_uri) if drives_uri else [])]
+        controllers.append(facts)
+    return controllers
+
+GATHERERS = {'system': _system_facts, 'ilo_nics': _nic_facts, 'firmware': _inventory_facts, \
+             'software': _inventory_facts, 'smart_array': _smart_array_facts}
+
+def hardware_facts(_redfishobj, sections=None, max_branches=DEFAULT_MAX_BRANCHES):
+    """Gather the requested sections, reading independent branches concurrently (one after
+    another on a local client). A section that cannot be found or read is left out and
+    explained under 'errors'."""
+    sections = sections or SECTIONS
+    facts = {'errors': {}}
+    plan = fact_plan(_redfishobj, sections)
+    for section in sections:
+        if not plan.get(section):
+            facts['errors'][section] = "Unable to locate the %s resources." % section
+
+    branches = [section for section in sections if plan.get(section)]
+    if not allows_concurrency(_redfishobj):
+        max_branches = 1
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_branches, len(branches))))
+    try:
+        futures = dict((section, pool.submit(GATHERERS[section], _redfishobj, plan[section])) \
+                                                                    for section in branches)
+        for section, future in futures.items():
+            try:
+                facts[section] = future.result()
+            except Exception as excp:
+                sys.stderr.write("Unable to gather %s facts: %s\n" % (section, excp))
+                facts['errors'][section] = "%s: %s" % (type(excp).__name__, excp)
+    finally:
+        pool.shutdown(wait=True)
+    return facts
+
+if __name__ == "__main__":
+    module = AnsibleModule(
+        argument_spec = dict(
+            name         = dict(required=True),
+            enabled      = dict(required=True, type='bool'),
+            sections     = dict(required=False, type='list', default=SECTIONS),
+            max_branches = dict(required=False, type='int', default=DEFAULT_MAX_BRANCHES)
+        )
+    )
+
+    # When running remotely connect using the secured (https://) address,
+    # account name, and password to send https requests
+    # SYSTEM_URL acceptable examples:
+    # "https://10.0.0.100"
+    # "https://ilo.hostname"
+    SYSTEM_URL = "blobstore://."
+    LOGIN_ACCOUNT = "None"
+    LOGIN_PASSWORD = "None"
+
+    # flag to force disable resource directory. Resource directory and associated operations are
+    # intended for HPE servers.
+    DISABLE_RESOURCE_DIR = False
+
+    UNKNOWN = [SECTION for SECTION in module.params['sections'] if SECTION not in SECTIONS]
+    if UNKNOWN:
+        module.fail_json(msg="Unknown sections %s, choose from %s" % (", ".join(UNKNOWN), \
+                                                                        ", ".join(SECTIONS)))
+
+    try:
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
+    except ServerDownOrUnreachableError as excp:
+        sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
+        sys.exit()
+
+    FACTS = hardware_facts(REDFISHOBJ, module.params['sections'], module.params['max_branches'])
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=False, ansible_facts={'ilo_hardware': FACTS}, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
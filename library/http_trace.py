@@ -0,0 +1,111 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Opt-in tracing of the Redfish requests made by a module run on HPE iLO systems
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+# Tracing is opt-in: set ILOREST_TRACE=true to get an http_trace summary in the module result.
+# Setting ILOREST_TRACE_FILE also writes every request to that file as one JSON line each.
+TRACE_FILE = os.environ.get('ILOREST_TRACE_FILE')
+TRACE_ENABLED = bool(TRACE_FILE) or \
+                os.environ.get('ILOREST_TRACE', '').lower() in ['1', 'true', 'yes']
+# Number of URIs listed under slowest in the summary
+SLOWEST_COUNT = 5
+
+TRACED_METHODS = ['get', 'post', 'patch', 'put', 'delete', 'head']
+
+_RECORDS = []
+_LOCK = threading.Lock()
+
+def _response_bytes(response):
+    try:
+        return len(response.read or '')
+    except (AttributeError, TypeError):
+        return 0
+
+def record(method, uri, status=None, seconds=0.0, nbytes=0, cache='network'):
+    """Add one request to the trace. cache is 'network' for a request sent to iLO,
+    'revalidated' for a 304 answer, or where else the response came from ('memo', 'disk')."""
+    if not TRACE_ENABLED:
+        return
+    entry = {'method': method, 'uri': uri, 'status': status, 'seconds': round(seconds, 4), \
+             'bytes': nbytes, 'cache': cache, 'time': time.time()}
+    with _LOCK:
+        _RECORDS.append(entry)
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, 'a') as traceout:
+                    traceout.write(json.dumps(entry, sort_keys=True) + "\n")
+            except (IOError, OSError):
+                sys.stderr.write("\tUnable to write HTTP trace file: %s\n" % TRACE_FILE)
+
+def _traced(method, call):
+    def _call(path, *args, **kwargs):
+        start = time.time()
+        response = call(path, *args, **kwargs)
+        status = getattr(response, 'status', None)
+        record(method.upper(), path, status, time.time() - start, _response_bytes(response), \
+                                            'revalidated' if status == 304 else 'network')
+        return response
+    return _call
+
+def instrument(_redfishobj):
+    """Wrap the request methods of a RedfishClient so each call is traced. Does nothing
+    unless tracing is enabled."""
+    if not TRACE_ENABLED or getattr(_redfishobj, '_http_traced', False):
+        return _redfishobj
+    for method in TRACED_METHODS:
+        if hasattr(_redfishobj, method):
+            setattr(_redfishobj, method, _traced(method, getattr(_redfishobj, method)))
+    _redfishobj._http_traced = True
+    return _redfishobj
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))]
+
+def http_trace_summary():
+    """Return request count, p50/p95 latency and the slowest URIs for module results,
+    or None when tracing is disabled"""
+    if not TRACE_ENABLED:
+        return None
+    with _LOCK:
+        records = list(_RECORDS)
+    sent = [entry for entry in records if entry['cache'] in ['network', 'revalidated']]
+    latencies = sorted(entry['seconds'] for entry in sent)
+    summary = {'requests': len(sent), 'seconds': round(sum(latencies), 4), \
+               'bytes': sum(entry['bytes'] for entry in sent), \
+               'p50': _percentile(latencies, 50), 'p95': _percentile(latencies, 95), \
+               'methods': {}, 'cache': {}, 'statuses': {}}
+    for entry in records:
+        summary['cache'][entry['cache']] = summary['cache'].get(entry['cache'], 0) + 1
+    for entry in sent:
+        summary['methods'][entry['method']] = summary['methods'].get(entry['method'], 0) + 1
+        status = str(entry['status'])
+        summary['statuses'][status] = summary['statuses'].get(status, 0) + 1
+    summary['slowest'] = [dict((key, entry[key]) for key in ['method', 'uri', 'status', \
+                                'seconds']) for entry in sorted(sent, key=lambda entry: \
+                                                    entry['seconds'], reverse=True)[:SLOWEST_COUNT]]
+    if TRACE_FILE:
+        summary['trace_file'] = TRACE_FILE
+    return summary
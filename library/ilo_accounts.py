@@ -0,0 +1,221 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of reconciling the iLO user accounts with a declared list of accounts
+"""
+DOCUMENTATION = '''
+---
+module: ilo_accounts
+short_description: Creates, updates and deletes iLO accounts to match a desired account list
+'''
+
+EXAMPLES = '''
+- name: Reconcile iLO accounts
+  ilo_accounts:
+    name: "iLO accounts"
+    enabled: True
+    exclusive: True
+    accounts:
+      - username: monitor
+        password: "{{ monitor_password }}"
+        role_id: ReadOnly
+      - username: operator
+        login_name: "Rack operator"
+        privileges:
+          VirtualMediaPriv: True
+          VirtualPowerAndResetPriv: True
+      - username: olduser
+        state: absent
+'''
+
+import sys
+from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from ansible.module_utils.basic import *
+
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from collection_reader import read_collection
+from message_registry import decode_extended_info
+
+def get_account_index(_redfishobj):
+    """Load the accounts collection once ($expand or concurrent member GETs) and return its
+    URI and the accounts indexed by UserName"""
+    resource_instances = get_resource_directory(_redfishobj)
+    if DISABLE_RESOURCE_DIR or not resource_instances:
+        #resource directory is not available so we will navigate through paths manually to obtain
+        #account info
+        account_service_uri = _redfishobj.root.obj['AccountService']['@odata.id']
+        account_service_response = _redfishobj.get(account_service_uri)
+        account_collection_uri = account_service_response.obj['Accounts']['@odata.id']
+    else:
+        #obtain all account instances from resource directory
+        account_collection_uri = find_resource_uri(_redfishobj, 'ManagerAccountCollection')
+    accounts = read_collection(_redfishobj, account_collection_uri)
+    return account_collection_uri, dict((account.get('UserName'), account) for account in \
+                                                                                    accounts)
+
+def _account_body(desired, account=None, update_password='on_create'):
+    """Body holding what differs between a desired account and the existing one (or the
+    whole account when it does not exist yet)"""
+    account = account or {}
+    hpe = account.get('Oem', {}).get('Hpe', {})
+    body = {}
+    if not account:
+        body['UserName'] = desired['username']
+    if desired.get('password') and (not account or update_password == 'always'):
+        body['Password'] = desired['password']
+    if desired.get('role_id') and desired['role_id'] != account.get('RoleId'):
+        body['RoleId'] = desired['role_id']
+    if desired.get('login_name') and desired['login_name'] != hpe.get('LoginName'):
+        body.setdefault('Oem', {}).setdefault('Hpe', {})['LoginName'] = desired['login_name']
+    privileges = dict((name, value) for name, value in (desired.get('privileges') or \
+                        {}).items() if hpe.get('Privileges', {}).get(name) != value)
+    if privileges:
+        body.setdefault('Oem', {}).setdefault('Hpe', {})['Privileges'] = privileges
+    return body
+
+def plan_accounts(index, desired_accounts, exclusive=False, update_password='on_create', \
+                                                                            protected=None):
+    """Return the create, update and delete actions that turn the indexed accounts into the
+    desired ones. With exclusive, accounts not listed are deleted, except the protected
+    usernames (such as the account the session is logged in with)."""
+    plan = []
+    listed = set()
+    for desired in desired_accounts:
+        username = desired['username']
+        listed.add(username)
+        account = index.get(username)
+        if desired.get('state', 'present') == 'absent':
+            if account:
+                plan.append({'action': 'delete', 'username': username, 'uri': \
+                                                                        account['@odata.id']})
+        elif not account:
+            plan.append({'action': 'create', 'username': username, 'body': \
+                                                                        _account_body(desired)})
+        else:
+            body = _account_body(desired, account, update_password)
+            if body:
+                plan.append({'action': 'update', 'username': username, 'uri': \
+                                                            account['@odata.id'], 'body': body})
+    if exclusive:
+        for username in sorted(set(index) - listed - set(protected or [])):
+            plan.append({'action': 'delete', 'username': username, 'uri': \
+                                                                index[username]['@odata.id']})
+    return plan
+
+def apply_account_plan(_redfishobj, account_collection_uri, plan):
+    """Run the POST/PATCH/DELETE of each planned action. Returns the actions applied and
+    the failed ones with their decoded iLO messages."""
+    applied, failed = [], []
+    for action in plan:
+        if action['action'] == 'create':
+            resp = _redfishobj.post(account_collection_uri, action['body'])
+        elif action['action'] == 'update':
+            resp = _redfishobj.patch(action['uri'], action['body'])
+        else:
+            resp = _redfishobj.delete(action['uri'])
+        summary = {'action': action['action'], 'username': action['username']}
+        if resp.status in [200, 201, 204]:
+            sys.stdout.write("%s %s: Success!\n" % (action['action'], action['username']))
+            applied.append(summary)
+            continue
+        try:
+            summary['messages'] = decode_extended_info(_redfishobj, resp.dict)
+        except Exception:
+            summary['messages'] = []
+        summary['status'] = resp.status
+        sys.stderr.write("%s %s: an http response of '%s' was returned.\n" % \
+                                            (action['action'], action['username'], resp.status))
+        failed.append(summary)
+    return applied, failed
+
+def reconcile_accounts(_redfishobj, desired_accounts, exclusive=False, \
+                       update_password='on_create', protected=None, check_mode=False):
+    """Plan the account changes from one read of the accounts collection and apply them
+    unless check_mode. Returns (plan, applied, failed)."""
+    account_collection_uri, index = get_account_index(_redfishobj)
+    plan = plan_accounts(index, desired_accounts, exclusive, update_password, protected)
+    if check_mode:
+        return plan, [], []
+    applied, failed = apply_account_plan(_redfishobj, account_collection_uri, plan)
+    return plan, applied, failed
+
+if __name__ == "__main__":
+    module = AnsibleModule(
+        argument_spec = dict(
+            name      = dict(required=True),
+            enabled   = dict(required=True, type='bool'),
+            accounts  = dict(required=True, type='list', elements='dict', options=dict(
+                username   = dict(required=True, type='str'),
+                password   = dict(required=False, type='str', no_log=True),
+                login_name = dict(required=False, type='str'),
+                role_id    = dict(required=False, type='str'),
+                privileges = dict(required=False, type='dict'),
+                state      = dict(required=False, default='present', choices=['present', \
+                                                                                    'absent'])
+            )),
+            exclusive = dict(required=False, type='bool', default=False),
+            update_password = dict(required=False, default='on_create', \
+                                                                choices=['on_create', 'always']),
+            baseuri   = dict(required=False, type='str'),
+            login_account = dict(required=False, type='str'),
+            login_password = dict(required=False, type='str', no_log=True)
+        ),
+        supports_check_mode=True
+    )
+
+    # When running remotely connect using the secured (https://) address,
+    # account name, and password to send https requests
+    # SYSTEM_URL acceptable examples:
+    # "https://10.0.0.100"
+    # "https://ilo.hostname"
+    if module.params['baseuri']:
+        SYSTEM_URL = "https://" + module.params['baseuri']
+        LOGIN_ACCOUNT = module.params['login_account']
+        LOGIN_PASSWORD = module.params['login_password']
+    else:
+        SYSTEM_URL = "blobstore://."
+        LOGIN_ACCOUNT = "None"
+        LOGIN_PASSWORD = "None"
+
+    # flag to force disable resource directory. Resource directory and associated operations are
+    # intended for HPE servers.
+    DISABLE_RESOURCE_DIR = False
+
+    try:
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
+    except ServerDownOrUnreachableError as excp:
+        sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
+        sys.exit()
+
+    #never delete the account this module is logged in with
+    PLAN, APPLIED, FAILED = reconcile_accounts(REDFISHOBJ, module.params['accounts'], \
+                            module.params['exclusive'], module.params['update_password'], \
+                            [module.params['login_account']], module.check_mode)
+    release_redfish_client(REDFISHOBJ)
+
+    #passwords are not returned
+    ACTIONS = [dict((key, value) for key, value in ACTION.items() if key != 'body') for ACTION \
+                                                                                        in PLAN]
+    if FAILED:
+        module.fail_json(msg="%d of %d account changes failed." % (len(FAILED), len(PLAN)), \
+                         changed=bool(APPLIED), plan=ACTIONS, applied=APPLIED, failed=FAILED)
+    module.exit_json(changed=bool(APPLIED) or (module.check_mode and bool(PLAN)), plan=ACTIONS, \
+                     applied=APPLIED, resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
@@ -18,11 +18,13 @@ An example of importing an SSL certificate for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show
 
 def import_ssl(_redfishobj, ssl_file_path):
 
@@ -42,11 +44,8 @@ def import_ssl(_redfishobj, ssl_file_path):
         security_service_response = _redfishobj.get(security_service_uri)
         https_cert_uri = security_service_response.obj.Links['HttpsCert']['@odata.id']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#HpeHttpsCert.' in instance['@odata.type']:
-                https_cert_uri = instance['@odata.id']
-                break
+        #Use Resource directory to find the relevant URI
+        https_cert_uri = find_resource_uri(_redfishobj, 'HpeHttpsCert')
 
     if https_cert_uri:
         https_cert_import_uri = _redfishobj.get(https_cert_uri).obj['Actions']\
@@ -59,8 +58,7 @@ def import_ssl(_redfishobj, ssl_file_path):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -68,7 +66,7 @@ def import_ssl(_redfishobj, ssl_file_path):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
             print("\nImporting CSR, this may take a few minutes...\n "\
                   "iLO will reset with new changes.\n")
 
@@ -93,11 +91,8 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
@@ -110,4 +105,4 @@ if __name__ == "__main__":
         import_ssl(REDFISHOBJ, ssl_cert)
     else:
         raise Exception("Invalid SSL certificate.\n")
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
@@ -0,0 +1,134 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Cached message registries and decoding of @Message.ExtendedInfo for HPE iLO systems
+"""
+
+import os
+import re
+import sys
+
+from get_resource_directory import CACHE_DIR, get_ilo_identity, read_cache_file, \
+                                                                            write_cache_file
+from collection_reader import read_collection, get_members
+
+#message indexes already loaded in this process, keyed by iLO firmware version
+_INDEXES = {}
+
+def _registry_family(message_id):
+    """'Base' for 'Base.1.4.PropertyValueNotInList', 'iLO' for 'iLO.2.14.ResetRequired'"""
+    return message_id.split('.')[0]
+
+def _registry_locations(_redfishobj):
+    """Return {registry family: URI of its (English) registry file} for the message
+    registries iLO lists"""
+    registries_uri = _redfishobj.root.obj['Registries']['@odata.id']
+    locations = {}
+    for registry_file in read_collection(_redfishobj, registries_uri):
+        registry = registry_file.get('Registry') or registry_file.get('Id', '')
+        #attribute registries (BIOS settings) are large and carry no messages
+        if 'AttributeRegistry' in registry:
+            continue
+        uris = [location for location in registry_file.get('Location', []) if \
+                                                                            location.get('Uri')]
+        english = [location for location in uris if location.get('Language') == 'en']
+        if uris:
+            locations[_registry_family(registry)] = (english or uris)[0]['Uri']
+    return locations
+
+def _download_registries(_redfishobj, families=None):
+    """Download the registries of the given families (all when None). Returns the registries,
+    whether every one of them could be read, and the locations of all the families."""
+    locations = _registry_locations(_redfishobj)
+    uris = [uri for family, uri in sorted(locations.items()) if families is None or \
+                                                                            family in families]
+    responses = get_members(_redfishobj, uris)
+    return [response.dict for response in responses if response.status == 200], \
+                                all(response.status == 200 for response in responses), locations
+
+def build_message_index(registries):
+    """Index registry messages as {registry family: {message key: message}}, so a MessageId
+    of any registry version is found with two dictionary lookups"""
+    index = {}
+    for registry in registries:
+        messages = index.setdefault(_registry_family(registry.get('Id', '')), {})
+        for key, message in registry.get('Messages', {}).items():
+            messages[key] = dict((name, message[name]) for name in ['Message', 'Severity', \
+                                                            'Resolution'] if name in message)
+    return index
+
+def get_message_index(_redfishobj, families=None, cache_dir=None):
+    """Return the message index of an iLO holding at least the given registry families (all
+    when None). Missing registries are downloaded, only those of the families asked for, and
+    the index is kept on disk per firmware version once none of them failed to download."""
+    firmware_version = get_ilo_identity(_redfishobj)[1] or 'unknown'
+    cache_dir = cache_dir or CACHE_DIR
+    cache_file = os.path.join(cache_dir, "messages_%s.json" % re.sub(r'[^\w.-]', '_', \
+                                                        firmware_version)) if cache_dir else None
+    if firmware_version not in _INDEXES:
+        cached = read_cache_file(cache_file) if cache_file else None
+        _INDEXES[firmware_version] = cached if isinstance(cached, dict) and \
+                                                    'families' in cached else {'families': {}}
+    index = _INDEXES[firmware_version]
+    if families is None and index.get('all_families'):
+        return index['families']
+    if families is not None and all(family in index['families'] for family in families):
+        return index['families']
+
+    missing = None if families is None else [family for family in families if family not in \
+                                                                            index['families']]
+    try:
+        registries, complete, locations = _download_registries(_redfishobj, missing)
+    except Exception as excp:
+        sys.stderr.write("\tUnable to load the message registries: %s\n" % excp)
+        return index['families']
+    index['families'].update(build_message_index(registries))
+    if complete:
+        #families iLO has no registry for are remembered too, so they are not looked up again
+        for family in (missing or []):
+            index['families'].setdefault(family, {})
+        if families is None or all(family in index['families'] for family in locations):
+            index['all_families'] = True
+        if cache_file:
+            write_cache_file(cache_file, index)
+    return index['families']
+
+def extended_info(body):
+    """Return the @Message.ExtendedInfo entries of an error or success response body"""
+    body = body or {}
+    if 'error' in body:
+        return body['error']['@Message.ExtendedInfo']
+    return body['@Message.ExtendedInfo']
+
+def decode_message(index, info):
+    """Resolve one ExtendedInfo entry to its message text with %1.. arguments filled in,
+    severity and resolution. Entries of unknown registries are returned as they are."""
+    message_id = info.get('MessageId', '')
+    message = index.get(_registry_family(message_id), {}).get(message_id.split('.')[-1])
+    if not message:
+        return dict(info)
+    text = message.get('Message', '')
+    for position, arg in reversed(list(enumerate(info.get('MessageArgs', []), 1))):
+        text = text.replace('%%%d' % position, str(arg))
+    return {'MessageId': message_id, 'Message': text, 'Severity': message.get('Severity'), \
+            'Resolution': message.get('Resolution')}
+
+def decode_extended_info(_redfishobj, body):
+    """Decode the ExtendedInfo of a response body. Raises KeyError when there is none."""
+    entries = extended_info(body)
+    index = get_message_index(_redfishobj, set(_registry_family(info.get('MessageId', '')) \
+                                                                        for info in entries))
+    return [decode_message(index, info) for info in entries]
@@ -35,12 +35,16 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from collection_reader import read_collection
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def modify_ilo_user_account(_redfishobj, username_to_modify, new_loginname, new_username, \
                          new_password, role_id, privilege_dict):
@@ -60,9 +64,7 @@ def modify_ilo_user_account(_redfishobj, username_to_modify, new_loginname, new_
             body = {"RoleId": role_id}
     else:
         #obtain all account instances from resource directory
-        for instance in resource_instances:
-            if '#ManagerAccountCollection.' in instance['@odata.type']:
-                account_collection_uri = instance['@odata.id']
+        account_collection_uri = find_resource_uri(_redfishobj, 'ManagerAccountCollection')
         if privilege_dict:
             #HPE server, so modify privileges
             body = {"Oem": {"Hpe": {"Privileges": {}}}}
@@ -79,11 +81,9 @@ def modify_ilo_user_account(_redfishobj, username_to_modify, new_loginname, new_
 
     #find the account to modify
     account_uri_to_modify = None
-    account_uris = REDFISHOBJ.get(account_collection_uri)
-    for account_uri in account_uris.dict['Members']:
-        account = REDFISHOBJ.get(account_uri['@odata.id'])
-        if account.dict['UserName'] == username_to_modify:
-            account_uri_to_modify = account_uri['@odata.id']
+    for account in read_collection(_redfishobj, account_collection_uri):
+        if account.get('UserName') == username_to_modify:
+            account_uri_to_modify = account['@odata.id']
             break
 
     if not account_uri_to_modify:
@@ -91,13 +91,13 @@ def modify_ilo_user_account(_redfishobj, username_to_modify, new_loginname, new_
         return
 
     #modify the account
-    resp = REDFISHOBJ.patch(account_uri_to_modify, body)
+    resp = _redfishobj.patch(account_uri_to_modify, body)
 
     #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
     #error message to see what went wrong
     if resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception as excp:
             sys.stderr.write("A response error occurred, unable to access iLO Extended Message "\
                              "Info...")
@@ -105,7 +105,7 @@ def modify_ilo_user_account(_redfishobj, username_to_modify, new_loginname, new_
         sys.stderr.write("An http response of '%s' was returned.\n" % resp.status)
     else:
         print("Success!\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -152,11 +152,8 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
@@ -164,6 +161,7 @@ if __name__ == "__main__":
     modify_ilo_user_account(REDFISHOBJ, USERNAME_TO_MODIFY, NEW_LOGINNAME, NEW_USERNAME, \
                             NEW_PASSWORD, ROLE_ID, PRIVILEGE_DICT)
 
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
@@ -0,0 +1,57 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Structured module results, with the indented JSON dumps of the examples kept opt-in
+"""
+
+import os
+import sys
+import json
+import threading
+
+# Print payloads as indented JSON, as the examples always used to
+VERBOSE = os.environ.get('ILOREST_VERBOSE', '').lower() in ['1', 'true', 'yes', 'on']
+
+#results kept by show() for the module's exit_json, per thread so that fleet workers keep
+#the results of each iLO apart
+_LOCAL = threading.local()
+
+def _results():
+    if not hasattr(_LOCAL, 'results'):
+        _LOCAL.results = {}
+    return _LOCAL.results
+
+def show(value, name=None, fields=None, title=None):
+    """Keep value as the module result name, reduced to fields when given, and print it
+    (after title) as indented JSON only when VERBOSE. Returns the value kept."""
+    if VERBOSE:
+        if title:
+            sys.stdout.write(title)
+        print(json.dumps(value, indent=4, sort_keys=True))
+    if fields is not None and isinstance(value, dict):
+        value = dict((field, value[field]) for field in fields if field in value)
+    if name:
+        keep(name, value)
+    return value
+
+def keep(name, value):
+    """Keep value as the module result name without printing it"""
+    _results()[name] = value
+
+def module_results():
+    """The results kept by show() and keep() in this thread, returned by modules as
+    'results'"""
+    return dict(_results())
@@ -18,13 +18,16 @@ An example of mounting virtual media for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def mount_virtual_media_iso(_redfishobj, iso_url, media_type, boot_on_next_server_reset):
 
@@ -41,10 +44,8 @@ def mount_virtual_media_iso(_redfishobj, iso_url, media_type, boot_on_next_serve
         managers_members_response = _redfishobj.get(managers_members_uri)
         virtual_media_uri = managers_members_response.obj['VirtualMedia']['@odata.id']
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#VirtualMediaCollection.' in instance['@odata.type']:
-                virtual_media_uri = instance['@odata.id']
+        #Use Resource directory to find the relevant URI
+        virtual_media_uri = find_resource_uri(_redfishobj, 'VirtualMediaCollection')
 
     if virtual_media_uri:
         virtual_media_response = _redfishobj.get(virtual_media_uri)
@@ -65,8 +66,7 @@ def mount_virtual_media_iso(_redfishobj, iso_url, media_type, boot_on_next_serve
                             sys.stderr.write("Failure setting BootOnNextServerReset")
                     if resp.status == 400:
                         try:
-                            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                    sort_keys=True))
+                            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
                         except Exception as excp:
                             sys.stderr.write("A response error occurred, unable to access iLO"
                                              "Extended Message Info...")
@@ -74,7 +74,7 @@ def mount_virtual_media_iso(_redfishobj, iso_url, media_type, boot_on_next_serve
                         sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
                     else:
                         print("Success!\n")
-                        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+                        show(resp.dict, 'response')
                 break
 
 if __name__ == "__main__":
@@ -116,15 +116,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     mount_virtual_media_iso(REDFISHOBJ, MEDIA_URL, MEDIA_TYPE, BOOT_ON_NEXT_SERVER_RESET)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -0,0 +1,208 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of incrementally reading IEL or IML Logs for HPE iLO systems
+"""
+DOCUMENTATION = '''
+---
+module: read_ilo_IEL_IML_log
+short_description: Appends the IEL/IML entries logged since the last run to a JSON lines file
+'''
+
+EXAMPLES = '''
+- name: Ship new IML and IEL entries
+  read_ilo_IEL_IML_log:
+    name: "Read IEL and IML"
+    enabled: True
+    logs: "IEL,IML"
+    log_file: "/var/log/ilo/{{ inventory_hostname }}.jsonl"
+'''
+
+import os
+import sys
+import json
+from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from ansible.module_utils.basic import *
+
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats, \
+                            get_ilo_identity, read_cache_file, write_cache_file, CACHE_DIR
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri, find_resource_uris
+from collection_reader import read_collection, get_members
+
+# Entries requested per page with $top
+DEFAULT_PAGE_SIZE = 100
+
+def get_log_services(_redfishobj):
+    """Return the LogService resources of the system (IML) and the manager (IEL)"""
+    resource_instances = get_resource_directory(_redfishobj)
+    if DISABLE_RESOURCE_DIR or not resource_instances:
+        #if we do not have a resource directory or want to force it's non use to find the
+        #relevant URI
+        log_services = []
+        for parent in ['Systems', 'Managers']:
+            log_services_uri = find_resource_uri(_redfishobj, 'LogServiceCollection', parent, \
+                                                                        use_resource_dir=False)
+            if log_services_uri:
+                log_services.extend(read_collection(_redfishobj, log_services_uri))
+        return log_services
+    #Use Resource directory to find the relevant URI
+    return [_redfishobj.get(uri).dict for uri in find_resource_uris(_redfishobj, 'LogService')]
+
+def _entry_key(entry):
+    try:
+        number = int(entry.get('Id'))
+    except (TypeError, ValueError):
+        number = 0
+    return (entry.get('Created') or '', number)
+
+def _is_newer(entry, cursor):
+    return not cursor or _entry_key(entry) > (cursor.get('Created') or '', cursor.get('Number', 0))
+
+def _read_page(_redfishobj, uri):
+    response = _redfishobj.get(uri)
+    if response.status != 200 or 'Members' not in response.dict:
+        return None
+    return response.dict
+
+def read_new_entries(_redfishobj, entries_uri, cursor, page_size=DEFAULT_PAGE_SIZE):
+    """Return the entries of a log newer than the cursor, oldest first, and the updated
+    cursor. Pages are read with $top/$skip, starting from a $filter on Created when the
+    firmware honours it, otherwise past the entries counted by the last run. Entries already
+    seen are dropped locally, so firmware ignoring these options only costs bandwidth."""
+    cursor = dict(cursor or {})
+    query = ""
+    skip = 0
+    if cursor.get('Created') and cursor.get('filter', True):
+        query = "&$filter=Created gt '%s'" % cursor['Created']
+    elif cursor:
+        skip = cursor.get('Count', 0)
+
+    members, seen = [], set()
+    while True:
+        page = _read_page(_redfishobj, "%s?$expand=.&$top=%d&$skip=%d%s" % (entries_uri, \
+                                                                    page_size, skip, query))
+        if page is None and query:
+            #$filter refused: page past the entries counted by the last run instead
+            cursor['filter'] = False
+            query, skip = "", cursor.get('Count', 0)
+            continue
+        if page is None:
+            #$top/$skip refused as well: read the whole log
+            members = read_collection(_redfishobj, entries_uri)
+            skip = len(members)
+            break
+        if not query and skip and page.get('Members@odata.count', skip) < skip:
+            #the log was cleared since the last run
+            skip = 0
+            continue
+        fresh = [member for member in page['Members'] if member['@odata.id'] not in seen]
+        seen.update(member['@odata.id'] for member in fresh)
+        members.extend(fresh)
+        skip += len(page['Members'])
+        total = page.get('Members@odata.count')
+        if not fresh or len(page['Members']) < page_size or (total is not None and \
+                                                                                skip >= total):
+            break
+
+    missing = [idx for idx, member in enumerate(members) if len(member) == 1]
+    for idx, response in zip(missing, get_members(_redfishobj, [members[idx]['@odata.id'] for \
+                                                                            idx in missing])):
+        members[idx] = response.dict
+
+    entries = sorted([entry for entry in members if _is_newer(entry, cursor)], key=_entry_key)
+    if query and len(entries) < len(members):
+        #entries at or before the cursor came back, so $filter is not supported here
+        cursor['filter'] = False
+    if not query:
+        cursor['Count'] = skip
+    elif cursor.get('Count') is not None:
+        cursor['Count'] += len(entries)
+    if entries:
+        cursor.update({'Id': entries[-1].get('Id'), 'Created': entries[-1].get('Created'), \
+                       'Number': _entry_key(entries[-1])[1]})
+    return entries, cursor
+
+def read_ilo_event_log(_redfishobj, read_IML_IEL, out, cursor_dir=None, \
+                                                                page_size=DEFAULT_PAGE_SIZE):
+    """Write the IEL and/or IML entries logged since the last run to out as JSON lines and
+    advance the cursor kept per iLO and log service. Returns {log: entries written}."""
+    cursor_file = os.path.join(cursor_dir or CACHE_DIR, "logcursor_%s.json" % \
+                                                                get_ilo_identity(_redfishobj)[0])
+    cursors = read_cache_file(cursor_file) or {}
+    written = {}
+    for log_service in get_log_services(_redfishobj):
+        log_id = log_service.get('Id')
+        if log_id not in read_IML_IEL or 'Entries' not in log_service:
+            continue
+        entries, cursors[log_id] = read_new_entries(_redfishobj, log_service['Entries']\
+                                                ['@odata.id'], cursors.get(log_id), page_size)
+        for entry in entries:
+            entry = dict(entry, LogService=log_id)
+            out.write(json.dumps(entry, sort_keys=True) + "\n")
+        out.flush()
+        #only move the cursor once the entries are written
+        write_cache_file(cursor_file, cursors)
+        sys.stderr.write("%d new %s entries.\n" % (len(entries), log_id))
+        written[log_id] = len(entries)
+    return written
+
+if __name__ == "__main__":
+    # When running on the server locally use the following commented values
+    #SYSTEM_URL = None
+    #LOGIN_ACCOUNT = None
+    #LOGIN_PASSWORD = None
+
+    module = AnsibleModule(
+        argument_spec = dict(
+            name       = dict(required=True),
+            enabled    = dict(required=True, type='bool'),
+            logs       = dict(required=False, type='str', default="IEL,IML"),
+            log_file   = dict(required=True, type='str'),
+            cursor_dir = dict(required=False, type='str', default=None),
+            page_size  = dict(required=False, type='int', default=DEFAULT_PAGE_SIZE)
+        )
+    )
+
+    # When running remotely connect using the secured (https://) address,
+    # account name, and password to send https requests
+    # SYSTEM_URL acceptable examples:
+    # "https://10.0.0.100"
+    # "https://ilo.hostname"
+    SYSTEM_URL = "blobstore://."
+    LOGIN_ACCOUNT = "None"
+    LOGIN_PASSWORD = "None"
+
+    # flag to force disable resource directory. Resource directory and associated operations are
+    # intended for HPE servers.
+    DISABLE_RESOURCE_DIR = False
+
+    try:
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
+    except ServerDownOrUnreachableError as excp:
+        sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
+        sys.exit()
+
+    with open(module.params['log_file'], 'a') as LOG_FILE:
+        WRITTEN = read_ilo_event_log(REDFISHOBJ, module.params['logs'], LOG_FILE, \
+                                    module.params['cursor_dir'], module.params['page_size'])
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=sum(WRITTEN.values()) > 0, entries=WRITTEN, \
+                     log_file=module.params['log_file'], \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
@@ -18,11 +18,14 @@ An example of rebooting a server
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def reboot_server(_redfishobj):
 
@@ -37,11 +40,10 @@ def reboot_server(_redfishobj):
         systems_members_uri = next(iter(systems_response.obj['Members']))['@odata.id']
         systems_members_response = _redfishobj.get(systems_members_uri)
     else:
-        for instance in resource_instances:
-            #Use Resource directory to find the relevant URI
-            if '#ComputerSystem.' in instance['@odata.type']:
-                systems_members_uri = instance['@odata.id']
-                systems_members_response = _redfishobj.get(systems_uri)
+        #Use Resource directory to find the relevant URI
+        systems_members_uri = find_resource_uri(_redfishobj, 'ComputerSystem')
+        if systems_members_uri:
+            systems_members_response = _redfishobj.get(systems_members_uri)
 
     if systems_members_response:
         system_reboot_uri = systems_members_response.obj['Actions']['#ComputerSystem.Reset']\
@@ -54,8 +56,7 @@ def reboot_server(_redfishobj):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                    sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "
                                  "Message Info...")
@@ -63,7 +64,7 @@ def reboot_server(_redfishobj):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -95,15 +96,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     reboot_server(REDFISHOBJ)    
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -32,12 +32,16 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from http_trace import http_trace_summary
 from ansible.module_utils.basic import *
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from collection_reader import read_collection
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def remove_ilo_user_account(_redfishobj, username_to_delete):
 
@@ -51,18 +55,13 @@ def remove_ilo_user_account(_redfishobj, username_to_delete):
         account_collection_uri = account_service_response.obj['Accounts']['@odata.id']
     else:
         #obtain all account instances from resource directory
-        for instance in resource_instances:
-            if '#ManagerAccountCollection.' in instance['@odata.type']:
-                account_collection_uri = instance['@odata.id']
-                break
+        account_collection_uri = find_resource_uri(_redfishobj, 'ManagerAccountCollection')
 
     #find the account to delete
     account_uri_to_delete = None
-    account_uris = _redfishobj.get(account_collection_uri)
-    for account_uri in account_uris.dict['Members']:
-        account = _redfishobj.get(account_uri['@odata.id'])
-        if account.dict['UserName'] == username_to_delete:
-            account_uri_to_delete = account_uri['@odata.id']
+    for account in read_collection(_redfishobj, account_collection_uri):
+        if account.get('UserName') == username_to_delete:
+            account_uri_to_delete = account['@odata.id']
             break
 
     if not account_uri_to_delete:
@@ -73,7 +72,7 @@ def remove_ilo_user_account(_redfishobj, username_to_delete):
 
     if resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception as excp:
             sys.stderr.write("A response error occurred, unable to access iLO Extended Message "\
                              "Info...")
@@ -81,7 +80,7 @@ def remove_ilo_user_account(_redfishobj, username_to_delete):
         sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
     else:
         print("Success!\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -113,15 +112,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     remove_ilo_user_account(REDFISHOBJ, ACCOUNT_TO_DELETE)
 
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, results=module_results(), http_trace=http_trace_summary())
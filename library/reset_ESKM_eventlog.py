@@ -18,11 +18,13 @@ An example of reseting the ESKM event log for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show
 
 def reset_ESKM_eventlog(_redfishobj):
 
@@ -43,14 +45,9 @@ def reset_ESKM_eventlog(_redfishobj):
         security_service_eskm_uri = security_service_response.obj.Links['ESKM']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeESKM.' in instance['@odata.type']:
-                security_service_eskm_uri = instance['@odata.id']
-                break
+        security_service_eskm_uri = find_resource_uri(_redfishobj, 'HpeESKM')
 
     if security_service_eskm_uri:
-        security_service_eskm_uri = _redfishobj.get(security_service_uri).obj.Links\
-                                                                            ['ESKM']['@odata.id']
         security_service_eskm_resp = _redfishobj.get(security_service_eskm_uri)
         security_service_eskm_clearlog_uri = security_service_eskm_resp.obj['Actions']\
                                                                 ['#HpeESKM.ClearESKMLog']['target']
@@ -62,8 +59,7 @@ def reset_ESKM_eventlog(_redfishobj):
 
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -71,7 +67,7 @@ def reset_ESKM_eventlog(_redfishobj):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -93,14 +89,11 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     reset_ESKM_eventlog(REDFISHOBJ)
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
@@ -18,17 +18,22 @@ An example of resetting a Manager
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def reset_ilo(_redfishobj):
+    """Reset the iLO. Returns True when iLO accepted the reset."""
 
     managers_members_response = None
+    resp = None
 
     resource_instances = get_resource_directory(_redfishobj)
     if DISABLE_RESOURCE_DIR or not resource_instances:
@@ -40,10 +45,9 @@ def reset_ilo(_redfishobj):
         managers_members_response = _redfishobj.get(managers_members_uri)
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#Manager.' in instance['@odata.type']:
-                managers_members_uri = instance['@odata.id']
-                managers_members_response = _redfishobj.get(managers_members_uri)
+        managers_members_uri = find_resource_uri(_redfishobj, 'Manager')
+        if managers_members_uri:
+            managers_members_response = _redfishobj.get(managers_members_uri)
 
     if managers_members_response:
         reset_ilo_uri = managers_members_response.obj['Actions']['#Manager.Reset']['target']
@@ -52,9 +56,11 @@ def reset_ilo(_redfishobj):
 
     #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
     #error message to see what went wrong
-    if resp.status == 400:
+    if resp is None:
+        sys.stderr.write("Unable to find the manager to reset.\n")
+    elif resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception as excp:
             sys.stderr.write("A response error occurred, unable to access iLO Extended Message "\
                              "Info...")
@@ -62,7 +68,8 @@ def reset_ilo(_redfishobj):
         sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
     else:
         print("Success!\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
+    return resp is not None and resp.status == 200
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -98,15 +105,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     reset_ilo(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
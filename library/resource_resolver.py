@@ -0,0 +1,154 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Indexed lookup of resource URIs by @odata.type namespace for HPE iLO systems
+"""
+
+import sys
+
+from get_resource_directory import get_resource_directory
+from http_trace import record
+
+# Where to find a type when the resource directory is disabled or does not list it:
+# namespace: (collection the walk starts from, link paths followed from its first member).
+# A starting collection of None means the links are followed from the service root.
+FALLBACK_PATHS = {
+    'ComputerSystem': ('Systems', []),
+    'Bios': ('Systems', [['Bios']]),
+    'SecureBoot': ('Systems', [['SecureBoot']]),
+    'HpeServerBootSettings': ('Systems', [['Bios'], ['Oem', 'Hpe', 'Links', 'Boot']]),
+    'HpeiSCSISoftwareInitiator': ('Systems', [['Bios'], ['Oem', 'Hpe', 'Links', 'iScsi']]),
+    'LogServiceCollection': ('Systems', [['LogServices']]),
+    'HpeSmartStorage': ('Systems', [['Oem', 'Hpe', 'Links', 'SmartStorage']]),
+    'HpeSmartStorageArrayControllerCollection': ('Systems', [['Oem', 'Hpe', 'Links', \
+                                                    'SmartStorage'], ['Links', 'ArrayControllers']]),
+    'Manager': ('Managers', []),
+    'EthernetInterfaceCollection': ('Managers', [['EthernetInterfaces']]),
+    'VirtualMediaCollection': ('Managers', [['VirtualMedia']]),
+    'HpeiLOActiveHealthSystem': ('Managers', [['Oem', 'Hpe', 'Links', 'ActiveHealthSystem']]),
+    'HpeiLODateTime': ('Managers', [['Oem', 'Hpe', 'Links', 'DateTimeService']]),
+    'HpeiLOSnmpService': ('Managers', [['Oem', 'Hpe', 'Links', 'Snmp']]),
+    'HpeiLOLicenseCollection': ('Managers', [['Oem', 'Hpe', 'Links', 'LicenseService']]),
+    'HpeSecurityService': ('Managers', [['Oem', 'Hpe', 'Links', 'SecurityService']]),
+    'HpeHttpsCert': ('Managers', [['Oem', 'Hpe', 'Links', 'SecurityService'], \
+                                                                        ['Links', 'HttpsCert']]),
+    'HpeESKM': ('Managers', [['Oem', 'Hpe', 'Links', 'SecurityService'], ['Links', 'ESKM']]),
+    'Chassis': ('Chassis', []),
+    'Power': ('Chassis', [['Power']]),
+    'Thermal': ('Chassis', [['Thermal']]),
+    'UpdateService': (None, [['UpdateService']]),
+    'AccountService': (None, [['AccountService']]),
+    'ManagerAccountCollection': (None, [['AccountService'], ['Accounts']]),
+    'JsonSchemaFileCollection': (None, [['JsonSchemas']]),
+    'MessageRegistryFileCollection': (None, [['Registries']]),
+}
+
+def _client_state(_redfishobj, name):
+    #per client state lives on the client, so it goes away with it and a later client that
+    #happens to get the same id() (as in fleet runs) never sees another iLO's resources
+    state = getattr(_redfishobj, 'ilorest_' + name, None)
+    if state is None:
+        state = {}
+        setattr(_redfishobj, 'ilorest_' + name, state)
+    return state
+
+def odata_namespace(odata_type):
+    """Return the namespace of an @odata.type, e.g. 'Bios' for '#Bios.v1_0_0.Bios'"""
+    return odata_type.lstrip('#').split('.')[0]
+
+def odata_parent(odata_id):
+    """Return the top level collection of a URI, e.g. 'Managers' for /redfish/v1/Managers/1/"""
+    parts = [part for part in odata_id.split('/') if part]
+    return parts[2] if len(parts) > 2 else None
+
+def build_resource_index(resource_instances):
+    """Index resource directory instances by (namespace, None) and (namespace, parent)"""
+    index = {}
+    for instance in resource_instances or []:
+        try:
+            namespace = odata_namespace(instance['@odata.type'])
+            uri = instance['@odata.id']
+        except KeyError:
+            continue
+        index.setdefault((namespace, None), []).append(uri)
+        index.setdefault((namespace, odata_parent(uri)), []).append(uri)
+    return index
+
+def get_resource_index(_redfishobj, use_resource_dir=True):
+    """Return the resource index for a client, building it on first use"""
+    if not use_resource_dir:
+        return {}
+    state = _client_state(_redfishobj, 'resolver')
+    if 'index' not in state:
+        state['index'] = build_resource_index(get_resource_directory(_redfishobj))
+    return state['index']
+
+def get_cached(_redfishobj, uri):
+    """GET a resource once per client and return its dictionary"""
+    cache = _client_state(_redfishobj, 'responses')
+    if uri not in cache:
+        cache[uri] = _redfishobj.get(uri).dict
+    else:
+        record('GET', uri, cache='memo')
+    return cache[uri]
+
+def _follow(data, link_path):
+    for key in link_path:
+        data = data[key]
+    return data['@odata.id']
+
+def walk_resource_uri(_redfishobj, namespace, parent=None):
+    """Locate a resource by walking links from Systems, Managers or Chassis (memoized)"""
+    key = (namespace, parent)
+    walks = _client_state(_redfishobj, 'walks')
+    if key in walks:
+        return walks[key]
+
+    uri = None
+    if namespace in FALLBACK_PATHS:
+        start, link_paths = FALLBACK_PATHS[namespace]
+        start = parent if parent and start else start
+        try:
+            data = _redfishobj.root.dict
+            if start:
+                collection = get_cached(_redfishobj, data[start]['@odata.id'])
+                uri = next(iter(collection['Members']))['@odata.id']
+                data = get_cached(_redfishobj, uri)
+            for hop, link_path in enumerate(link_paths):
+                uri = _follow(data, link_path)
+                if hop < len(link_paths) - 1:
+                    data = get_cached(_redfishobj, uri)
+        except (KeyError, StopIteration, TypeError):
+            sys.stderr.write("Unable to locate a \'%s\' resource.\n" % namespace)
+            uri = None
+
+    walks[key] = uri
+    return uri
+
+def find_resource_uris(_redfishobj, namespace, parent=None, use_resource_dir=True):
+    """Return every URI of the given namespace, optionally limited to a parent collection
+    such as 'Managers'. Falls back to walking links when the resource directory is
+    disabled or does not list the type."""
+    uris = get_resource_index(_redfishobj, use_resource_dir).get((namespace, parent))
+    if uris:
+        return list(uris)
+    uri = walk_resource_uri(_redfishobj, namespace, parent)
+    return [uri] if uri else []
+
+def find_resource_uri(_redfishobj, namespace, parent=None, use_resource_dir=True):
+    """Return the first URI of the given namespace, or None"""
+    uris = find_resource_uris(_redfishobj, namespace, parent, use_resource_dir)
+    return uris[0] if uris else None
@@ -0,0 +1,176 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+An example of rotating the password of one iLO account across many HPE iLO systems
+"""
+DOCUMENTATION = '''
+---
+module: rotate_credentials
+short_description: Changes an account password on many iLOs, verifying and rolling back
+'''
+
+EXAMPLES = '''
+- name: Rotate the monitoring account password
+  rotate_credentials:
+    name: "Rotate monitor password"
+    enabled: True
+    account: monitor
+    current_password: "{{ old_monitor_password }}"
+    new_password: "{{ new_monitor_password }}"
+    max_concurrency: 64
+    endpoints: "{{ ilo_endpoints }}"
+'''
+
+import os
+import time
+import hashlib
+from ansible.module_utils.basic import *
+
+from get_resource_directory import CACHE_DIR, read_cache_file, write_cache_file, \
+                                                                resource_directory_cache_stats
+from http_trace import http_trace_summary
+from session_broker import forget_session, new_client
+from fleet import run_fleet, get_operation, DEFAULT_MAX_CONCURRENCY
+from task_wait import backoff_waits
+
+# Attempts at setting and verifying the new password before rolling back
+DEFAULT_RETRIES = 3
+# Seconds one iLO may take for all attempts and the rollback
+DEFAULT_TIMEOUT = 180
+
+class CredentialRotationError(Exception):
+    """Raised when the new password of an iLO could not be set and verified"""
+
+def verify_login(base_url, username, password):
+    """Log in with a fresh session, bypassing any brokered one. True when iLO accepts it."""
+    try:
+        _redfishobj = new_client(base_url, username=username, password=password)
+        _redfishobj.login()
+        _redfishobj.logout()
+        return True
+    except Exception:
+        return False
+
+def _set_password(_redfishobj, account_uri, password):
+    resp = _redfishobj.patch(account_uri, {'Password': password})
+    return resp.status in [200, 204]
+
+def rotate_host(_redfishobj, account, new_password, current_password=None, \
+                retries=DEFAULT_RETRIES, disable_resource_dir=True):
+    """Set the password of account on one iLO and verify it with a new session, retrying
+    with backoff. When it cannot be verified, the current password is put back (when known)
+    and CredentialRotationError is raised. Returns the number of attempts used."""
+    get_account_index = get_operation('ilo_accounts.get_account_index', disable_resource_dir)
+    index = get_account_index(_redfishobj)[1]
+    if account not in index:
+        raise CredentialRotationError("Account %s not found" % account)
+    account_uri = index[account]['@odata.id']
+    base_url = _redfishobj.base_url
+
+    waits = backoff_waits()
+    for attempt in range(1, retries + 1):
+        if _set_password(_redfishobj, account_uri, new_password) and \
+                                            verify_login(base_url, account, new_password):
+            forget_session(base_url, account)
+            return attempt
+        if attempt < retries:
+            time.sleep(next(waits))
+
+    if current_password is None:
+        raise CredentialRotationError("New password not verified after %d attempts, no "\
+                                      "current password to roll back to" % retries)
+    if _set_password(_redfishobj, account_uri, current_password) and \
+                                        verify_login(base_url, account, current_password):
+        raise CredentialRotationError("New password not verified after %d attempts, rolled "\
+                                      "back" % retries)
+    raise CredentialRotationError("New password not verified after %d attempts and the "\
+                                  "rollback failed" % retries)
+
+def rotation_journal_file(account, new_password, rotation_id=''):
+    """Journal of a rotation, named after the account and new password (through a slow,
+    salted hash) so only a rerun of the same rotation finds it"""
+    key = hashlib.pbkdf2_hmac('sha256', new_password.encode('utf-8'), ("%s|%s" % (account, \
+                                            rotation_id)).encode('utf-8'), 100000).hex()
+    return os.path.join(CACHE_DIR, "rotation_%s.json" % key[:16])
+
+def rotate_credentials(endpoints, account, new_password, current_password=None, \
+                       retries=DEFAULT_RETRIES, max_concurrency=DEFAULT_MAX_CONCURRENCY, \
+                       timeout=DEFAULT_TIMEOUT, journal_file=None, disable_resource_dir=True):
+    """Rotate the password of account on every endpoint, at most max_concurrency at once.
+    Each finished iLO is recorded in the journal as {status, error}; iLOs already rotated by
+    an earlier run with the same journal are skipped. Passwords are never journaled.
+    Returns the journal, with the iLOs rotated by this run under 'rotated'."""
+    journal_file = journal_file or rotation_journal_file(account, new_password)
+    journal = read_cache_file(journal_file) or {}
+    journal.setdefault('hosts', {})
+    journal['account'] = account
+    todo = [endpoint for endpoint in endpoints if journal['hosts'].get(endpoint['baseuri'], \
+                                                                        {}).get('status') != 'ok']
+    rotated = []
+
+    def on_result(host, result):
+        journal['hosts'][host] = dict((key, result[key]) for key in ['status', 'error', \
+                                                                    'seconds'] if key in result)
+        if result['status'] == 'ok':
+            journal['hosts'][host]['attempts'] = result['result']
+            rotated.append(host)
+        write_cache_file(journal_file, journal)
+
+    run_fleet(rotate_host, todo, [account, new_password, current_password, retries, \
+                                disable_resource_dir], max_concurrency, timeout, on_result)
+    journal['journal_file'] = journal_file
+    journal['rotated'] = rotated
+    return journal
+
+if __name__ == "__main__":
+    module = AnsibleModule(
+        argument_spec = dict(
+            name             = dict(required=True),
+            enabled          = dict(required=True, type='bool'),
+            endpoints        = dict(required=True, type='list', no_log=True),
+            account          = dict(required=True, type='str'),
+            new_password     = dict(required=True, type='str', no_log=True),
+            current_password = dict(required=False, type='str', no_log=True, default=None),
+            retries          = dict(required=False, type='int', default=DEFAULT_RETRIES),
+            max_concurrency  = dict(required=False, type='int', default=DEFAULT_MAX_CONCURRENCY),
+            timeout          = dict(required=False, type='int', default=DEFAULT_TIMEOUT),
+            rotation_id      = dict(required=False, type='str', default=''),
+            disable_resource_dir = dict(required=False, type='bool', default=True)
+        )
+    )
+
+    JOURNAL = rotate_credentials(module.params['endpoints'], module.params['account'], \
+                    module.params['new_password'], module.params['current_password'], \
+                    module.params['retries'], module.params['max_concurrency'], \
+                    module.params['timeout'], rotation_journal_file(module.params['account'], \
+                    module.params['new_password'], module.params['rotation_id']), \
+                    module.params['disable_resource_dir'])
+
+    SUMMARY = {}
+    for ENDPOINT in module.params['endpoints']:
+        STATUS = JOURNAL['hosts'].get(ENDPOINT['baseuri'], {}).get('status', 'not_started')
+        SUMMARY[STATUS] = SUMMARY.get(STATUS, 0) + 1
+    if SUMMARY.get('ok', 0) < len(module.params['endpoints']):
+        module.fail_json(msg="Password not rotated on %d iLOs, rerun to resume." % \
+                         (len(module.params['endpoints']) - SUMMARY.get('ok', 0)), \
+                         changed=bool(JOURNAL['rotated']), hosts=JOURNAL['hosts'], \
+                         rotated=JOURNAL['rotated'], summary=SUMMARY, \
+                         journal_file=JOURNAL['journal_file'])
+    module.exit_json(changed=bool(JOURNAL['rotated']), hosts=JOURNAL['hosts'], \
+                     rotated=JOURNAL['rotated'], summary=SUMMARY, \
+                     journal_file=JOURNAL['journal_file'], \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
@@ -0,0 +1,44 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+On-disk store of the JSON schemas served by HPE iLO systems, keyed by schema version
+"""
+
+import os
+import re
+
+from get_resource_directory import CACHE_DIR, read_cache_file, write_cache_file
+
+# A versioned schema never changes, so stored schemas are used without revalidation
+SCHEMA_DIR = os.environ.get('ILOREST_SCHEMA_DIR', os.path.join(CACHE_DIR, 'schemas'))
+
+def schema_id(odata_type):
+    """Return the versioned schema Id of an @odata.type or JsonSchemas member, e.g.
+    'Power.v1_3_0' for '#Power.v1_3_0.Power' or '/redfish/v1/JsonSchemas/Power.v1_3_0/'"""
+    if odata_type.startswith('#'):
+        return '.'.join(odata_type.lstrip('#').split('.')[:2])
+    return odata_type.rstrip('/').split('/')[-1]
+
+def _schema_file(schema_name, schema_dir=None):
+    return os.path.join(schema_dir or SCHEMA_DIR, "%s.json" % re.sub(r'[^\w.-]', '_', \
+                                                                                    schema_name))
+
+def read_schema(schema_name, schema_dir=None):
+    """Return the stored schema for a schema Id or @odata.type, or None. Makes no requests."""
+    return read_cache_file(_schema_file(schema_id(schema_name), schema_dir))
+
+def write_schema(schema_name, schema, schema_dir=None):
+    write_cache_file(_schema_file(schema_id(schema_name), schema_dir), schema)
@@ -0,0 +1,205 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Reuse of Redfish sessions across module runs for HPE iLO systems
+"""
+
+import os
+import sys
+import ssl
+import json
+import time
+import hashlib
+from six.moves import urllib, http_client
+from redfish import RedfishClient
+from http_trace import instrument
+
+# Cross-task session reuse is opt-in: set ILOREST_REUSE_SESSIONS=true in the play or task
+# environment and finish the play with the sessions module (state: absent) to log out. It only
+# applies to https:// base URLs; local (blobstore://) clients have no session to reuse.
+REUSE_SESSIONS = os.environ.get('ILOREST_REUSE_SESSIONS', '').lower() in ['1', 'true', 'yes']
+# Directory holding the cached X-Auth-Tokens. Created 0700, files are written 0600.
+SESSION_CACHE_DIR = os.environ.get('ILOREST_SESSION_DIR', os.path.join(os.path.expanduser('~'),\
+                                                                '.ilorest_ansible', 'sessions'))
+
+# Seconds a request may wait on the network (connect, then each read) before it fails, so an
+# iLO that stops answering cannot hang a task
+REQUEST_TIMEOUT = float(os.environ.get('ILOREST_REQUEST_TIMEOUT', 120))
+
+def _session_file(base_url, login_account):
+    key = "%s|%s" % (base_url, login_account)
+    return os.path.join(SESSION_CACHE_DIR, "session_%s.json" % \
+                                                    hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+def load_session(base_url, login_account):
+    """Return the cached session for an iLO and account, or None"""
+    try:
+        with open(_session_file(base_url, login_account), 'r') as sessionin:
+            return json.load(sessionin)
+    except (IOError, OSError, ValueError):
+        return None
+
+def save_session(base_url, login_account, session):
+    """Store a session where only the current user can read it"""
+    session_file = _session_file(base_url, login_account)
+    if not os.path.isdir(SESSION_CACHE_DIR):
+        os.makedirs(SESSION_CACHE_DIR, 0o700)
+    tmp_file = session_file + '.%d.tmp' % os.getpid()
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as sessionout:
+        json.dump(session, sessionout)
+    os.rename(tmp_file, session_file)
+
+def forget_session(base_url, login_account):
+    """Remove a cached session without contacting iLO"""
+    try:
+        os.remove(_session_file(base_url, login_account))
+    except OSError:
+        pass
+
+def new_client(base_url, timeout=None, **client_kwargs):
+    """Return an instrumented, not yet logged in RedfishClient. Remote clients get socket
+    timeouts of timeout (default REQUEST_TIMEOUT) seconds."""
+    timeout = timeout or REQUEST_TIMEOUT
+    if base_url.startswith('http'):
+        #passed through to the urllib3 PoolManager
+        client_kwargs['timeout'] = timeout
+    _redfishobj = instrument(RedfishClient(base_url=base_url, **client_kwargs))
+    _redfishobj.ilorest_timeout = timeout
+    return _redfishobj
+
+def create_session(base_url, login_account, login_password, timeout=None):
+    """POST to /redfish/v1/Sessions and cache the returned X-Auth-Token"""
+    _redfishobj = new_client(base_url, timeout, username=login_account, password=login_password)
+    new_session = {"UserName": login_account, "Password": login_password}
+    response = _redfishobj.post('/redfish/v1/Sessions', new_session)
+
+    if response.status != 201:
+        sys.stderr.write("ERROR: failed to create a session, an http response of \'%s\' was "\
+                         "returned.\n" % response.status)
+        return None
+
+    session = {'token': response.getheader("x-auth-token"), \
+               'location': urllib.parse.urlparse(response.getheader("location")).path, \
+               'created': time.time()}
+    save_session(base_url, login_account, session)
+    return session
+
+def _session_client(base_url, session, timeout=None):
+    #given a session_key, login() only reads the service root and adopts the key
+    _redfishobj = new_client(base_url, timeout, session_key=session['token'])
+    _redfishobj.login()
+    return _redfishobj
+
+def _session_valid(_redfishobj, session):
+    return _redfishobj.get(session['location']).status != 401
+
+def _remember_login(_redfishobj, login_account, login_password):
+    #RestClient drops the password once logged in; keep it on the client so it can log in
+    #again after iLO resets (a firmware flash) and forgets its sessions
+    _redfishobj.ilorest_login = (login_account, login_password)
+    return _redfishobj
+
+def login_again(_redfishobj):
+    """Give a client from get_redfish_client a new session with the credentials it was created
+    with, e.g. once iLO is back from a reset. Returns True when logged in."""
+    login_account, login_password = getattr(_redfishobj, 'ilorest_login', (None, None))
+    if not login_password or not _redfishobj.base_url.startswith('https://'):
+        return False
+    try:
+        _fresh = new_client(_redfishobj.base_url, getattr(_redfishobj, 'ilorest_timeout', None), \
+                            username=login_account, password=login_password)
+        _fresh.login()
+    except Exception:
+        return False
+    _redfishobj.session_key = _fresh.session_key
+    _redfishobj.connection.session_key = _fresh.session_key
+    _redfishobj.session_location = _fresh.session_location
+    if getattr(_redfishobj, 'ilorest_brokered', False):
+        save_session(_redfishobj.base_url, login_account, {'token': _fresh.session_key, \
+                            'location': _fresh.session_location, 'created': time.time()})
+    return True
+
+def get_redfish_client(base_url, login_account, login_password, timeout=None):
+    """Return a logged in RedfishClient. When session reuse is enabled and the iLO is remote,
+    the cached session is reused and transparently re-created if iLO answers 401. timeout
+    overrides REQUEST_TIMEOUT for the client's requests."""
+    if not REUSE_SESSIONS or not base_url.startswith('https://'):
+        _redfishobj = new_client(base_url, timeout, username=login_account, \
+                                                                        password=login_password)
+        _redfishobj.login()
+        return _remember_login(_redfishobj, login_account, login_password)
+
+    session = load_session(base_url, login_account)
+    if session:
+        _redfishobj = _session_client(base_url, session, timeout)
+        if _session_valid(_redfishobj, session):
+            _redfishobj.ilorest_brokered = True
+            return _remember_login(_redfishobj, login_account, login_password)
+        sys.stdout.write("Cached session expired, logging in again.\n")
+        forget_session(base_url, login_account)
+
+    session = create_session(base_url, login_account, login_password, timeout)
+    if not session:
+        _redfishobj = new_client(base_url, timeout, username=login_account, \
+                                                                        password=login_password)
+        _redfishobj.login()
+        return _remember_login(_redfishobj, login_account, login_password)
+    _redfishobj = _session_client(base_url, session, timeout)
+    _redfishobj.ilorest_brokered = True
+    return _remember_login(_redfishobj, login_account, login_password)
+
+def release_redfish_client(_redfishobj):
+    """Log out a client from get_redfish_client, keeping brokered sessions for later tasks"""
+    if getattr(_redfishobj, 'ilorest_brokered', False):
+        #kept open for later tasks
+        _redfishobj.ilorest_brokered = False
+        return
+    _redfishobj.logout()
+
+def drop_session(_redfishobj):
+    """Forget the session of a client whose iLO was just reset, which ends every session, so
+    that release_redfish_client does not send a logout to an iLO that is restarting"""
+    _redfishobj.session_location = None
+    if getattr(_redfishobj, 'ilorest_brokered', False):
+        _redfishobj.ilorest_brokered = False
+        forget_session(_redfishobj.base_url, getattr(_redfishobj, 'ilorest_login', \
+                                                                                (None, None))[0])
+
+def close_session(base_url, login_account):
+    """Delete the cached session on iLO and locally. Returns True if one was closed."""
+    session = load_session(base_url, login_account)
+    if not session:
+        return False
+    forget_session(base_url, login_account)
+    _redfishobj = _session_client(base_url, session)
+    response = _redfishobj.delete(session['location'])
+    return response.status in [200, 204]
+
+def open_raw_connection(_redfishobj):
+    """Return an unopened http_client connection to the iLO behind a client and the headers
+    that authenticate it, for requests whose body must be streamed. It has the socket timeout
+    of the client. Returns (None, None) for local (blobstore) clients."""
+    url = urllib.parse.urlparse(getattr(_redfishobj, 'base_url', '') or '')
+    timeout = getattr(_redfishobj, 'ilorest_timeout', None) or REQUEST_TIMEOUT
+    headers = {'X-Auth-Token': _redfishobj.session_key, \
+               'Cookie': 'sessionKey=' + _redfishobj.session_key}
+    if url.scheme == 'https':
+        return http_client.HTTPSConnection(url.netloc, timeout=timeout, \
+                                            context=ssl._create_unverified_context()), headers
+    elif url.scheme == 'http':
+        return http_client.HTTPConnection(url.netloc, timeout=timeout), headers
+    return None, None
@@ -14,12 +14,17 @@
 
 # -*- coding: utf-8 -*-
 """
-An example of manually managing sessions with Redfish
+An example of manually managing sessions with Redfish. Sessions created here are cached and
+reused by the other modules when ILOREST_REUSE_SESSIONS is set; use state absent in the final
+task of a play to log the cached session out.
 """
 DOCUMENTATION = '''
 ---
 module: sessions
 short_description: This module creates/use/deletes a user session
+description:
+  - Sessions are only reused by tasks that connect to iLO over https (with baseuri or
+    dia_ilo_ip). Tasks using local login (blobstore) always log in afresh.
 '''
 
 EXAMPLES = '''
@@ -30,41 +35,32 @@ EXAMPLES = '''
     enabled: True
     login_account: 'admin'
     login_password: 'password'
+
+- name: Log out the session reused by the previous tasks
+  sessions:
+    name: "Delete cached user session"
+    enabled: True
+    state: absent
+    baseuri: '10.0.0.100'
+    login_account: 'admin'
+    login_password: 'password'
 '''
 
 import sys
-import json
-from six.moves import urllib
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
 from ansible.module_utils.basic import *
 
-def sessions(_redfishobj, login_account, login_password):
+from session_broker import create_session, close_session
+from http_trace import http_trace_summary
 
-    new_session = {"UserName": login_account, "Password": login_password}
-    response = _redfishobj.post('/redfish/v1/Sessions', new_session)
+def sessions(base_url, login_account, login_password):
 
-    if response.status == 201:
-        print("Success!\n")
-        session_uri = response.getheader("location")
-        session_uri = urllib.parse.urlparse(session_uri)
-        sys.stdout.write("\tSession " + session_uri.path + " created.\n")
-
-        x_auth_token = response.getheader("x-auth-token")
-        sys.stdout.write("\tThis is the session X-Auth Token key " + x_auth_token + ".\n")
+    session = create_session(base_url, login_account, login_password)
 
-        # Delete the created session
-        sys.stdout.write("\tTerminating this session.\n")
-        sessresp = _redfishobj.delete(session_uri.path)
-        print(json.dumps(sessresp.dict, indent=4, sort_keys=True))
-    else:
-        sys.stderr.write("ERROR: failed to create a session.\n")
-        try:
-            print(json.dumps(sessresp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                            sort_keys=True))
-        except Exception as excp:
-            sys.stderr.write("A response error occurred, unable to access iLO Extended"
-                             " Message Info...")
+    if session:
+        print("Success!\n")
+        sys.stdout.write("\tSession " + session['location'] + " created and cached for reuse.\n")
+    return session
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -76,8 +72,9 @@ if __name__ == "__main__":
             state     = dict(default='present', choices=['present', 'absent']),
             name      = dict(required=True),
             enabled   = dict(required=True, type='bool'),
+            baseuri   = dict(required=False, type='str'),
             login_account = dict(required=True, type='str'),
-            login_password = dict(required=True, type='str')
+            login_password = dict(required=True, type='str', no_log=True)
         )
     )
     # Set variables based on parameters from .yml
@@ -89,16 +86,23 @@ if __name__ == "__main__":
     # SYSTEM_URL acceptable examples:
     # "https://10.0.0.100"
     # "https://ilo.hostname"
-    SYSTEM_URL = "blobstore://."
-    LOGIN_ACCOUNT = "None"
-    LOGIN_PASSWORD = "None"
+    if module.params['baseuri']:
+        SYSTEM_URL = "https://" + module.params['baseuri']
+    else:
+        SYSTEM_URL = "blobstore://."
+        LOGIN_ACCOUNT = "None"
+        LOGIN_PASSWORD = "None"
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
+        if module.params['state'] == 'absent':
+            CLOSED = close_session(SYSTEM_URL, LOGIN_ACCOUNT)
+            module.exit_json(changed=CLOSED, http_trace=http_trace_summary())
+        SESSION = sessions(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    sessions(REDFISHOBJ, LOGIN_ACCOUNT, LOGIN_PASSWORD)
+    if not SESSION:
+        module.fail_json(msg="Failed to create a session.")
+    module.exit_json(changed=True, session_uri=SESSION['location'], \
+                     http_trace=http_trace_summary())
@@ -18,12 +18,15 @@ An example of setting the active Manager NIC
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def set_active_ilo_nic(_redfishobj):
 
@@ -47,15 +50,12 @@ def set_active_ilo_nic(_redfishobj):
             ethernet_data[_member['@odata.id']] = _tmp
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#EthernetInterfaceCollection.' in instance['@odata.type'] and 'Managers' in \
-                                                                        instance['@odata.id']:
-                ethernet_uri = instance['@odata.id']
-                ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
-                for _ethernet_interface in ethernet_interfaces:
-                    ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
-                                                        get(_ethernet_interface['@odata.id']).dict
-                break
+        ethernet_uri = find_resource_uri(_redfishobj, 'EthernetInterfaceCollection', 'Managers')
+        if ethernet_uri:
+            ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
+            for _ethernet_interface in ethernet_interfaces:
+                ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
+                                                    get(_ethernet_interface['@odata.id']).dict
 
     if ethernet_data:
         print("\n\nShowing all available ethernet management interfaces before changes:\n\n")
@@ -75,8 +75,7 @@ def set_active_ilo_nic(_redfishobj):
         resp = _redfishobj.patch(ethernet, body)
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -84,7 +83,7 @@ def set_active_ilo_nic(_redfishobj):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success! You will need to reset iLO for this change to take effect.\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
         break
 
 
@@ -124,15 +123,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     set_active_ilo_nic(REDFISHOBJ)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -18,12 +18,25 @@ An example of setting an ISCSI boot instance for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from bios_registry import BiosAttributeError
+from message_registry import decode_extended_info
+from module_output import show, module_results
+
+def check_iscsi_properties(iscsi_sources, iscsi_properties):
+    """Return the problems with a requested boot instance change, empty when there are none"""
+    instance = iscsi_properties.get('iSCSIBootInstance')
+    if not isinstance(instance, int) or not 0 <= instance < len(iscsi_sources):
+        return ["iSCSIBootInstance must be between 0 and %d, not %r" % (len(iscsi_sources) - 1, \
+                                                                                    instance)]
+    return ["Unknown iSCSI source property %s" % name for name in sorted(iscsi_properties) \
+            if name != 'iSCSIBootInstance' and name not in iscsi_sources[instance]]
 
 def set_bios_iscsi(_redfishobj, iscsi_properties):
 
@@ -43,13 +56,17 @@ def set_bios_iscsi(_redfishobj, iscsi_properties):
         iscsi_uri = bios_response.obj.Oem.Hpe.Links['iScsi']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeiSCSISoftwareInitiator.' in instance['@odata.type']:
-                iscsi_uri = instance['@odata.id']
+        iscsi_uri = find_resource_uri(_redfishobj, 'HpeiSCSISoftwareInitiator')
 
     if iscsi_uri:
         iscsi_data = _redfishobj.get(iscsi_uri)
         iscsi_settings_uri = iscsi_data.obj['@Redfish.Settings']['SettingsObject']['@odata.id']
+        #iSCSI sources are not in the bios attribute registry, so check the request against
+        #the sources iLO reports before sending it
+        errors = check_iscsi_properties(iscsi_data.dict.get('iSCSISources', []), \
+                                                                                iscsi_properties)
+        if errors:
+            raise BiosAttributeError(errors)
         for inst, _ in enumerate(iscsi_data.obj['iSCSISources']):
             if iscsi_properties['iSCSIBootInstance'] == inst:
                 del iscsi_properties["iSCSIBootInstance"]
@@ -60,17 +77,16 @@ def set_bios_iscsi(_redfishobj, iscsi_properties):
                 #iLO extended info error message to see what went wrong
                 if resp.status == 400:
                     try:
-                        print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], \
-                                                                        indent=4, sort_keys=True))
+                        show(decode_extended_info(_redfishobj, resp.dict), 'messages')
                     except Exception as excp:
-                        print(json.dumps(resp.ori, indent=4, sort_keys=True))
+                        show(resp.ori, 'response')
                         sys.stderr.write("A response error occurred, unable to access iLO " \
                                          "Extended Message Info...")
                 elif resp.status != 200:
                     sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
                 else:
                     print("Success! A system reboot will be required to complete the change.\n")
-                    print(json.dumps(resp.dict, indent=4, sort_keys=True))
+                    show(resp.dict, 'response')
                 break
 
 if __name__ == "__main__":
@@ -100,15 +116,17 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    set_bios_iscsi(REDFISHOBJ, ISCSI_PROPERTIES)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    try:
+        set_bios_iscsi(REDFISHOBJ, ISCSI_PROPERTIES)
+    except BiosAttributeError as excp:
+        release_redfish_client(REDFISHOBJ)
+        module.fail_json(msg="Invalid iSCSI properties: %s" % excp, errors=excp.errors)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
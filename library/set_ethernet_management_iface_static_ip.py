@@ -18,11 +18,13 @@ An example of setting the Manager ethernet interface static IP
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show
 
 def set_ilo_static_ipv4(_redfishobj, ipv4_dict, dns_dict):
 
@@ -47,15 +49,12 @@ def set_ilo_static_ipv4(_redfishobj, ipv4_dict, dns_dict):
             ethernet_data[_member['@odata.id']] = _tmp
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#EthernetInterfaceCollection.' in instance['@odata.type'] and 'Managers' in \
-                                                                        instance['@odata.id']:
-                ethernet_uri = instance['@odata.id']
-                ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
-                for _ethernet_interface in ethernet_interfaces:
-                    ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
-                                                        get(_ethernet_interface['@odata.id']).dict
-                break
+        ethernet_uri = find_resource_uri(_redfishobj, 'EthernetInterfaceCollection', 'Managers')
+        if ethernet_uri:
+            ethernet_interfaces = _redfishobj.get(ethernet_uri).obj['Members']
+            for _ethernet_interface in ethernet_interfaces:
+                ethernet_data[_ethernet_interface['@odata.id']] = _redfishobj.\
+                                                    get(_ethernet_interface['@odata.id']).dict
 
     if ethernet_data:
         print("\n\nShowing all available ethernet management interfaces before changes:\n\n")
@@ -63,20 +62,17 @@ def set_ilo_static_ipv4(_redfishobj, ipv4_dict, dns_dict):
             sys.stdout.write("Ethernet Management Inteface \'%s\'\n" % ethernet_data\
                                                                             [interface].get('Id'))
 
-            sys.stdout.write("\'DHCPv4\':\n")
             if ethernet_data[interface].get('DHCPv4'):
-                print(json.dumps(ethernet_data[interface].get('DHCPv4'), indent=4, sort_keys=True))
+                show(ethernet_data[interface].get('DHCPv4'), 'dhcpv4', title="\'DHCPv4\':\n")
             else:
-                print(json.dumps(ethernet_data[interface]['Oem']['Hpe'].get('DHCPv4'), indent=4, \
-                                                                                sort_keys=True))
-            sys.stdout.write("\'IPv4\':\n")
+                show(ethernet_data[interface]['Oem']['Hpe'].get('DHCPv4'), 'dhcpv4', \
+                                                                    title="\'DHCPv4\':\n")
             if ethernet_data[interface].get('IPv4StaticAddresses'):
-                print(json.dumps(ethernet_data[interface].get('IPv4Addresses'), indent=4, \
-                                                                                sort_keys=True))
-            sys.stdout.write("\'StaticNameServers\':\n")
+                show(ethernet_data[interface].get('IPv4Addresses'), 'ipv4_addresses', \
+                                                                    title="\'IPv4\':\n")
             if ethernet_data[interface].get('StaticNameServers'):
-                print(json.dumps(ethernet_data[interface].get('StaticNameServers'), indent=4, \
-                                                                                sort_keys=True))
+                show(ethernet_data[interface].get('StaticNameServers'), 'static_name_servers', \
+                                                            title="\'StaticNameServers\':\n")
 
     for ethernet in ethernet_data:
         sys.stdout.write("Ethernet Interface: %s\n" % ethernet)
@@ -105,8 +101,7 @@ def set_ilo_static_ipv4(_redfishobj, ipv4_dict, dns_dict):
 def ilo_response(_redfishobj, resp):
     if resp.status == 400:
         try:
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                            sort_keys=True))
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
         except Exception as excp:
             sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                              "Message Info...")
@@ -114,7 +109,7 @@ def ilo_response(_redfishobj, resp):
         sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
     else:
         print("Success! Suggest to reset iLO for settings to take effect.\n")
-        print(json.dumps(resp.dict, indent=4, sort_keys=True))
+        show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -145,14 +140,11 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     set_ilo_static_ipv4(REDFISHOBJ, IPV4_DICT, DNS_DICT)
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
@@ -18,15 +18,18 @@ An example of setting NTP servers for HPE iLO systems
 """
 
 import sys
-import json
 import time
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
 from reset_ilo import reset_ilo
 from enable_ntp_servers import enable_ntp
+from module_output import show, module_results
 
 def set_ilo_ntp_servers(_redfishobj, ntp_server_list):
 
@@ -43,9 +46,7 @@ def set_ilo_ntp_servers(_redfishobj, ntp_server_list):
         date_time_uri = managers_members_response.obj.Oem.Hpe.Links['DateTimeService']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeiLODateTime.' in instance['@odata.type']:
-                date_time_uri = instance['@odata.id']
+        date_time_uri = find_resource_uri(_redfishobj, 'HpeiLODateTime')
 
     if date_time_uri:
         data = _redfishobj.get(date_time_uri)
@@ -57,8 +58,7 @@ def set_ilo_ntp_servers(_redfishobj, ntp_server_list):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended " \
                                  "Message Info...")
@@ -66,18 +66,14 @@ def set_ilo_ntp_servers(_redfishobj, ntp_server_list):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
             ntp_data = _redfishobj.get(date_time_uri).dict.get('StaticNTPServers')
-            print("Printing updated NTP Servers:\n")
-            print(json.dumps(ntp_data, indent=4, sort_keys=True))
+            show(ntp_data, 'ntp_servers', title="Printing updated NTP Servers:\n")
 
 def give_client():
     try:
-        # Create a Redfish client object
-        rf_obj = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        rf_obj.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        rf_obj = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
@@ -119,7 +115,7 @@ if __name__ == "__main__":
     reset_ilo(REDFISHOBJ)
     sys.stdout.write("iLO has been reset...sleeping 60 seconds before trying login.\n")
     #logout to release the channel
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
     #delete the redfish object. By a new token must be issued when iLO is reset
     #(all channels are cleared), and this library does not cache credentials (for security reasons)
     #A new redfish object must be created and asigned the appropriate credentials.
@@ -127,6 +123,7 @@ if __name__ == "__main__":
     time.sleep(60)
     REDFISHOBJ = give_client()
     set_ilo_ntp_servers(REDFISHOBJ, NTP_SERVER_LIST)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
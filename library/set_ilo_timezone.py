@@ -32,12 +32,16 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from etag_write import patch_if_match
+from module_output import show, module_results
 
 def set_timezone(_redfishobj, timezone):
 
@@ -54,24 +58,22 @@ def set_timezone(_redfishobj, timezone):
         date_time_uri = managers_members_response.obj.Oem.Hpe.Links['DateTimeService']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeiLODateTime.' in instance['@odata.type']:
-                date_time_uri = instance['@odata.id']
+        date_time_uri = find_resource_uri(_redfishobj, 'HpeiLODateTime')
 
     if date_time_uri:
-        data = _redfishobj.get(date_time_uri)
-        if data.dict.get('TimeZone'):
-            _data = {'TimeZone': {"Name": timezone}}
-            resp = _redfishobj.patch(date_time_uri, _data)
-        else:
-            raise Exception("\'TimeZone\' property is not available/modifyable.\n")
+        def timezone_body(date_time):
+            if not date_time.get('TimeZone'):
+                raise Exception("\'TimeZone\' property is not available/modifyable.\n")
+            return {'TimeZone': {"Name": timezone}}
+        #PATCH with If-Match, so a change made since the read is not overwritten
+        resp, data, updated = patch_if_match(_redfishobj, date_time_uri, timezone_body, \
+                                                                                confirm=True)
         #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
-                print(json.dumps(data.obj.get('TimeZoneList'), indent=4, sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
+                show(data.get('TimeZoneList'), 'timezone_list')
                 sys.stderr.write("Check the TimeZone value...\n")
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended " \
@@ -80,10 +82,8 @@ def set_timezone(_redfishobj, timezone):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
-            ntp_data = _redfishobj.get(date_time_uri).dict.get('TimeZone')
-            print("Printing updated NTP Servers:\n")
-            print(json.dumps(ntp_data, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
+            show(updated.get('TimeZone'), 'timezone', title="Printing updated NTP Servers:\n")
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -117,15 +117,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     set_timezone(REDFISHOBJ, TIMEZONE)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
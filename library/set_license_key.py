@@ -18,12 +18,15 @@ An example of adding an license key for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def set_license_key(_redfishobj, ilo_key):
 
@@ -40,9 +43,7 @@ def set_license_key(_redfishobj, ilo_key):
         ilo_lic_uri = managers_members_response.obj.Oem.Hpe.Links['LicenseService']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeiLOLicense.' in instance['@odata.type']:
-                ilo_lic_uri = instance['@odata.id']
+        ilo_lic_uri = find_resource_uri(_redfishobj, 'HpeiLOLicense')
 
     if ilo_lic_uri:
         ilo_license_collection = _redfishobj.get(ilo_lic_uri)
@@ -54,15 +55,13 @@ def set_license_key(_redfishobj, ilo_key):
             sys.stdout.write("This machine will not show the full License Key.\n")
             ilo_license_data = _redfishobj.get(ilo_license_member_uri).obj['LicenseKey']
 
-        sys.stdout.write("Current iLO License Data:\n")
-        print(json.dumps(ilo_license_data, indent=4, sort_keys=True))
+        show(ilo_license_data, 'license_before', title="Current iLO License Data:\n")
         resp = _redfishobj.post(ilo_lic_uri, {'LicenseKey' : ilo_key})
         #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
                 sys.stderr.write("Check the validity of your license key...\n")
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO " \
@@ -71,7 +70,7 @@ def set_license_key(_redfishobj, ilo_key):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -102,16 +101,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     set_license_key(REDFISHOBJ, ILO_LICENSE_KEY)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
   
@@ -18,13 +18,16 @@ An example of setting the server asset tag
 """
 
 import sys
-import json
-import time
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from etag_write import patch_if_match
+from module_output import show, module_results
 
 def set_server_asset_tag(_redfishobj, tag):
 
@@ -41,21 +44,21 @@ def set_server_asset_tag(_redfishobj, tag):
         systems_members_response = _redfishobj.get(systems_members_uri)
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#ComputerSystem.' in instance['@odata.type']:
-                systems_members_uri = instance['@odata.id']
-                systems_members_response = _redfishobj.get(systems_members_uri)
+        systems_members_uri = find_resource_uri(_redfishobj, 'ComputerSystem')
+        if systems_members_uri:
+            systems_members_response = _redfishobj.get(systems_members_uri)
 
     if systems_members_response and systems_members_uri and tag:
         print("Current Asset Tag: \'%s\'\n" % systems_members_response.dict.get("AssetTag"))
 
-        resp = _redfishobj.patch(systems_members_uri, {"AssetTag" : tag})
+        #PATCH with If-Match, so a change made since the read is not overwritten
+        resp, _, updated = patch_if_match(_redfishobj, systems_members_uri, lambda system: \
+                                {"AssetTag" : tag}, systems_members_response, confirm=True)
         #If iLO responds with soemthing outside of 200 or 201 then lets check the iLO extended info
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -63,10 +66,8 @@ def set_server_asset_tag(_redfishobj, tag):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
-            time.sleep(10) #going to wait 10 seconds before obtaining the LED indicator state
-            sys.stdout.write("\nUpdated Asset Tag: \'%s\'\n" % _redfishobj.\
-                                                    get(systems_members_uri).dict.get("AssetTag"))
+            show(resp.dict, 'response')
+            sys.stdout.write("\nUpdated Asset Tag: \'%s\'\n" % updated.get("AssetTag"))
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -104,15 +105,13 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     set_server_asset_tag(REDFISHOBJ, ASSET_TAG)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -32,13 +32,16 @@ EXAMPLES = '''
 '''
 
 import sys
-import json
 import time
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
+from http_trace import http_trace_summary
 from ansible.module_utils.basic import *
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
 def set_uid_light(_redfishobj):
 
@@ -56,10 +59,9 @@ def set_uid_light(_redfishobj):
         systems_members_response = _redfishobj.get(systems_members_uri)
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#ComputerSystem.' in instance['@odata.type']:
-                systems_members_uri = instance['@odata.id']
-                systems_members_response = _redfishobj.get(systems_members_uri)
+        systems_members_uri = find_resource_uri(_redfishobj, 'ComputerSystem')
+        if systems_members_uri:
+            systems_members_response = _redfishobj.get(systems_members_uri)
 
     if systems_members_response and systems_members_uri:
         print("Current Indicator LED Status: \'%s\'\n" % systems_members_response.dict.\
@@ -76,8 +78,7 @@ def set_uid_light(_redfishobj):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -85,7 +86,7 @@ def set_uid_light(_redfishobj):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
             time.sleep(10) #going to wait 10 seconds before obtaining the LED indicator state
             sys.stdout.write("\nUpdated Indicator LED Status: \'%s\'\n" % _redfishobj.\
                                                     get(systems_members_uri).dict['IndicatorLED'])
@@ -120,14 +121,12 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     set_uid_light(REDFISHOBJ)
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=True, results=module_results(), http_trace=http_trace_summary())
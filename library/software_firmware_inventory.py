@@ -18,17 +18,21 @@ An example of viewing the firmware inventory on HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from collection_reader import read_collection, DEFAULT_MAX_WORKERS
+from module_output import show
 
-def get_inventory_uri(_redfishobj, select):
+def get_inventory_uri(_redfishobj, select, max_workers=DEFAULT_MAX_WORKERS):
 
     update_service_uri = None
     inventory_uri = None
+    inventory = []
 
     resource_instances = get_resource_directory(_redfishobj)
     if DISABLE_RESOURCE_DIR or not resource_instances:
@@ -37,9 +41,7 @@ def get_inventory_uri(_redfishobj, select):
         update_service_uri = _redfishobj.root.obj['UpdateService']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#UpdateService.' in instance['@odata.type']:
-                update_service_uri = instance['@odata.id']
+        update_service_uri = find_resource_uri(_redfishobj, 'UpdateService')
 
     if update_service_uri:
         update_service_resp = _redfishobj.get(update_service_uri)
@@ -51,26 +53,31 @@ def get_inventory_uri(_redfishobj, select):
             raise Exception("Invalid selection provided: Please select 'software' or 'firmware' " \
                             "to obtain the relevant invetory data.")
         sys.stdout.write("Printing data in invetory: %s\n" % inventory_uri)
-        get_inventory(_redfishobj, inventory_uri)
+        inventory = get_inventory(_redfishobj, inventory_uri, max_workers)
+    return inventory
 
-def get_inventory(_redfishobj, inventory_uri):
+def get_inventory(_redfishobj, inventory_uri, max_workers=DEFAULT_MAX_WORKERS):
 
-    _members = _redfishobj.get(inventory_uri).obj['Members']
-    if not _members:
+    #members come from one $expand request where supported, otherwise they are fetched
+    #concurrently, and are returned in collection order either way
+    inventory = read_collection(_redfishobj, inventory_uri, max_workers=max_workers)
+    if not inventory:
         sys.stderr.write("\tInventory empty.\n")
-    else:
-        for inventory_item in _members:
-            _resp = _redfishobj.get(inventory_item['@odata.id'])
-            sys.stdout.write("Printing contents of inventory item, \'%s\':\'%s\'\n" % \
-                                            (_resp.dict.get('Name'), _resp.dict.get('Description')))
-            print(json.dumps(_resp.dict, indent=4, sort_keys=True))
+    for inventory_item in inventory:
+        show(inventory_item, title="Printing contents of inventory item, \'%s\':\'%s\'\n" % \
+                                    (inventory_item.get('Name'), inventory_item.get('Description')))
+    return inventory
 
 if __name__ == "__main__":
     module = AnsibleModule(
         argument_spec = dict(            
             name      = dict(required=True),
             enabled   = dict(required=True, type='bool'),
-            select_type = dict(required=True, type='str')
+            select_type = dict(required=True, type='str'),
+            max_concurrency = dict(required=False, type='int', default=DEFAULT_MAX_WORKERS),
+            baseuri   = dict(required=False, type='str'),
+            login_account = dict(required=False, type='str', default=None),
+            login_password = dict(required=False, type='str', no_log=True, default=None)
         )
     )
 
@@ -79,10 +86,18 @@ if __name__ == "__main__":
     # SYSTEM_URL acceptable examples:
     # "https://10.0.0.100"
     # "https://ilo.hostname"
-    SYSTEM_URL = "blobstore://."
-    LOGIN_ACCOUNT = "None"
-    LOGIN_PASSWORD = "None"
+    if module.params['baseuri']:
+        SYSTEM_URL = "https://" + module.params['baseuri']
+        LOGIN_ACCOUNT = module.params['login_account']
+        LOGIN_PASSWORD = module.params['login_password']
+    else:
+        SYSTEM_URL = "blobstore://."
+        LOGIN_ACCOUNT = "None"
+        LOGIN_PASSWORD = "None"
     SELECT = module.params['select_type']
+    # number of inventory items fetched at once, 1 fetches them one after another. Local
+    # login always fetches them one after another.
+    MAX_CONCURRENCY = module.params['max_concurrency']
 
     # flag to force disable resource directory. Resource directory and associated operations are
     # intended for HPE servers.
@@ -90,14 +105,14 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    get_inventory_uri(REDFISHOBJ, SELECT)
-    REDFISHOBJ.logout()
+    INVENTORY = get_inventory_uri(REDFISHOBJ, SELECT, MAX_CONCURRENCY)
+    release_redfish_client(REDFISHOBJ)
+    module.exit_json(changed=False, inventory=INVENTORY, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
@@ -0,0 +1,131 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Waiting for long running iLO operations (tasks, firmware flashes) to finish on HPE iLO systems
+"""
+
+import sys
+import time
+import random
+
+from session_broker import login_again
+
+# Seconds before the first poll, the longest wait between polls, and the growth per poll
+POLL_INITIAL = 2
+POLL_MAX = 30
+POLL_FACTOR = 2
+# Each wait is randomly shortened or lengthened by up to this fraction, so many iLOs polled
+# from one controller do not line up
+POLL_JITTER = 0.25
+# Seconds to wait for an update before giving up
+DEFAULT_TIMEOUT = 1800
+
+# Oem.Hpe.State values of UpdateService once a flash is over
+UPDATE_DONE_STATES = ['Complete', 'Error', 'Canceled']
+UPDATE_FAILED_STATES = ['Error', 'Canceled']
+# TaskState values of a finished Redfish task
+TASK_DONE_STATES = ['Completed', 'Exception', 'Killed', 'Cancelled']
+
+def backoff_waits(initial=None, maximum=None, factor=None, jitter=None):
+    """Yield exponentially growing, jittered waits capped at maximum (defaults POLL_*)"""
+    wait = POLL_INITIAL if initial is None else initial
+    maximum = POLL_MAX if maximum is None else maximum
+    factor = POLL_FACTOR if factor is None else factor
+    jitter = POLL_JITTER if jitter is None else jitter
+    while True:
+        yield wait * random.uniform(1 - jitter, 1 + jitter)
+        wait = min(wait * factor, maximum)
+
+def wait_until(poll, done, timeout=DEFAULT_TIMEOUT, progress=None, **backoff):
+    """Call poll() with backoff until done(result) is true or timeout seconds have passed.
+    Returns (last result, timed out). progress(result) is called after every poll."""
+    deadline = time.time() + timeout
+    waits = backoff_waits(**backoff)
+    while True:
+        result = poll()
+        if progress:
+            progress(result)
+        if done(result):
+            return result, False
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return result, True
+        time.sleep(min(next(waits), remaining))
+
+def _get_quietly(_redfishobj, uri, lost):
+    """GET that survives iLO resetting itself mid flash: returns None instead of raising, and
+    logs in again when the session was lost to the reset. lost['session'] remembers that a
+    request failed, so the next one starts with a new session."""
+    try:
+        if lost['session'] and login_again(_redfishobj):
+            lost['session'] = False
+        response = _redfishobj.get(uri)
+        if response.status == 401 and login_again(_redfishobj):
+            response = _redfishobj.get(uri)
+        return response
+    except Exception:
+        lost['session'] = True
+        return None
+
+def wait_for_task(_redfishobj, task_monitor_uri, timeout=DEFAULT_TIMEOUT):
+    """Follow a Redfish task monitor until the task finishes. Returns (state, timed out), where
+    state holds TaskState, PercentComplete and Messages."""
+    lost = {'session': False}
+
+    def poll():
+        response = _get_quietly(_redfishobj, task_monitor_uri, lost)
+        if response is None or response.status >= 500:
+            return {'TaskState': 'Unknown'}
+        if response.status == 202 and not response.dict:
+            return {'TaskState': 'Running'}
+        task = response.dict or {}
+        return {'TaskState': task.get('TaskState', 'Completed' if response.status in \
+                            [200, 204] else 'Running'), 'PercentComplete': \
+                            task.get('PercentComplete'), 'Messages': task.get('Messages', [])}
+
+    def progress(state):
+        sys.stdout.write("\tTask %s %s%%\n" % (state['TaskState'], \
+                                                        state.get('PercentComplete') or 0))
+    return wait_until(poll, lambda state: state['TaskState'] in TASK_DONE_STATES, timeout, \
+                                                                                        progress)
+
+def wait_for_update(_redfishobj, update_service_uri, timeout=DEFAULT_TIMEOUT):
+    """Poll UpdateService Oem.Hpe.State and FlashProgressPercent until the flash is over.
+    Idle only counts as over once the flash has been seen running. Returns (state, timed out),
+    where state holds State, FlashProgressPercent and Result."""
+    seen = {'active': False}
+    lost = {'session': False}
+
+    def poll():
+        response = _get_quietly(_redfishobj, update_service_uri, lost)
+        if response is None or response.status != 200:
+            #iLO is busy or resetting to run the new firmware
+            return {'State': 'Unknown', 'FlashProgressPercent': None}
+        hpe = response.dict.get('Oem', {}).get('Hpe', {})
+        state = {'State': hpe.get('State', 'Unknown'), 'FlashProgressPercent': \
+                 hpe.get('FlashProgressPercent'), 'Result': hpe.get('Result')}
+        if state['State'] not in ['Idle', 'Unknown']:
+            seen['active'] = True
+        return state
+
+    def done(state):
+        return state['State'] in UPDATE_DONE_STATES or (state['State'] == 'Idle' and \
+                                                                                seen['active'])
+
+    def progress(state):
+        sys.stdout.write("\tUpdate %s %s%%\n" % (state['State'], \
+                                                    state.get('FlashProgressPercent') or 0))
+    return wait_until(poll, done, timeout, progress)
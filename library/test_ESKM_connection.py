@@ -18,11 +18,13 @@ An example of testing connection to the ESKM system for HPE iLO systems
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 
 from get_resource_directory import get_resource_directory
+from resource_resolver import find_resource_uri
+from message_registry import decode_extended_info
+from module_output import show
 
 def test_ESKM_connection(_redfishobj):
 
@@ -44,10 +46,7 @@ def test_ESKM_connection(_redfishobj):
 
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#HpeESKM.' in instance['@odata.type']:
-                eskm_uri = instance['@odata.id']
-                break
+        eskm_uri = find_resource_uri(_redfishobj, 'HpeESKM')
 
     if eskm_uri:
         eskm_test_conn_uri = _redfishobj.get(eskm_uri).obj['Actions']\
@@ -58,8 +57,7 @@ def test_ESKM_connection(_redfishobj):
         #error message to see what went wrong
         if resp.status == 400:
             try:
-                print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, \
-                                                                                sort_keys=True))
+                show(decode_extended_info(_redfishobj, resp.dict), 'messages')
             except Exception as excp:
                 sys.stderr.write("A response error occurred, unable to access iLO Extended "\
                                  "Message Info...")
@@ -67,7 +65,7 @@ def test_ESKM_connection(_redfishobj):
             sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
         else:
             print("Success!\n")
-            print(json.dumps(resp.dict, indent=4, sort_keys=True))
+            show(resp.dict, 'response')
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -89,14 +87,11 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = False
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
     test_ESKM_connection(REDFISHOBJ)
-    REDFISHOBJ.logout()
+    release_redfish_client(REDFISHOBJ)
@@ -18,15 +18,23 @@ An example of updating firmware via HTTP URL
 """
 
 import sys
-import json
-from redfish import RedfishClient
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary
+from resource_resolver import find_resource_uri
+from task_wait import wait_for_task, wait_for_update, UPDATE_FAILED_STATES, DEFAULT_TIMEOUT
+from firmware_baseline import component_is_current
+from message_registry import decode_extended_info
+from module_output import show, module_results
 
-def update_ilo_firmware(_redfishobj, fw_url, tpm_flag):
+def update_ilo_firmware(_redfishobj, fw_url, tpm_flag, wait=True, timeout=DEFAULT_TIMEOUT):
+    """Start a SimpleUpdate from fw_url and, with wait, poll until the flash is over. Returns
+    the final state: State (plus FlashProgressPercent) or TaskState, and timed_out. None when
+    the update could not be started."""
 
     body = dict()
     update_service_uri = None
@@ -38,30 +46,42 @@ def update_ilo_firmware(_redfishobj, fw_url, tpm_flag):
         update_service_uri = _redfishobj.root.obj['UpdateService']['@odata.id']
     else:
         #Use Resource directory to find the relevant URI
-        for instance in resource_instances:
-            if '#UpdateService.' in instance['@odata.type']:
-                update_service_uri = instance['@odata.id']
-                break
+        update_service_uri = find_resource_uri(_redfishobj, 'UpdateService')
 
-    if update_service_uri and fw_url:
-        update_uri = _redfishobj.get(update_service_uri).obj['Actions']\
-                                                        ['#UpdateService.SimpleUpdate']['target']
-        body["ImageURI"] = fw_url
-        if tpm_flag:
-            body["TPMOverrideFlag"] = tpm_flag
-        resp = _redfishobj.post(update_uri, body)
-        if resp.status == 400:
-            try:
-                print(json.dumps(resp.obj['error']\
-                                 ['@Message.ExtendedInfo'], indent=4, sort_keys=True))
-            except Exception as excp:
-                sys.stderr.write("A response error occurred, unable to access iLO Extended "\
-                                 "Message Info...")
-        elif resp.status != 200:
-            sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
-        else:
-            print("Success!\n")
-            print(json.dumps(resp.obj['error']['@Message.ExtendedInfo'], indent=4, sort_keys=True))
+    if not (update_service_uri and fw_url):
+        return None
+
+    update_uri = _redfishobj.get(update_service_uri).obj['Actions']\
+                                                    ['#UpdateService.SimpleUpdate']['target']
+    body["ImageURI"] = fw_url
+    if tpm_flag:
+        body["TPMOverrideFlag"] = tpm_flag
+    resp = _redfishobj.post(update_uri, body)
+    if resp.status == 400:
+        try:
+            show(decode_extended_info(_redfishobj, resp.dict), 'messages')
+        except Exception as excp:
+            sys.stderr.write("A response error occurred, unable to access iLO Extended "\
+                             "Message Info...")
+        return None
+    elif resp.status not in [200, 202]:
+        sys.stderr.write("An http response of \'%s\' was returned.\n" % resp.status)
+        return None
+
+    print("Success! Update started.\n")
+    if not wait:
+        return {'State': 'Started', 'timed_out': False}
+
+    #follow the task monitor when iLO hands one out, otherwise watch the UpdateService state
+    task_monitor_uri = resp.getheader('location')
+    if task_monitor_uri:
+        state, timed_out = wait_for_task(_redfishobj, task_monitor_uri, timeout)
+    else:
+        state, timed_out = wait_for_update(_redfishobj, update_service_uri, timeout)
+    state['timed_out'] = timed_out
+    if timed_out:
+        sys.stderr.write("Update still running after %d seconds.\n" % timeout)
+    return state
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -75,12 +95,22 @@ if __name__ == "__main__":
             name      = dict(required=True),
             enabled   = dict(required=True, type='bool'),
             firmware_url = dict(required=True, type='str'),
-            tpm_flag = dict(required=True, type='bool')
+            tpm_flag = dict(required=True, type='bool'),
+            wait = dict(required=False, type='bool', default=True),
+            timeout = dict(required=False, type='int', default=DEFAULT_TIMEOUT),
+            component_name = dict(required=False, type='str', default=None),
+            target_version = dict(required=False, type='str', default=None)
         )
     )
     # Set variables based on vars fed from .yml
     FIRMWARE_URL = module.params['firmware_url']
     TPM_FLAG = module.params['tpm_flag']
+    # wait for the flash to finish, for at most TIMEOUT seconds
+    WAIT = module.params['wait']
+    TIMEOUT = module.params['timeout']
+    # skip the flash when every device of this FirmwareInventory component is at target version
+    COMPONENT_NAME = module.params['component_name']
+    TARGET_VERSION = module.params['target_version']
     # When running on the server locally use the following commented values
     # While this example can be run remotely, it is used locally to locate the
     # iLO IP address
@@ -103,15 +133,26 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    update_ilo_firmware(REDFISHOBJ, FIRMWARE_URL, TPM_FLAG)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    if COMPONENT_NAME and TARGET_VERSION and \
+                            component_is_current(REDFISHOBJ, COMPONENT_NAME, TARGET_VERSION):
+        release_redfish_client(REDFISHOBJ)
+        module.exit_json(changed=False, update_state={'State': 'Current', 'timed_out': False}, \
+                         resource_directory_cache=resource_directory_cache_stats(), \
+                         results=module_results(), http_trace=http_trace_summary())
+
+    UPDATE_STATE = update_ilo_firmware(REDFISHOBJ, FIRMWARE_URL, TPM_FLAG, WAIT, TIMEOUT)
+    release_redfish_client(REDFISHOBJ)
+    if not UPDATE_STATE:
+        module.fail_json(msg="Unable to start the firmware update.")
+    if UPDATE_STATE['timed_out'] or UPDATE_STATE.get('State') in UPDATE_FAILED_STATES or \
+                            UPDATE_STATE.get('TaskState') in ['Exception', 'Killed', 'Cancelled']:
+        module.fail_json(msg="Firmware update did not complete.", update_state=UPDATE_STATE)
+    module.exit_json(changed=True, update_state=UPDATE_STATE, \
+                     resource_directory_cache=resource_directory_cache_stats(), \
+                     results=module_results(), http_trace=http_trace_summary())
@@ -20,14 +20,86 @@ An example of uploading firmware to the iLO Repository for flashing
 import os
 import sys
 import json
-from redfish import RedfishClient
+import time
+import uuid
+import socket
+import hashlib
+from six.moves import http_client
 from redfish.rest.v1 import ServerDownOrUnreachableError
+from session_broker import get_redfish_client, release_redfish_client, open_raw_connection
 #Instantiating module class        
 from ansible.module_utils.basic import *
 
-from get_resource_directory import get_resource_directory
-
-def upload_firmware(_redfishobj, firmware_loc, update_repo=True, update_target=False):
+from get_resource_directory import get_resource_directory, resource_directory_cache_stats
+from http_trace import http_trace_summary, record
+from resource_resolver import find_resource_uri
+from firmware_baseline import component_is_current
+
+# Components larger than this are uploaded in numbered sections, one POST each, so an
+# interrupted upload can be resumed from the section that failed (same size iLOrest uses)
+SECTION_SIZE = 32 * 1024 * 1024
+# Bytes read from the component file and written to the connection at a time
+CHUNK_SIZE = 1024 * 1024
+
+def _component_etag(firmware_loc):
+    """A tag that stays the same for the same file, so resumed sections join the upload"""
+    stat = os.stat(firmware_loc)
+    key = "%s|%d|%d" % (os.path.basename(firmware_loc), stat.st_size, int(stat.st_mtime))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def _multipart(session_key, json_data, filename, boundary):
+    head = ''
+    for name, value in [('sessionKey', session_key), ('parameters', json.dumps(json_data))]:
+        head += '--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n' % \
+                                                                        (boundary, name, value)
+    head += '--%s\r\nContent-Disposition: form-data; name="file"; filename="%s"\r\n'\
+            'Content-Type: application/octet-stream\r\n\r\n' % (boundary, filename)
+    return head.encode('utf-8'), ('\r\n--%s--\r\n' % boundary).encode('utf-8')
+
+def _post_streaming(conn, auth, path, session_key, json_data, filename, fle, length):
+    """POST one multipart section, copying the file CHUNK_SIZE bytes at a time. Returns the
+    http status, or None when the connection failed or timed out before iLO answered."""
+    boundary = uuid.uuid4().hex
+    head, tail = _multipart(session_key, json_data, filename, boundary)
+
+    start = time.time()
+    status = None
+    try:
+        conn.putrequest('POST', path)
+        conn.putheader('Content-Type', 'multipart/form-data; boundary=%s' % boundary)
+        conn.putheader('Content-Length', str(len(head) + length + len(tail)))
+        for key, value in auth.items():
+            conn.putheader(key, value)
+        conn.endheaders()
+        conn.send(head)
+        remaining = length
+        while remaining:
+            chunk = fle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            conn.send(chunk)
+            remaining -= len(chunk)
+        conn.send(tail)
+        response = conn.getresponse()
+        status = response.status
+        response.read()
+    except (socket.error, http_client.HTTPException) as excp:
+        sys.stderr.write("Connection lost while uploading: %s\n" % excp)
+    finally:
+        conn.close()
+    record('POST', path, status, time.time() - start)
+    return status
+
+def _post_in_memory(_redfishobj, path, session_key, json_data, filename, fle, length):
+    """POST one section through the client, for local (blobstore) connections"""
+    body = [('sessionKey', session_key), ('parameters', json.dumps(json_data)), \
+            ('file', (filename, fle.read(length), 'application/octet-stream'))]
+    return _redfishobj.post(path, body, headers={'Cookie': 'sessionKey=' + session_key}).status
+
+def upload_firmware(_redfishobj, firmware_loc, update_repo=True, update_target=False, \
+                                                                                start_section=1):
+    """Upload a component to the iLO Repository. Returns (sections uploaded, total sections);
+    when they differ, call again with start_section set to the next section to resume."""
     resource_instances = get_resource_directory(_redfishobj)
 
     if DISABLE_RESOURCE_DIR or not resource_instances:
@@ -35,43 +107,51 @@ def upload_firmware(_redfishobj, firmware_loc, update_repo=True, update_target=F
         update_service_uri = _redfishobj.root.obj['UpdateService']['@odata.id']
     else:
         #obtain all account instances from resource directory
-        for instance in resource_instances:
-            if '#UpdateService.' in instance['@odata.type']:
-                update_service_uri = instance['@odata.id']
+        update_service_uri = find_resource_uri(_redfishobj, 'UpdateService')
 
     update_service_response = _redfishobj.get(update_service_uri)
 
     path = update_service_response.obj.HttpPushUri
 
-    body = []
-    json_data = {'UpdateRepository': update_repo, 'UpdateTarget': update_target, 'ETag': 'atag', 'Section': 0}
     session_key = _redfishobj.session_key
-
     filename = os.path.basename(firmware_loc)
-    with open(firmware_loc, 'rb') as fle:
-        output = fle.read()
-
-    session_tuple = ('sessionKey', session_key)
-    parameters_tuple = ('parameters', json.dumps(json_data))
-    file_tuple = ('file', (filename, output, 'application/octet-stream'))
+    size = os.path.getsize(firmware_loc)
+    #a single POST (Section 0) unless the component needs splitting
+    sections = 1 if size <= SECTION_SIZE else (size + SECTION_SIZE - 1) // SECTION_SIZE
+    start_section = max(1, start_section or 1)
 
-    #Build the payload from each multipart-form data tuple
-    body.append(session_tuple)
-    body.append(parameters_tuple)
-    body.append(file_tuple)
+    json_data = {'UpdateRepository': update_repo, 'UpdateTarget': update_target, \
+                 'ETag': _component_etag(firmware_loc), 'Section': 0}
+    if start_section > 1:
+        sys.stdout.write("Resuming upload of %s at section %d of %d\n" % (filename, \
+                                                                    start_section, sections))
 
-    #Create our header dictionary
-    header = {'Cookie': 'sessionKey=' + session_key}
-
-    #We pass the whole list payload to post
-    resp = _redfishobj.post(path, body, headers=header)
-
-    if resp.status == 400:
-        sys.stderr.write("Failed to upload firmware...")
-    elif not resp.status in [200, 201]:
-        sys.stderr.write("An http response of '%s' was returned.\n" % resp.status)
-    else:
-        print("Upload complete!\n")
+    with open(firmware_loc, 'rb') as fle:
+        fle.seek((start_section - 1) * SECTION_SIZE)
+        for section in range(start_section, sections + 1):
+            if sections > 1:
+                json_data['Section'] = section
+            length = min(SECTION_SIZE, size - (section - 1) * SECTION_SIZE)
+            conn, auth = open_raw_connection(_redfishobj)
+            if conn:
+                status = _post_streaming(conn, auth, path, session_key, json_data, filename, \
+                                                                                    fle, length)
+            else:
+                status = _post_in_memory(_redfishobj, path, session_key, json_data, filename, \
+                                                                                    fle, length)
+
+            if status == 400:
+                sys.stderr.write("Failed to upload firmware...")
+            elif status is not None and not status in [200, 201]:
+                sys.stderr.write("An http response of '%s' was returned.\n" % status)
+            if not status in [200, 201]:
+                sys.stderr.write("Upload can be resumed from section %d.\n" % section)
+                return section - 1, sections
+            sys.stdout.write("Uploaded section %d of %d (%d%%)\n" % (section, sections, \
+                                        100 * min(size, section * SECTION_SIZE) // max(size, 1)))
+
+    print("Upload complete!\n")
+    return sections, sections
 
 if __name__ == "__main__":
     # When running on the server locally use the following commented values
@@ -86,6 +166,9 @@ if __name__ == "__main__":
             dia_ilo_pass=dict(required=True, type='str'),
             dia_ilo_user=dict(required=True, type='str'),
             flag=dict(required=True, type='bool'),
+            start_section=dict(required=False, type='int', default=1),
+            component_name=dict(required=False, type='str', default=None),
+            target_version=dict(required=False, type='str', default=None),
             state=dict(default='present', choices=['present']),
             url=dict(required=True, type='str')))
     action = module.params['action']
@@ -94,6 +177,10 @@ if __name__ == "__main__":
     LOGIN_PASSWORD = module.params['dia_ilo_pass']
     UPDATE_TARGET = module.params['flag']
     FIRMWARE_PATH = module.params['url']
+    START_SECTION = module.params['start_section']
+    # skip the upload when every device of this FirmwareInventory component is at target version
+    COMPONENT_NAME = module.params['component_name']
+    TARGET_VERSION = module.params['target_version']
     
     
 
@@ -118,15 +205,26 @@ if __name__ == "__main__":
     DISABLE_RESOURCE_DIR = True
 
     try:
-        # Create a Redfish client object
-        REDFISHOBJ = RedfishClient(base_url=SYSTEM_URL, username=LOGIN_ACCOUNT, \
-                                                                            password=LOGIN_PASSWORD)
-        # Login with the Redfish client
-        REDFISHOBJ.login()
+        # Create a Redfish client object, reusing a cached session when enabled
+        REDFISHOBJ = get_redfish_client(SYSTEM_URL, LOGIN_ACCOUNT, LOGIN_PASSWORD)
     except ServerDownOrUnreachableError as excp:
         sys.stderr.write("ERROR: server not reachable or does not support RedFish.\n")
         sys.exit()
 
-    upload_firmware(REDFISHOBJ, FIRMWARE_PATH, UPDATE_REPO, UPDATE_TARGET)
-    REDFISHOBJ.logout()
-    module.exit_json(changed=True)
+    if COMPONENT_NAME and TARGET_VERSION and \
+                            component_is_current(REDFISHOBJ, COMPONENT_NAME, TARGET_VERSION):
+        release_redfish_client(REDFISHOBJ)
+        module.exit_json(changed=False, msg="%s is already at %s" % (COMPONENT_NAME, \
+                         TARGET_VERSION), \
+                         resource_directory_cache=resource_directory_cache_stats(), \
+                         http_trace=http_trace_summary())
+
+    UPLOADED, SECTIONS = upload_firmware(REDFISHOBJ, FIRMWARE_PATH, UPDATE_REPO, UPDATE_TARGET, \
+                                                                                START_SECTION)
+    release_redfish_client(REDFISHOBJ)
+    if UPLOADED < SECTIONS:
+        module.fail_json(msg="Firmware upload stopped after section %d of %d, rerun with "\
+                         "start_section: %d to resume" % (UPLOADED, SECTIONS, UPLOADED + 1), \
+                         resume_section=UPLOADED + 1, sections=SECTIONS)
+    module.exit_json(changed=True, resource_directory_cache=resource_directory_cache_stats(), \
+                     http_trace=http_trace_summary())
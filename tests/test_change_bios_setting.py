@@ -0,0 +1,50 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Tests of the BIOS attribute comparison in change_bios_setting
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'library'))
+
+from change_bios_setting import bios_changes
+
+class BiosChangesTest(unittest.TestCase):
+
+    def test_case_only_difference_is_a_change(self):
+        self.assertEqual(bios_changes({'AdminName': 'admin'}, {}, {'AdminName': 'Admin'}), \
+                         {'AdminName': 'Admin'})
+        self.assertEqual(bios_changes({'BootMode': 'Uefi'}, {}, {'BootMode': 'UEFI'}), \
+                         {'BootMode': 'UEFI'})
+
+    def test_equal_values_are_not_a_change(self):
+        self.assertEqual(bios_changes({'AdminName': 'Admin'}, {}, {'AdminName': 'Admin'}), {})
+
+    def test_playbook_strings_match_native_values(self):
+        self.assertEqual(bios_changes({'Dhcpv4': True, 'Timeout': 5}, {}, {'Dhcpv4': 'true', \
+                                                                        'Timeout': '5'}), {})
+        self.assertEqual(bios_changes({'Dhcpv4': True}, {}, {'Dhcpv4': 'false'}), \
+                         {'Dhcpv4': 'false'})
+
+    def test_pending_value_wins(self):
+        self.assertEqual(bios_changes({'AdminName': 'old'}, {'AdminName': 'Admin'}, \
+                                                                    {'AdminName': 'Admin'}), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+ # Copyright 2019 Hewlett Packard Enterprise Development LP
+ #
+ # Licensed under the Apache License, Version 2.0 (the "License"); you may
+ # not use this file except in compliance with the License. You may obtain
+ # a copy of the License at
+ #
+ #      http://www.apache.org/licenses/LICENSE-2.0
+ #
+ # Unless required by applicable law or agreed to in writing, software
+ # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ # License for the specific language governing permissions and limitations
+ # under the License.
+
+# -*- coding: utf-8 -*-
+"""
+Tests of the argument handling of the fleet and firmware_rollout modules
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+
+LIBRARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'library')
+
+def run_module(module_name, module_args):
+    """Run a library module as Ansible would and return its JSON result"""
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as argsout:
+        json.dump({'ANSIBLE_MODULE_ARGS': module_args}, argsout)
+    try:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([LIBRARY_DIR] + \
+                                    [path for path in [os.environ.get('PYTHONPATH')] if path]))
+        output = subprocess.run([sys.executable, os.path.join(LIBRARY_DIR, module_name + \
+                    '.py'), argsout.name], stdout=subprocess.PIPE, env=env).stdout
+    finally:
+        os.remove(argsout.name)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+class FleetArgumentsTest(unittest.TestCase):
+
+    def test_endpoint_password_is_masked(self):
+        #an unknown operation fails before any iLO is contacted
+        result = run_module('fleet', {'name': 'fleet', 'enabled': True, 'operation': \
+                             'no_such_module', 'endpoints': [{'baseuri': '10.0.0.100', \
+                             'username': 'admin', 'password': 'S3cret!'}]})
+        self.assertNotIn('S3cret!', json.dumps(result))
+        endpoint = result['invocation']['module_args']['endpoints'][0]
+        self.assertEqual(endpoint['baseuri'], '10.0.0.100')
+        self.assertNotEqual(endpoint['password'], 'S3cret!')
+
+    def test_rollout_endpoint_password_is_masked(self):
+        #a journal that has the iLO flashed already means no iLO is contacted
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as journalout:
+            json.dump({'hosts': {'10.0.0.100': {'status': 'ok'}}}, journalout)
+        try:
+            result = run_module('firmware_rollout', {'name': 'rollout', 'enabled': True, \
+                                 'firmware_url': 'http://10.0.0.1/fw.bin', 'tpm_flag': False, \
+                                 'state_file': journalout.name, 'endpoints': [{'baseuri': \
+                                 '10.0.0.100', 'username': 'admin', 'password': 'S3cret!'}]})
+        finally:
+            os.remove(journalout.name)
+        self.assertNotIn('S3cret!', json.dumps(result))
+        self.assertEqual(result['summary'], {'ok': 1})
+
+if __name__ == '__main__':
+    unittest.main()